@@ -1,5 +1,8 @@
+from django import forms
 from django.contrib import admin
-from .models import Student, Professor, Term, Food, FoodReservation, ProfessorRating, Course, Day, Room, Class, Attendance, CourseRegistration, Department, Grade, Announcement, Assignment, ExaminationSchedule, Messages
+
+from app import timetable
+from .models import Student, Professor, Term, Food, FoodReservation, BalanceTransaction, ProfessorRating, ProfessorRatingStats, Course, Prerequisite, Day, Room, Class, Attendance, AttendanceSummary, CourseRegistration, Department, Grade, GradeAggregate, TermStanding, HonoursEntry, Announcement, Assignment, CourseEvent, FeedItem, ExaminationSchedule, Messages
 
 admin.site.register(Student)
 admin.site.register(Professor)
@@ -7,15 +10,70 @@ admin.site.register(Term)
 admin.site.register(Food)
 admin.site.register(FoodReservation)
 admin.site.register(ProfessorRating)
+admin.site.register(ProfessorRatingStats)
 admin.site.register(Course)
+admin.site.register(Prerequisite)
 admin.site.register(Day)
 admin.site.register(Room)
-admin.site.register(Class)
 admin.site.register(Attendance)
+admin.site.register(AttendanceSummary)
 admin.site.register(CourseRegistration)
 admin.site.register(Department)
 admin.site.register(Grade)
+admin.site.register(GradeAggregate)
+admin.site.register(TermStanding)
+admin.site.register(HonoursEntry)
 admin.site.register(Announcement)
 admin.site.register(Assignment)
+admin.site.register(CourseEvent)
+admin.site.register(FeedItem)
 admin.site.register(ExaminationSchedule)
-admin.site.register(Messages)
\ No newline at end of file
+admin.site.register(Messages)
+
+
+class ClassAdminForm(forms.ModelForm):
+    class Meta:
+        model = Class
+        fields = '__all__'
+
+    def clean(self):
+        cleaned_data = super().clean()
+        room, days = cleaned_data.get('room'), cleaned_data.get('days')
+        start_time, end_time = cleaned_data.get('start_time'), cleaned_data.get('end_time')
+        if room is None or not days or start_time is None or end_time is None:
+            return cleaned_data
+
+        if start_time >= end_time:
+            raise forms.ValidationError('The class must end after it starts.')
+
+        conflicts = timetable.get_index().class_conflicts(
+            room.pk, [day.pk for day in days], timetable.minutes(start_time), timetable.minutes(end_time),
+            exclude=self.instance.pk,
+        )
+        if conflicts:
+            clashing = Class.objects.select_related('course').in_bulk(conflicts.values())
+            raise forms.ValidationError(
+                f'{room} is already taken at this time by ' +
+                ', '.join(str(clashing[class_id].course) for class_id in sorted(set(conflicts.values())))
+            )
+        return cleaned_data
+
+
+@admin.register(Class)
+class ClassAdmin(admin.ModelAdmin):
+    form = ClassAdminForm
+
+
+@admin.register(BalanceTransaction)
+class BalanceTransactionAdmin(admin.ModelAdmin):
+    # the ledger is append-only and must add up to ``Student.balance``; entries are written by ``food`` only
+    list_display = ['student', 'amount', 'reason', 'date']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,236 @@
+import math
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from app.indexes import LocalIndex
+from app.models import Department, Term
+
+VERSION_KEY = 'admission:version'
+# seconds a turned-away student keeps their place in line without retrying
+QUEUE_TTL = 30
+
+_lock = threading.Lock()
+_room = None
+
+
+class AdmissionError(Exception):
+    message = 'Course selection is not available'
+
+    def __init__(self, message=None):
+        super().__init__(message or self.message)
+        self.message = message or self.message
+
+
+class SelectionClosed(AdmissionError):
+    message = 'Course selection is closed for this student'
+
+    def __init__(self, message=None, opens_at=None, closes_at=None):
+        super().__init__(message)
+        self.opens_at = opens_at
+        self.closes_at = closes_at
+
+
+class Queued(AdmissionError):
+    message = 'Course selection is busy, retry later'
+
+    def __init__(self, message=None, position=None, retry_after=None):
+        super().__init__(message)
+        self.position = position
+        self.retry_after = retry_after
+
+
+class AdmissionSchedule:
+    """
+    Every department's course selection date with the wave each entry year and department falls in.
+
+    A student's window opens at the department's date plus their wave times
+    ``REGISTRATION_WAVE_MINUTES`` and closes ``REGISTRATION_WINDOW_DAYS`` after the date. Students
+    whose department has no date, or who have no department, have no window, and ``check_window``
+    refuses them.
+    """
+
+    def __init__(self, departments, terms):
+        # departments: (pk, course_selection_date); terms: (pk, academic_year)
+        self.dates = {pk: opens for pk, opens in departments if opens is not None}
+        self.entry_years = dict(terms)
+        self.year_wave = {year: wave for wave, year in enumerate(sorted(set(self.entry_years.values())))}
+
+        same_day = defaultdict(list)
+        for pk, opens in sorted(self.dates.items()):
+            same_day[opens].append(pk)
+        self.department_wave = {pk: wave for pks in same_day.values() for wave, pk in enumerate(pks)}
+
+    def wave(self, department_id, term_id):
+        if settings.REGISTRATION_WAVES == 'entry_year':
+            return self.year_wave.get(self.entry_years.get(term_id), 0)
+        if settings.REGISTRATION_WAVES == 'department':
+            return self.department_wave.get(department_id, 0)
+        return 0
+
+    def window(self, department_id, term_id):
+        """``(opens_at, closes_at)`` of a student, or None when no window applies."""
+        opens = self.dates.get(department_id)
+        if opens is None:
+            return None
+        start = datetime.combine(opens, datetime.min.time(), tzinfo=timezone.get_current_timezone())
+        opens_at = start + timedelta(minutes=self.wave(department_id, term_id) * settings.REGISTRATION_WAVE_MINUTES)
+        return opens_at, start + timedelta(days=settings.REGISTRATION_WINDOW_DAYS)
+
+
+def build_schedule():
+    return AdmissionSchedule(Department.objects.values_list('pk', 'course_selection_date'),
+                             Term.objects.values_list('pk', 'academic_year'))
+
+
+_schedule = LocalIndex(VERSION_KEY, build_schedule)
+
+
+def get_schedule():
+    """The process-wide schedule, rebuilt once after any department or term change."""
+    return _schedule.get()
+
+
+def invalidate():
+    _schedule.invalidate()
+
+
+def window(student):
+    return get_schedule().window(student.department_id, student.term_id)
+
+
+def check_window(student, now=None):
+    """Raise ``SelectionClosed`` unless ``student`` is inside their course selection window."""
+    if student.department_id is None:
+        if settings.REGISTRATION_ALLOW_WITHOUT_DEPARTMENT:
+            return
+        raise SelectionClosed('No department on record for this student; the education office has to set one')
+    bounds = window(student)
+    if bounds is None:
+        # fail closed: a department opens course selection by setting its date
+        raise SelectionClosed("Course selection has not been scheduled for this student's department")
+    now = now or timezone.now()
+    opens_at, closes_at = bounds
+    if now < opens_at:
+        raise SelectionClosed('Course selection has not opened yet for this student', opens_at, closes_at)
+    if now >= closes_at:
+        raise SelectionClosed('Course selection has ended for this student', opens_at, closes_at)
+
+
+class WaitingRoom:
+    """
+    A token bucket in front of the registration engine with a first come, first served line.
+
+    A request goes through when a token is left, fewer than ``max_in_flight`` registrations are
+    running and at most as many students as there are free slots are waiting ahead of it.
+    Otherwise the student keeps (or takes) a place in line and ``Queued`` tells them when to
+    retry; a place is given up after ``ttl`` seconds without a retry. A ``rate`` of 0 leaves
+    only the in-flight cap.
+
+    The bucket, the cap and the line belong to one server process. A retry may reach another
+    process, so a student's place in line is only a local estimate and is not shown to clients.
+    """
+
+    def __init__(self, rate, max_in_flight, burst=None, ttl=QUEUE_TTL, clock=time.monotonic):
+        self.rate = max(rate, 0)
+        self.capacity = burst or max(self.rate, 1)
+        self.max_in_flight = max_in_flight
+        self.ttl = ttl
+        self.clock = clock
+        self.tokens = self.capacity
+        self.updated = clock()
+        self.in_flight = 0
+        self.line = []  # tickets in arrival order
+        self.tickets = {}  # key -> ticket
+        self.seen = {}  # ticket -> (key, last retry)
+        self.next_ticket = 0
+        self.swept = clock()
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def _expire(self, now):
+        # any place can go stale, not only the head; a sweep costs the whole line, so at most one a second
+        if now - self.swept < 1:
+            return
+        self.swept = now
+        stale = {ticket for ticket in self.line if now - self.seen[ticket][1] > self.ttl}
+        if stale:
+            self.line = [ticket for ticket in self.line if ticket not in stale]
+            for ticket in stale:
+                key, _ = self.seen.pop(ticket)
+                del self.tickets[key]
+
+    def _free(self):
+        slots = self.max_in_flight - self.in_flight
+        return min(int(self.tokens), slots) if self.rate else slots
+
+    def enter(self, key):
+        """Take a slot for ``key`` or raise ``Queued``; every successful ``enter`` needs a ``leave``."""
+        with self.lock:
+            now = self.clock()
+            self._refill(now)
+            self._expire(now)
+
+            ticket = self.tickets.get(key)
+            position = bisect_left(self.line, ticket) if ticket is not None else len(self.line)
+            if position < self._free():
+                if ticket is not None:
+                    del self.line[position]
+                    del self.tickets[key]
+                    del self.seen[ticket]
+                self.tokens -= 1
+                self.in_flight += 1
+                return
+
+            if ticket is None:
+                ticket = self.next_ticket
+                self.next_ticket += 1
+                self.line.append(ticket)
+                self.tickets[key] = ticket
+            self.seen[ticket] = (key, now)
+            # without a rate only running registrations hold the line up, and they finish within a second
+            wait = math.ceil((position + 1 - max(self.tokens, 0)) / self.rate) if self.rate else 1
+            raise Queued(position=position + 1, retry_after=max(1, wait))
+
+    def leave(self):
+        with self.lock:
+            self.in_flight -= 1
+
+    def stats(self):
+        with self.lock:
+            return {'in_flight': self.in_flight, 'waiting': len(self.line), 'tokens': round(self.tokens, 2)}
+
+
+def get_waiting_room():
+    global _room
+    if _room is None:
+        with _lock:
+            if _room is None:
+                _room = WaitingRoom(settings.REGISTRATION_RATE, settings.REGISTRATION_MAX_IN_FLIGHT)
+    return _room
+
+
+@contextmanager
+def admitted(student):
+    """
+    Run the body as one of the registrations the database is allowed to see at once.
+
+    Raises ``SelectionClosed`` outside the student's window and ``Queued`` while the waiting
+    room is full, in both cases before any write reaches the database.
+    """
+    check_window(student)
+    room = get_waiting_room()
+    room.enter(student.pk)
+    try:
+        yield
+    finally:
+        room.leave()
@@ -0,0 +1,129 @@
+from django.db import transaction
+from django.db.models import ExpressionWrapper, F, FloatField, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from app import honours
+from app.models import Course, Grade, GradeAggregate, Student
+
+
+def grade_state(grade):
+    """The part of a grade that feeds the GPA, in the shape ``Grade.save`` reads back from the database."""
+    return {
+        'student_id': grade.student_id,
+        'term_id': grade.term_id,
+        'grade': grade.grade,
+        'have_digital_signature': grade.have_digital_signature,
+        'credits': Course.objects.values_list('credits', flat=True).get(pk=grade.course_id),
+    }
+
+
+def stored_state(grade_pk):
+    """
+    The stored grade's state, or None, with the grade row locked until the transaction ends.
+
+    Two concurrent changes of one grade would otherwise both move the aggregates away from the
+    same previous state; only the grade row is locked, not its course.
+    """
+    grade = Grade.objects.select_for_update(of=('self',)).select_related('course') \
+        .only('student_id', 'term_id', 'grade', 'have_digital_signature', 'course__credits').filter(pk=grade_pk).first()
+    if grade is None:
+        return None
+    return {
+        'student_id': grade.student_id,
+        'term_id': grade.term_id,
+        'grade': grade.grade,
+        'have_digital_signature': grade.have_digital_signature,
+        'credits': grade.course.credits,
+    }
+
+
+def _contributions(state, sign):
+    if not state or not state['have_digital_signature']:
+        return []
+
+    credits = sign * state['credits']
+    points = sign * state['grade'] * state['credits']
+    keys = [(state['student_id'], None)]
+    if state['term_id'] is not None:
+        keys.append((state['student_id'], state['term_id']))
+    return [(key, credits, points) for key in keys]
+
+
+def grade_changed(previous, current):
+    """
+    Move the aggregates from a grade's ``previous`` state to its ``current`` one.
+
+    Either side may be None (grade created or deleted). Only rows whose totals actually change
+    are touched, each with a single ``F()`` update, so concurrent signings never lose an update.
+    """
+    deltas = {}
+    for key, credits, points in _contributions(previous, -1) + _contributions(current, 1):
+        total_credits, total_points = deltas.get(key, (0, 0))
+        deltas[key] = (total_credits + credits, total_points + points)
+
+    deltas = {key: delta for key, delta in deltas.items() if delta != (0, 0)}
+    if not deltas:
+        return
+
+    with transaction.atomic():
+        GradeAggregate.objects.bulk_create(
+            [GradeAggregate(student_id=student_id, term_id=term_id) for student_id, term_id in deltas],
+            ignore_conflicts=True,
+        )
+        for (student_id, term_id), (credits, points) in deltas.items():
+            GradeAggregate.objects.filter(student_id=student_id, term_id=term_id).update(
+                total_credits=F('total_credits') + credits,
+                total_grade_points=F('total_grade_points') + points,
+            )
+            if term_id is None:
+                Student.objects.filter(pk=student_id).update(total_credits_taken=F('total_credits_taken') + credits)
+
+        honours.refresh(student_id for student_id, term_id in deltas if term_id is None)
+
+
+def rebuild_all():
+    """Recompute every aggregate from the signed grades in one set-based pass."""
+    return rebuild_students(None)
+
+
+def rebuild_students(student_ids):
+    """Recompute the aggregates of ``student_ids`` (every student when None) in one set-based pass."""
+    signed = Grade.objects.filter(have_digital_signature=True)
+    stale = GradeAggregate.objects.all()
+    students = Student.objects.all()
+    if student_ids is not None:
+        student_ids = list(student_ids)
+        signed = signed.filter(student_id__in=student_ids)
+        stale = stale.filter(student_id__in=student_ids)
+        students = students.filter(pk__in=student_ids)
+
+    totals = {
+        'credits': Sum('course__credits'),
+        'points': Sum(ExpressionWrapper(F('grade') * F('course__credits'), output_field=FloatField())),
+    }
+
+    with transaction.atomic():
+        stale.delete()
+
+        rows = [
+            GradeAggregate(student_id=row['student_id'], term_id=row['term_id'],
+                           total_credits=row['credits'], total_grade_points=row['points'])
+            for row in signed.filter(term__isnull=False).values('student_id', 'term_id').annotate(**totals)
+        ]
+        rows += [
+            GradeAggregate(student_id=row['student_id'], term_id=None,
+                           total_credits=row['credits'], total_grade_points=row['points'])
+            for row in signed.values('student_id').annotate(**totals)
+        ]
+        GradeAggregate.objects.bulk_create(rows, batch_size=1000)
+
+        overall_credits = GradeAggregate.objects.filter(student=OuterRef('pk'), term__isnull=True) \
+            .values('total_credits')
+        students.update(total_credits_taken=Coalesce(Subquery(overall_credits), 0))
+
+        if student_ids is None:
+            honours.rebuild()
+        else:
+            honours.refresh(student_ids)
+
+    return len(rows)
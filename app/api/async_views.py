@@ -0,0 +1,113 @@
+"""
+Async versions of the read-heavy endpoints, written against Django's async ORM.
+
+Under the ASGI application (config/asgi.py) these run on the event loop instead of pinning a
+worker thread per request; under WSGI Django still serves them, one event loop per request.
+DRF's ``APIView`` is synchronous, so these are plain Django views returning ``JsonResponse``
+with the same documents as their counterparts in views.py.
+"""
+import functools
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import Http404, HttpResponseNotAllowed, JsonResponse
+
+from app import read_models
+from app.models import Attendance, Course, ExaminationSchedule, Student
+
+ATTENDANCE_PAGE_SIZE = 100
+ATTENDANCE_MAX_PAGE_SIZE = 1000
+
+
+async def aget_object_or_404(queryset, **kwargs):
+    try:
+        return await queryset.aget(**kwargs)
+    except queryset.model.DoesNotExist:
+        raise Http404(f'No {queryset.model._meta.object_name} matches the given query.')
+
+
+def json_response(data, status=200):
+    return JsonResponse(data, status=status, safe=False, encoder=DjangoJSONEncoder)
+
+
+def require_get(view):
+    # django.views.decorators.http.require_GET only learns to wrap coroutines in Django 5.0
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return HttpResponseNotAllowed(['GET', 'HEAD'])
+        return await view(request, *args, **kwargs)
+    return wrapper
+
+
+# مشاهده برنامه کلاسی
+@require_get
+async def class_schedule(request, student_id):
+    student = await aget_object_or_404(Student.objects.all(), student_id=student_id)
+    return json_response(await read_models.aget_class_schedule(student))
+
+
+# مشاهده کارنامه
+@require_get
+async def transcript(request, student_id):
+    student = await aget_object_or_404(Student.objects.all(), student_id=student_id)
+    return json_response(await read_models.aget_transcript(student))
+
+
+# مشاهده حضور و غیاب
+@require_get
+async def attendance(request, student_id):
+    """Keyset pages on the primary key: ``?after=<id of the last row>&page_size=``."""
+    try:
+        after = int(request.GET.get('after', 0))
+        page_size = min(max(int(request.GET.get('page_size', ATTENDANCE_PAGE_SIZE)), 1), ATTENDANCE_MAX_PAGE_SIZE)
+    except ValueError:
+        return json_response({"message": "after and page_size must be integers"}, status=400)
+
+    student = await aget_object_or_404(Student.objects.all(), student_id=student_id)
+    attendances = Attendance.objects.filter(student_id=student.pk, pk__gt=after).select_related('class_num__room') \
+        .order_by('pk')[:page_size + 1]
+    rows = [attendance async for attendance in attendances]
+
+    next_url = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        query = request.GET.copy()
+        query['after'] = rows[-1].pk
+        next_url = request.build_absolute_uri(f'{request.path}?{query.urlencode()}')
+
+    return json_response({
+        'next': next_url,
+        'results': [{
+            'class_number': attendance.class_num.room.name,
+            'date': attendance.date,
+            'is_present': attendance.is_present
+        } for attendance in rows],
+    })
+
+
+# مشاهده برنامه امتحانی
+@require_get
+async def examination_schedule(request, course_id):
+    course = await aget_object_or_404(Course.objects.all(), id=course_id)
+    exams = ExaminationSchedule.objects.filter(course_id=course.pk).select_related('room')
+
+    return json_response([{
+        'date': exam.date,
+        'room': exam.room.name,
+        'seat_number': exam.seat_number,
+        'description': exam.description
+    } async for exam in exams])
+
+
+# مشاهده جزئیات درس
+@require_get
+async def course_detail(request, course_id):
+    course = await aget_object_or_404(Course.objects.select_related('professor'), id=course_id)
+    professor = f'{course.professor.first_name} {course.professor.last_name}'
+
+    return json_response([{
+        'class_number': class_obj.room.name,
+        'professor': professor,
+        'department': course.professor.department,
+        'course_title': course.title
+    } async for class_obj in course.class_set.select_related('room')])
@@ -0,0 +1,27 @@
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
+
+from app import versions
+
+
+def versioned(resources):
+    """
+    Decorate an ``APIView`` so GET and HEAD carry the ETag and Last-Modified of ``resources(**kwargs)``.
+
+    ``resources`` maps the URL kwargs to the resource names of app/versions.py. A request whose
+    If-None-Match or If-Modified-Since still holds is answered 304 before the view runs, for the
+    price of one cache hit or one query on the counters.
+    """
+    def lookup(request, *args, **kwargs):
+        # condition() asks for the ETag and Last-Modified separately; read the counters once
+        if not hasattr(request, '_validators'):
+            request._validators = versions.validators(resources(**kwargs))
+        return request._validators
+
+    def etag(request, *args, **kwargs):
+        return lookup(request, *args, **kwargs)[0]
+
+    def last_modified(request, *args, **kwargs):
+        return lookup(request, *args, **kwargs)[1]
+
+    return method_decorator(condition(etag_func=etag, last_modified_func=last_modified), name='get')
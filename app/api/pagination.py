@@ -0,0 +1,68 @@
+from django.http import StreamingHttpResponse
+from rest_framework.pagination import CursorPagination
+from rest_framework.utils.encoders import JSONEncoder
+
+STREAM_CHUNK_SIZE = 500
+
+
+class IdCursorPagination(CursorPagination):
+    """Keyset pagination on the primary key: every page is one indexed range query, however deep."""
+    ordering = 'pk'
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+
+
+class TimestampCursorPagination(CursorPagination):
+    """Keyset pagination newest first; paired with a (owner, timestamp) index every page is one range scan."""
+    ordering = ('-timestamp', '-id')
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+
+def wants_stream(request):
+    return request.query_params.get('stream') in ('1', 'true')
+
+
+def stream_json(rows, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Stream ``rows`` (dicts) as one JSON array, encoding ``chunk_size`` rows per chunk.
+
+    Pair it with ``QuerySet.iterator(chunk_size=...)`` so neither the queryset nor the
+    response body is ever held in memory as a whole.
+    """
+    encoder = JSONEncoder()
+
+    def chunks():
+        separator = '['
+        batch = []
+        for row in rows:
+            batch.append(encoder.encode(row))
+            if len(batch) >= chunk_size:
+                yield separator + ','.join(batch)
+                separator = ','
+                batch = []
+        if batch:
+            yield separator + ','.join(batch)
+            separator = ','
+        yield ']' if separator == ',' else '[]'
+
+    return StreamingHttpResponse(chunks(), content_type='application/json')
+
+
+class StreamingListMixin:
+    """
+    Let a ``ListAPIView`` answer ``?stream=1`` with the whole result set as a streamed JSON array.
+
+    Without the flag the view keeps its normal paginated response.
+    """
+    stream_chunk_size = STREAM_CHUNK_SIZE
+
+    def list(self, request, *args, **kwargs):
+        if not wants_stream(request):
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset()).order_by('pk')
+        rows = (self.get_serializer(obj).data for obj in queryset.iterator(chunk_size=self.stream_chunk_size))
+        return stream_json(rows, self.stream_chunk_size)
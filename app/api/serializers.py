@@ -1,6 +1,7 @@
 # serializers.py
 from rest_framework import serializers
-from app.models import Messages, Course, Student, Class, Professor, Term
+from app import read_models
+from app.models import Messages, Course, Student, Class, Professor, Term, Food
 
 
 class MessageSerializer(serializers.ModelSerializer):
@@ -9,6 +10,22 @@ class MessageSerializer(serializers.ModelSerializer):
         fields = ['sender', 'receiver', 'subject', 'content', 'timestamp']
 
 
+class InboxMessageSerializer(serializers.ModelSerializer):
+    sender = serializers.CharField(source='sender.student_id')
+
+    class Meta:
+        model = Messages
+        fields = ['id', 'sender', 'subject', 'content', 'timestamp', 'is_read']
+
+
+class OutboxMessageSerializer(serializers.ModelSerializer):
+    receiver = serializers.CharField(source='receiver.professor_id')
+
+    class Meta:
+        model = Messages
+        fields = ['id', 'receiver', 'subject', 'content', 'timestamp', 'is_read']
+
+
 class CourseSerializer(serializers.ModelSerializer):
     class Meta:
         model = Course
@@ -19,6 +36,37 @@ class StudentSerializer(serializers.ModelSerializer):
     class Meta:
         model = Student
         fields = '__all__'
+        # the department decides the course selection window; it is set by the education office
+        read_only_fields = ['balance', 'total_credits_taken', 'term', 'department']
+
+
+class StudentProfileSerializer(serializers.ModelSerializer):
+    # only the names are the student's to edit; balance moves through the ledger and the rest through the office
+    class Meta:
+        model = Student
+        fields = ['student_id', 'first_name', 'last_name']
+        read_only_fields = ['student_id']
+
+    def update(self, instance, validated_data):
+        for field, value in validated_data.items():
+            setattr(instance, field, value)
+        # a full-row save would write back a balance read before a concurrent debit
+        instance.save(update_fields=list(validated_data))
+        return instance
+
+
+class StudentPassCourseListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        # read every student's passed courses and the course codes once for the whole list
+        students = list(data.all() if hasattr(data, 'all') else data)
+        passed = read_models.get_passed_courses_many(student.pk for student in students)
+        codes = dict(Course.objects.filter(pk__in=set().union(*passed.values())).values_list('pk', 'code'))
+        self.context['passed_courses'] = {
+            pk: [codes[course_pk] for course_pk in sorted(course_pks) if course_pk in codes]
+            for pk, course_pks in passed.items()
+        }
+        return super().to_representation(students)
+
 
 class StudentPassCourseSerializer(serializers.ModelSerializer):
     passed_courses = serializers.SerializerMethodField()
@@ -26,9 +74,13 @@ class StudentPassCourseSerializer(serializers.ModelSerializer):
     class Meta:
         model = Student
         fields = ['student_id', 'passed_courses']
+        list_serializer_class = StudentPassCourseListSerializer
 
     def get_passed_courses(self, obj):
-        return obj.get_passed_courses()
+        passed = self.context.get('passed_courses', {})
+        if obj.pk in passed:
+            return passed[obj.pk]
+        return list(obj.get_passed_courses())
 
 
 class ClassSerializer(serializers.ModelSerializer):
@@ -44,11 +96,12 @@ class ProfessorSerializer(serializers.ModelSerializer):
 
 
 class TermSerializer(serializers.ModelSerializer):
-    courses = CourseSerializer(many=True, read_only=True)
-    professors = ProfessorSerializer(many=True, read_only=True)
-
     class Meta:
         model = Term
-        fields = ['academic_year', 'semester', 'courses', 'professors']
+        fields = ['academic_year', 'semester']
 
 
+class FoodSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Food
+        fields = ['id', 'name', 'price', 'meal', 'day', 'date']
@@ -1,21 +1,64 @@
 from django.urls import path
+from . import async_views
 from .views import FoodReservationView, ClassScheduleView, CourseSelectionView, ClassDeletionView, \
     StudentProfileUpdateView, CourseDetailView, TranscriptView, AttendanceView, ProfessorRatingView, \
-    ExaminationScheduleView, MessageView, TermListView, StudentDetailView
+    ExaminationScheduleView, MessageView, TermListView, StudentDetailView, GPAView, \
+    WeeklyFoodReservationView, ProfileSummaryView, StudentsWithAlifView, \
+    ReadModelStatsView, TimetableConflictView, BulkImportView, RollCallView, \
+    StudentAttendanceSummaryView, ClassAttendanceSummaryView, AbsenceLimitView, ProfessorRankingView, \
+    HonoursView, HonoursStandingView, CourseEligibilityView, ProfessorInboxView, StudentOutboxView, \
+    UnreadMessageCountView, MarkThreadReadView, StudentFeedView, SelectionWindowView, FoodMenuView, \
+    TranscriptExportView, BalanceDepositView
 
 urlpatterns = [
+    path('food/menu/', FoodMenuView.as_view(), name='food_menu'),
     path('food/reservation/<int:student_id>/<int:food_id>/', FoodReservationView.as_view(), name='food_reservation'),
+    path('food/reservation/<int:student_id>/week/', WeeklyFoodReservationView.as_view(),
+         name='weekly_food_reservation'),
+    path('food/deposit/<int:student_id>/', BalanceDepositView.as_view(), name='balance_deposit'),
     path('class/schedule/<int:student_id>/', ClassScheduleView.as_view(), name='class_schedule'),
     path('course/selection/<int:student_id>/<int:course_id>/', CourseSelectionView.as_view(), name='course_selection'),
+    path('course/selection/<int:student_id>/window/', SelectionWindowView.as_view(), name='selection_window'),
+    path('course/eligibility/<int:student_id>/', CourseEligibilityView.as_view(), name='course_eligibility'),
+    path('feed/<int:student_id>/', StudentFeedView.as_view(), name='student_feed'),
     path('class/deletion/<int:student_id>/<int:class_id>/', ClassDeletionView.as_view(), name='class_deletion'),
     path('student/profile/update/<int:student_id>/', StudentProfileUpdateView.as_view(), name='student_profile_update'),
     path('course/detail/<int:course_id>/', CourseDetailView.as_view(), name='course_detail'),
     path('transcript/<int:student_id>/', TranscriptView.as_view(), name='transcript'),
+    path('transcript/export/<int:academic_year>/', TranscriptExportView.as_view(), name='transcript_export'),
+    path('gpa/<int:student_id>/', GPAView.as_view(), name='gpa'),
     path('attendance/<int:student_id>/', AttendanceView.as_view(), name='attendance'),
+    path('attendance/rollcall/<int:class_id>/', RollCallView.as_view(), name='roll_call'),
+    path('attendance/summary/<int:student_id>/', StudentAttendanceSummaryView.as_view(),
+         name='student_attendance_summary'),
+    path('attendance/class/<int:class_id>/summary/', ClassAttendanceSummaryView.as_view(),
+         name='class_attendance_summary'),
+    path('attendance/over-limit/', AbsenceLimitView.as_view(), name='absence_limit'),
     path('professor/rating/<int:student_id>/<int:professor_id>/', ProfessorRatingView.as_view(),
          name='professor_rating'),
+    path('professor/ranking/', ProfessorRankingView.as_view(), name='professor_ranking'),
     path('examination/schedule/<int:course_id>/', ExaminationScheduleView.as_view(), name='examination_schedule'),
     path('message/send/<int:sender_id>/<int:receiver_id>/', MessageView.as_view(), name='message_send'),
+    path('message/inbox/<int:professor_id>/', ProfessorInboxView.as_view(), name='message_inbox'),
+    path('message/inbox/<int:professor_id>/unread/', UnreadMessageCountView.as_view(), name='message_unread'),
+    path('message/inbox/<int:professor_id>/read/<int:student_id>/', MarkThreadReadView.as_view(),
+         name='message_thread_read'),
+    path('message/outbox/<int:student_id>/', StudentOutboxView.as_view(), name='message_outbox'),
     path('terms/', TermListView.as_view(), name='term-list'),
+    path('students/alif/', StudentsWithAlifView.as_view(), name='students-with-alif'),
+    path('honours/<int:entry_year>/', HonoursView.as_view(), name='honours'),
+    path('honours/standing/<int:student_id>/', HonoursStandingView.as_view(), name='honours-standing'),
     path('students/<str:student_id>/', StudentDetailView.as_view(), name='student-detail'),
+    path('profiler/summary/', ProfileSummaryView.as_view(), name='profiler-summary'),
+    path('cache/stats/', ReadModelStatsView.as_view(), name='read-model-stats'),
+    path('timetable/conflicts/', TimetableConflictView.as_view(), name='timetable-conflicts'),
+    path('import/<str:kind>/', BulkImportView.as_view(), name='bulk-import'),
+
+    # async read endpoints for the ASGI application (config/asgi.py)
+    path('async/class/schedule/<int:student_id>/', async_views.class_schedule, name='async_class_schedule'),
+    path('async/transcript/<int:student_id>/', async_views.transcript, name='async_transcript'),
+    path('async/attendance/<int:student_id>/', async_views.attendance, name='async_attendance'),
+    path('async/examination/schedule/<int:course_id>/', async_views.examination_schedule,
+         name='async_examination_schedule'),
+    path('async/course/detail/<int:course_id>/', async_views.course_detail, name='async_course_detail'),
 ]
@@ -1,11 +1,21 @@
 from rest_framework.generics import UpdateAPIView, ListAPIView, RetrieveAPIView
+from app import admission, attendance as roll_calls, eligibility, exporter, feed, food as reservations, honours, \
+    importer, inbox, profiling, ratings, read_models, registration, timetable, versions
 from app.models import *
-from .serializers import CourseSerializer, StudentSerializer, ClassSerializer, TermSerializer
+from .conditional import versioned
+from .pagination import IdCursorPagination, STREAM_CHUNK_SIZE, StreamingListMixin, TimestampCursorPagination, \
+    stream_json, wants_stream
+from .serializers import CourseSerializer, StudentSerializer, ClassSerializer, TermSerializer, \
+    InboxMessageSerializer, OutboxMessageSerializer, FoodSerializer, StudentProfileSerializer
 
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.utils.dateparse import parse_date
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
+from rest_framework.permissions import IsAdminUser
 
 
 class FoodReservationView(APIView):
@@ -13,12 +23,10 @@ class FoodReservationView(APIView):
         student = get_object_or_404(Student, student_id=student_id)
         food = get_object_or_404(Food, id=food_id)
 
-        if food in student.foodreservation_set.all():
-            return Response({"message": "Food already reserved by the student"}, status=status.HTTP_400_BAD_REQUEST)
-
-        # Create a FoodReservation object
-        reservation = FoodReservation(student=student, food=food, is_taken=False)
-        reservation.save()
+        try:
+            reservations.reserve(student, food)
+        except reservations.ReservationError as e:
+            return Response({"message": e.message}, status=status.HTTP_400_BAD_REQUEST)
 
         return Response({"message": "Food reserved successfully"}, status=status.HTTP_201_CREATED)
 
@@ -26,43 +34,104 @@ class FoodReservationView(APIView):
         student = get_object_or_404(Student, student_id=student_id)
         food = get_object_or_404(Food, id=food_id)
 
-        reservation = get_object_or_404(FoodReservation, student=student, food=food)
+        reservation = get_object_or_404(FoodReservation.objects.select_related('food'), student=student, food=food)
 
         reservation.delete()
 
         return Response({"message": "Food reservation deleted successfully"}, status=status.HTTP_204_NO_CONTENT)
 
 
+# رزرو غذای کل هفته
+class WeeklyFoodReservationView(APIView):
+    def post(self, request, student_id):
+        student = get_object_or_404(Student, student_id=student_id)
+        start_date = parse_date(request.data.get('start_date') or '')
+        if start_date is None:
+            return Response({"message": "start_date (YYYY-MM-DD) is required"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            reserved = reservations.reserve_week(student, start_date, meal=request.data.get('meal'))
+        except reservations.ReservationError as e:
+            return Response({"message": e.message}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            "message": f"{len(reserved)} foods reserved successfully",
+            "foods": [reservation.food_id for reservation in reserved],
+        }, status=status.HTTP_201_CREATED)
+
+
+# شارژ حساب دانشجو
+class BalanceDepositView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def post(self, request, student_id):
+        student = get_object_or_404(Student, student_id=student_id)
+        try:
+            amount = int(request.data.get('amount'))
+        except (TypeError, ValueError):
+            amount = 0
+        if amount <= 0:
+            return Response({"message": "amount must be a positive whole number"}, status=status.HTTP_400_BAD_REQUEST)
+
+        reservations.deposit(student.pk, amount)
+
+        return Response({
+            "message": "Balance charged successfully",
+            "balance": Student.objects.filter(pk=student.pk).values_list('balance', flat=True).get(),
+        }, status=status.HTTP_201_CREATED)
+
+
+# منوی غذا
+@versioned(lambda: [versions.menu()])
+class FoodMenuView(APIView):
+    def get(self, request):
+        foods = Food.objects.order_by('date', 'pk')
+        meal = request.query_params.get('meal')
+        if meal:
+            foods = foods.filter(meal=meal)
+        day = request.query_params.get('day')
+        if day:
+            foods = foods.filter(day=day)
+
+        return Response(FoodSerializer(foods, many=True).data, status=status.HTTP_200_OK)
+
+
 # مشاهده برنامه کلاسی
 class ClassScheduleView(APIView):
     def get(self, request, student_id):
         student = get_object_or_404(Student, student_id=student_id)
-        courses = student.courses_taken.all()
-        class_schedule = []
-
-        for course in courses:
-            class_schedule.append({
-                'course_code': course.code,
-                'course_title': course.title,
-                'professor': f'{course.professor.first_name} {course.professor.last_name}',
-                'class_number': course.class_set.first().room.name,
-                # 
-            })
+        class_schedule = read_models.get_class_schedule(student)
 
         return Response(class_schedule, status=status.HTTP_200_OK)
 
 
+def admission_refused(error):
+    if isinstance(error, admission.Queued):
+        response = Response({"message": error.message, "retry_after": error.retry_after},
+                            status=status.HTTP_429_TOO_MANY_REQUESTS)
+        response['Retry-After'] = str(error.retry_after)
+        return response
+
+    response = Response({"message": error.message, "opens_at": error.opens_at, "closes_at": error.closes_at},
+                        status=status.HTTP_403_FORBIDDEN)
+    if error.opens_at is not None and error.opens_at > timezone.now():
+        response['Retry-After'] = str(int((error.opens_at - timezone.now()).total_seconds()) + 1)
+    return response
+
+
 # انتخاب واحد
 class CourseSelectionView(APIView):
     def post(self, request, student_id, course_id):
         student = get_object_or_404(Student, student_id=student_id)
         course = get_object_or_404(Course, id=course_id)
 
-        if course in student.courses_taken.all():
-            return Response({"message": "Course already selected"}, status=status.HTTP_400_BAD_REQUEST)
-
-        # else add course
-        course.students.add(student)
+        try:
+            with admission.admitted(student):
+                registration.register(student, course)
+        except admission.AdmissionError as e:
+            return admission_refused(e)
+        except registration.RegistrationError as e:
+            return Response({"message": e.message}, status=status.HTTP_400_BAD_REQUEST)
 
         return Response({"message": "Course selected successfully"}, status=status.HTTP_201_CREATED)
 
@@ -70,45 +139,122 @@ class CourseSelectionView(APIView):
         student = get_object_or_404(Student, student_id=student_id)
         course = get_object_or_404(Course, id=course_id)
 
-        if course not in student.courses_taken.all():
-            return Response({"message": "Course not selected by the student"}, status=status.HTTP_400_BAD_REQUEST)
-
-        # else remove course
-        course.students.remove(student)
+        try:
+            with admission.admitted(student):
+                registration.deregister(student, course)
+        except admission.AdmissionError as e:
+            return admission_refused(e)
+        except registration.RegistrationError as e:
+            return Response({"message": e.message}, status=status.HTTP_400_BAD_REQUEST)
 
         return Response({"message": "Course deselected successfully"}, status=status.HTTP_204_NO_CONTENT)
 
 
+# زمان انتخاب واحد دانشجو
+class SelectionWindowView(APIView):
+    def get(self, request, student_id):
+        student = get_object_or_404(Student, student_id=student_id)
+        try:
+            admission.check_window(student)
+        except admission.SelectionClosed as e:
+            if e.opens_at is None:
+                return Response({'open': False, 'opens_at': None, 'closes_at': None, 'message': e.message},
+                                status=status.HTTP_200_OK)
+        bounds = admission.window(student)
+        if bounds is None:
+            return Response({'open': True, 'opens_at': None, 'closes_at': None}, status=status.HTTP_200_OK)
+
+        opens_at, closes_at = bounds
+        return Response({
+            'open': opens_at <= timezone.now() < closes_at,
+            'opens_at': opens_at,
+            'closes_at': closes_at,
+        }, status=status.HTTP_200_OK)
+
+
+# درس هایی که دانشجو پیش نیازشان را گذرانده
+class CourseEligibilityView(APIView):
+    pagination_class = IdCursorPagination
+
+    def get(self, request, student_id):
+        student = get_object_or_404(Student, student_id=student_id)
+
+        paginator = self.pagination_class()
+        page = paginator.paginate_queryset(Course.objects.all(), request, view=self)
+        missing = eligibility.get_requirements().check(
+            [course.pk for course in page], read_models.get_passed_courses(student),
+        )
+
+        return paginator.get_paginated_response([{
+            'id': course.pk,
+            'code': course.code,
+            'title': course.title,
+            'eligible': not missing[course.pk],
+            'missing_prerequisites': missing[course.pk],
+        } for course in page])
+
+
+# اطلاعیه ها و مهلت تمرین های درس های دانشجو
+class StudentFeedView(APIView):
+    max_limit = 200
+
+    def get(self, request, student_id):
+        student = get_object_or_404(Student, student_id=student_id)
+        try:
+            since = int(request.query_params['since']) if 'since' in request.query_params else None
+            before = int(request.query_params['before']) if 'before' in request.query_params else None
+            limit = int(request.query_params.get('limit', feed.PAGE_SIZE))
+        except ValueError:
+            return Response({"message": "since, before and limit must be integers"},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        limit = min(max(limit, 1), self.max_limit)
+        events = feed.feed(student, since, before, limit)
+        if since is not None:
+            # polling: hand back the newest id seen so the next poll only gets what came after it
+            cursor = events[-1]['id'] if events else since
+            older = None
+        else:
+            cursor = events[0]['id'] if events else 0
+            older = events[-1]['id'] if len(events) == limit else None
+
+        return Response({
+            'results': events,
+            'cursor': cursor,
+            'more': len(events) == limit,
+            'before': older,
+        }, status=status.HTTP_200_OK)
+
+
 # حذف تکدرس در زمان مشخص
 class ClassDeletionView(APIView):
     def delete(self, request, student_id, class_id):
         student = get_object_or_404(Student, student_id=student_id)
-        class_obj = get_object_or_404(Class, id=class_id)
+        class_obj = get_object_or_404(Class.objects.select_related('course'), id=class_id)
 
-        if class_obj.course not in student.courses_taken.all():
+        try:
+            registration.deregister(student, class_obj.course)
+        except registration.NotRegistered:
             return Response({"message": "Student is not enrolled in the course"}, status=status.HTTP_400_BAD_REQUEST)
 
-        # remove student from class
-        class_obj.students.remove(student)
-
         return Response({"message": "Class deleted successfully"}, status=status.HTTP_204_NO_CONTENT)
 
 
 # ویرایش مشخصات فردی
-
 class StudentProfileUpdateView(UpdateAPIView):
     queryset = Student.objects.all()
-    serializer_class = StudentSerializer
+    serializer_class = StudentProfileSerializer
     lookup_field = 'student_id'
 
 
 # مشاهده هر واحد درسی
+@versioned(lambda course_id: [versions.course(course_id)])
 class CourseDetailView(APIView):
     def get(self, request, course_id):
-        course = get_object_or_404(Course, id=course_id)
+        course = get_object_or_404(Course.objects.select_related('professor'), id=course_id)
         class_list = []
 
-        for class_obj in course.class_set.all():
+        for class_obj in course.class_set.select_related('room'):
             class_list.append({
                 'class_number': class_obj.room.name,
                 'professor': f'{class_obj.course.professor.first_name} {class_obj.course.professor.last_name}',
@@ -123,34 +269,172 @@ class CourseDetailView(APIView):
 class TranscriptView(APIView):
     def get(self, request, student_id):
         student = get_object_or_404(Student, student_id=student_id)
-        grades = Grade.objects.filter(student=student)
-        transcript = []
-
-        for grade in grades:
-            transcript.append({
-                'course_code': grade.course.code,
-                'course_title': grade.course.title,
-                'grade': grade.grade
-            })
+        transcript = read_models.get_transcript(student)
 
         return Response(transcript, status=status.HTTP_200_OK)
 
 
+# خروجی کارنامه‌های یک ورودی
+class TranscriptExportView(APIView):
+    """``?output=csv|jsonl`` (csv by default) and ``?gzip=1``; the file is streamed as it is read."""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, academic_year):
+        try:
+            export = exporter.TranscriptExport(academic_year, request.query_params.get('output', 'csv'),
+                                               compress=request.query_params.get('gzip') in ('1', 'true'))
+        except exporter.ExportFailed as e:
+            return Response({"message": e.message}, status=status.HTTP_400_BAD_REQUEST)
+        if not exporter.cohort_exists(academic_year):
+            return Response({"message": f"No students entered in {academic_year}"}, status=status.HTTP_404_NOT_FOUND)
+
+        response = StreamingHttpResponse(export, content_type=export.content_type)
+        response['Content-Disposition'] = f'attachment; filename="{export.filename}"'
+        return response
+
+
+# معدل کل و ترمی
+class GPAView(APIView):
+    def get(self, request, student_id):
+        student = get_object_or_404(Student, student_id=student_id)
+        aggregates = student.grade_aggregates.select_related('term')
+        overall = {'gpa': 0, 'total_credits': 0}
+        terms = []
+
+        for aggregate in aggregates:
+            if aggregate.term is None:
+                overall = {'gpa': aggregate.gpa, 'total_credits': aggregate.total_credits}
+            else:
+                terms.append({
+                    'term': str(aggregate.term),
+                    'gpa': aggregate.gpa,
+                    'total_credits': aggregate.total_credits,
+                })
+
+        return Response({**overall, 'terms': terms}, status=status.HTTP_200_OK)
+
+
 # مشاهده حضور و غیاب های خود 
 class AttendanceView(APIView):
+    pagination_class = IdCursorPagination
+
     def get(self, request, student_id):
         student = get_object_or_404(Student, student_id=student_id)
-        attendances = Attendance.objects.filter(student=student)
-        attendance_list = []
+        attendances = Attendance.objects.filter(student=student).select_related('class_num__room')
+
+        if wants_stream(request):
+            rows = attendances.order_by('pk').iterator(chunk_size=STREAM_CHUNK_SIZE)
+            return stream_json(self.serialize(attendance) for attendance in rows)
+
+        paginator = self.pagination_class()
+        page = paginator.paginate_queryset(attendances, request, view=self)
+        attendance_list = [self.serialize(attendance) for attendance in page]
+
+        return paginator.get_paginated_response(attendance_list)
+
+    def serialize(self, attendance):
+        return {
+            'class_number': attendance.class_num.room.name,
+            'date': attendance.date,
+            'is_present': attendance.is_present
+        }
 
-        for attendance in attendances:
-            attendance_list.append({
-                'class_number': attendance.class_num.room.name,
-                'date': attendance.date,
-                'is_present': attendance.is_present
-            })
 
-        return Response(attendance_list, status=status.HTTP_200_OK)
+# خلاصه حضور و غیاب دانشجو در هر کلاس
+class StudentAttendanceSummaryView(APIView):
+    def get(self, request, student_id):
+        student = get_object_or_404(Student, student_id=student_id)
+        summaries = AttendanceSummary.objects.filter(student=student) \
+            .select_related('class_num__room', 'class_num__course').order_by('class_num_id')
+
+        return Response([{
+            'class_id': summary.class_num_id,
+            'course_code': summary.class_num.course.code,
+            'class_number': summary.class_num.room.name,
+            'present': summary.present,
+            'absent': summary.absent,
+            'absence_percentage': summary.absence_percentage,
+        } for summary in summaries], status=status.HTTP_200_OK)
+
+
+# خلاصه حضور و غیاب یک کلاس
+class ClassAttendanceSummaryView(APIView):
+    def get(self, request, class_id):
+        class_obj = get_object_or_404(Class.objects.select_related('course'), id=class_id)
+        summaries = AttendanceSummary.objects.filter(class_num=class_obj).select_related('student') \
+            .order_by('student_id')
+
+        students = [{
+            'student_id': summary.student.student_id,
+            'present': summary.present,
+            'absent': summary.absent,
+            'absence_percentage': summary.absence_percentage,
+        } for summary in summaries]
+        present = sum(row['present'] for row in students)
+        absent = sum(row['absent'] for row in students)
+
+        return Response({
+            'class_id': class_obj.pk,
+            'course_code': class_obj.course.code,
+            'absence_percentage': round(absent * 100 / (present + absent), 2) if present + absent else 0,
+            'students': students,
+        }, status=status.HTTP_200_OK)
+
+
+# دانشجویان با غیبت بیش از حد مجاز
+class AbsenceLimitView(APIView):
+    pagination_class = IdCursorPagination
+
+    def get(self, request):
+        try:
+            limit = float(request.query_params['limit']) if 'limit' in request.query_params else None
+        except ValueError:
+            return Response({"message": "limit must be a percentage"}, status=status.HTTP_400_BAD_REQUEST)
+
+        class_id = request.query_params.get('class_id')
+        if class_id is not None and not class_id.isdigit():
+            return Response({"message": "class_id must be a class id"}, status=status.HTTP_400_BAD_REQUEST)
+
+        summaries = roll_calls.over_limit(limit).select_related('student', 'class_num__course')
+        if class_id is not None:
+            summaries = summaries.filter(class_num_id=class_id)
+
+        paginator = self.pagination_class()
+        page = paginator.paginate_queryset(summaries, request, view=self)
+
+        return paginator.get_paginated_response([{
+            'student_id': summary.student.student_id,
+            'class_id': summary.class_num_id,
+            'course_code': summary.class_num.course.code,
+            'present': summary.present,
+            'absent': summary.absent,
+            'absence_percentage': summary.absence_percentage,
+        } for summary in page])
+
+
+# حضور و غیاب یک جلسه کلاس
+class RollCallView(APIView):
+    def post(self, request, class_id):
+        class_obj = get_object_or_404(Class, id=class_id)
+        try:
+            date = parse_date(str(request.data['date'])) if request.data.get('date') else timezone.localdate()
+        except ValueError:
+            date = None
+        present = request.data.get('present')
+        absent = request.data.get('absent')
+        if date is None:
+            return Response({"message": "date must be YYYY-MM-DD"}, status=status.HTTP_400_BAD_REQUEST)
+        if not isinstance(present, list) or not isinstance(absent, (list, type(None))):
+            return Response({"message": "present (and optionally absent) must be lists of student ids"},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            recorded = roll_calls.record_roll_call(class_obj, date, present, absent)
+        except roll_calls.RollCallError as e:
+            return Response({"message": e.message, "student_ids": e.student_ids}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({"message": "Attendance recorded successfully", "recorded": recorded},
+                        status=status.HTTP_201_CREATED)
 
 
 # ارزشیابی اساتید
@@ -158,20 +442,35 @@ class ProfessorRatingView(APIView):
     def post(self, request, student_id, professor_id):
         student = get_object_or_404(Student, student_id=student_id)
         professor = get_object_or_404(Professor, professor_id=professor_id)
-        rating = request.data.get('rating')
 
-        professor_rating = ProfessorRating.objects.get_or_create(student=student, professor=professor)
-        professor_rating.rating = rating
-        professor_rating.save()
+        try:
+            _, created = ratings.rate(student, professor, request.data.get('rating'))
+        except ratings.RatingError as e:
+            return Response({"message": e.message}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({"message": "Professor rating saved successfully"},
+                        status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
 
-        return Response({"message": "Professor rating saved successfully"}, status=status.HTTP_201_CREATED)
+
+# رتبه بندی اساتید هر دانشکده
+class ProfessorRankingView(APIView):
+    def get(self, request):
+        try:
+            top = int(request.query_params.get('top', 10))
+            min_ratings = int(request.query_params.get('min_ratings', 1))
+        except ValueError:
+            return Response({"message": "top and min_ratings must be integers"}, status=status.HTTP_400_BAD_REQUEST)
+
+        ranking = ratings.get_ranking(request.query_params.get('department'), min_ratings)
+        return Response(ranking[:max(top, 0)], status=status.HTTP_200_OK)
 
 
 # مشاهده برنامه امتحانی
+@versioned(lambda course_id: [versions.exams(course_id)])
 class ExaminationScheduleView(APIView):
     def get(self, request, course_id):
         course = get_object_or_404(Course, id=course_id)
-        exam_schedule = ExaminationSchedule.objects.filter(course=course)
+        exam_schedule = ExaminationSchedule.objects.filter(course=course).select_related('room')
         schedule_list = []
 
         for exam in exam_schedule:
@@ -189,17 +488,58 @@ class MessageView(APIView):
     def post(self, request, sender_id, receiver_id):
         sender = get_object_or_404(Student, id=sender_id)
         receiver = get_object_or_404(Professor, id=receiver_id)
-        message_text = request.data.get('message_text')
 
-        message = Messages(sender=sender, receiver=receiver, message_text=message_text)
-        message.save()
+        try:
+            message = inbox.send(sender, receiver, request.data.get('subject'), request.data.get('content'))
+        except inbox.MessageError as e:
+            return Response({"message": e.message}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({"message": "Message sent successfully", "id": message.pk}, status=status.HTTP_201_CREATED)
 
-        return Response({"message": "Message sent successfully"}, status=status.HTTP_201_CREATED)
+
+# صندوق پیام های استاد
+class ProfessorInboxView(ListAPIView):
+    serializer_class = InboxMessageSerializer
+    pagination_class = TimestampCursorPagination
+
+    def get_queryset(self):
+        professor = get_object_or_404(Professor, professor_id=self.kwargs['professor_id'])
+        return inbox.inbox(professor, unread=self.request.query_params.get('unread') in ('1', 'true'))
+
+
+# پیام های ارسالی دانشجو
+class StudentOutboxView(ListAPIView):
+    serializer_class = OutboxMessageSerializer
+    pagination_class = TimestampCursorPagination
+
+    def get_queryset(self):
+        student = get_object_or_404(Student, student_id=self.kwargs['student_id'])
+        return inbox.outbox(student)
+
+
+# تعداد پیام های خوانده نشده استاد
+class UnreadMessageCountView(APIView):
+    def get(self, request, professor_id):
+        unread = Professor.objects.filter(professor_id=professor_id).values_list('unread_messages', flat=True).first()
+        if unread is None:
+            return Response({"message": "Professor not found"}, status=status.HTTP_404_NOT_FOUND)
+        return Response({'professor_id': professor_id, 'unread': unread}, status=status.HTTP_200_OK)
+
+
+# خوانده شدن همه پیام های یک دانشجو به استاد
+class MarkThreadReadView(APIView):
+    def post(self, request, professor_id, student_id):
+        professor = get_object_or_404(Professor, professor_id=professor_id)
+        student = get_object_or_404(Student, student_id=student_id)
+        marked = inbox.mark_thread_read(professor, student)
+        return Response({'marked': marked}, status=status.HTTP_200_OK)
 
 
-class TermListView(ListAPIView):
+@versioned(lambda: [versions.terms()])
+class TermListView(StreamingListMixin, ListAPIView):
     queryset = Term.objects.all()
     serializer_class = TermSerializer
+    pagination_class = IdCursorPagination
 
 
 class StudentDetailView(RetrieveAPIView):
@@ -209,13 +549,117 @@ class StudentDetailView(RetrieveAPIView):
     lookup_url_kwarg = 'student_id'
 
 
-class StudentsWithAlifView(ListAPIView):
+class StudentsWithAlifView(StreamingListMixin, ListAPIView):
     serializer_class = StudentSerializer
+    pagination_class = IdCursorPagination
 
     def get_queryset(self):
         year_of_entry = self.request.query_params.get('year_of_entry', None)
-        if year_of_entry is not None:
-            queryset = Student.objects.filter(grade__grade__gt=17, term__academic_year=year_of_entry)
+        if year_of_entry is not None and year_of_entry.isdigit():
+            # one row per student in the honours index, so no join over grades and no distinct
+            honours_students = honours.above(int(year_of_entry)).values('student_id')
+            queryset = Student.objects.filter(pk__in=honours_students).prefetch_related('courses')
         else:
             queryset = Student.objects.none()
         return queryset
+
+
+# رتبه بندی دانشجویان هر ورودی
+class HonoursView(APIView):
+    def get(self, request, entry_year):
+        try:
+            top = int(request.query_params.get('top', 10))
+            min_gpa = float(request.query_params['min_gpa']) if 'min_gpa' in request.query_params else None
+        except ValueError:
+            return Response({"message": "top must be an integer and min_gpa a number"},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        if min_gpa is None:
+            entries = honours.top(entry_year, max(top, 0))
+        else:
+            entries = honours.above(entry_year, min_gpa).select_related('student')[:max(top, 0)]
+
+        return Response([{
+            'rank': rank,
+            'student_id': entry.student.student_id,
+            'first_name': entry.student.first_name,
+            'last_name': entry.student.last_name,
+            'gpa': round(entry.gpa, 2),
+        } for rank, entry in enumerate(entries, 1)], status=status.HTTP_200_OK)
+
+
+# جایگاه دانشجو در میان هم ورودی ها
+class HonoursStandingView(APIView):
+    def get(self, request, student_id):
+        entry = get_object_or_404(HonoursEntry.objects.select_related('student'), student__student_id=student_id)
+        rank, percentile = honours.standing(entry)
+
+        return Response({
+            'student_id': entry.student.student_id,
+            'entry_year': entry.entry_year,
+            'gpa': round(entry.gpa, 2),
+            'rank': rank,
+            'percentile': percentile,
+        }, status=status.HTTP_200_OK)
+
+
+class ProfileSummaryView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(profiling.store.summary(), status=status.HTTP_200_OK)
+
+    def delete(self, request):
+        profiling.store.reset()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class ReadModelStatsView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(read_models.stats(), status=status.HTTP_200_OK)
+
+    def delete(self, request):
+        read_models.reset_stats()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+# تداخل کلاس ها
+class TimetableConflictView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        index = timetable.get_index()
+        enrolments = Course.students.through.objects.order_by('student_id') \
+            .values_list('student_id', 'course_id').iterator(chunk_size=5000)
+
+        return Response({
+            'rooms': [
+                {'room': room_id, 'day': day_id, 'classes': [first, second]}
+                for room_id, day_id, first, second in index.audit_rooms()
+            ],
+            'students': [
+                {'student': student_id, 'courses': [first, second]}
+                for student_id, first, second in index.audit_students(enrolments)
+            ],
+        }, status=status.HTTP_200_OK)
+
+
+# ورود گروهی دانشجو، درس، ثبت نام و نمره
+class BulkImportView(APIView):
+    """``?input=csv|jsonl`` overrides the format guessed from the file name (``?format=`` is taken by DRF)."""
+    permission_classes = [IsAdminUser]
+
+    def post(self, request, kind):
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({"message": "Upload the rows as the 'file' field"}, status=status.HTTP_400_BAD_REQUEST)
+
+        fmt = request.query_params.get('input') or importer.format_of(upload.name)
+        try:
+            stats = importer.import_stream(kind, importer.text_stream(upload), fmt)
+        except importer.ImportFailed as e:
+            return Response({"message": e.message}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(stats, status=status.HTTP_200_OK)
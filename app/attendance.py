@@ -0,0 +1,147 @@
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Q
+
+from app.models import Attendance, AttendanceSummary, Class, Course
+
+Enrolment = Course.students.through
+
+
+class RollCallError(Exception):
+    message = 'Roll call failed'
+
+    def __init__(self, message=None, student_ids=None):
+        super().__init__(message or self.message)
+        self.message = message or self.message
+        self.student_ids = student_ids or []
+
+
+class NotEnrolled(RollCallError):
+    message = 'Some students are not enrolled in the course of this class'
+
+
+class ContradictoryRollCall(RollCallError):
+    message = 'Some students are marked both present and absent'
+
+
+def record_roll_call(class_obj, date, present, absent=None):
+    """
+    Record one class meeting's attendance and return the number of rows written.
+
+    ``present`` and ``absent`` hold public ``Student.student_id`` values; when ``absent`` is None
+    every other enrolled student is marked absent. The ids are checked against the course's
+    enrolment with one query and written with one upsert on (student, class_num, date), so
+    submitting the same roll call twice leaves a single, corrected record per student. The class
+    row is locked for the write, so concurrent roll calls of one meeting count once.
+    """
+    present = set(map(str, present))
+    absent = set(map(str, absent)) if absent is not None else None
+
+    if absent is not None and present & absent:
+        raise ContradictoryRollCall(student_ids=sorted(present & absent))
+
+    enrolled = dict(Enrolment.objects.filter(course_id=class_obj.course_id)
+                    .values_list('student__student_id', 'student_id'))
+    unknown = (present | (absent or set())) - enrolled.keys()
+    if unknown:
+        raise NotEnrolled(student_ids=sorted(unknown))
+
+    if absent is None:
+        absent = enrolled.keys() - present
+
+    rows = [
+        Attendance(student_id=enrolled[student_id], class_num_id=class_obj.pk, date=date, is_present=is_present)
+        for student_ids, is_present in ((present, True), (absent, False))
+        for student_id in student_ids
+    ]
+    with transaction.atomic():
+        # roll calls of one class take turns: rows that do not exist yet cannot be locked, and two
+        # identical first roll calls would both add to the summaries against an empty meeting
+        Class.objects.select_for_update().filter(pk=class_obj.pk).values_list('pk', flat=True).first()
+        # only the written students' records change; a student who has left the course keeps theirs
+        previous = Attendance.objects.filter(class_num_id=class_obj.pk, date=date,
+                                             student_id__in=[row.student_id for row in rows]) \
+            .values('student_id', 'class_num_id', 'is_present')
+        deltas = record_deltas(previous, map(record_state, rows))
+        Attendance.objects.bulk_create(rows, update_conflicts=True, unique_fields=['student', 'class_num', 'date'],
+                                       update_fields=['is_present'])
+        summaries_changed(deltas)
+    return len(rows)
+
+
+def record_state(record):
+    """The part of an attendance record that feeds the summaries, in the shape read back with ``values()``."""
+    return {'student_id': record.student_id, 'class_num_id': record.class_num_id, 'is_present': record.is_present}
+
+
+def stored_state(record_pk):
+    """
+    The stored record's state, or None, with the record row locked until the transaction ends.
+
+    Two concurrent changes of one record would otherwise both move the summaries away from the
+    same previous state.
+    """
+    return Attendance.objects.select_for_update().filter(pk=record_pk) \
+        .values('student_id', 'class_num_id', 'is_present').first()
+
+
+def record_deltas(previous, current):
+    """
+    Return the ``{(student_id, class_id): (present, absent)}`` changes of replacing the ``previous``
+    record states by the ``current`` ones; either may contain None for a missing record.
+    """
+    deltas = defaultdict(lambda: [0, 0])
+    for states, sign in ((previous, -1), (current, 1)):
+        for state in states:
+            if state:
+                deltas[(state['student_id'], state['class_num_id'])][0 if state['is_present'] else 1] += sign
+    return {key: tuple(delta) for key, delta in deltas.items() if delta != [0, 0]}
+
+
+def summaries_changed(deltas):
+    """
+    Apply summary ``deltas`` with ``F()`` updates.
+
+    Rows sharing the same change are moved by a single UPDATE, so a whole roll call costs one
+    insert of the missing summary rows and one UPDATE per distinct change (at most four).
+    """
+    if not deltas:
+        return
+
+    by_change = defaultdict(lambda: defaultdict(list))
+    for (student_id, class_id), change in deltas.items():
+        by_change[change][class_id].append(student_id)
+
+    # no savepoint: a failed update must roll back the attendance write that caused it
+    with transaction.atomic(savepoint=False):
+        AttendanceSummary.objects.bulk_create(
+            [AttendanceSummary(student_id=student_id, class_num_id=class_id) for student_id, class_id in deltas],
+            ignore_conflicts=True,
+        )
+        for (present, absent), classes in by_change.items():
+            rows = Q()
+            for class_id, student_ids in classes.items():
+                rows |= Q(class_num_id=class_id, student_id__in=student_ids)
+            AttendanceSummary.objects.filter(rows).update(present=F('present') + present, absent=F('absent') + absent)
+
+
+def rebuild_summaries(batch_size=1000):
+    """Recompute every summary from the attendance records in one set-based pass."""
+    counts = Attendance.objects.values('student_id', 'class_num_id').annotate(
+        present=Count('pk', filter=Q(is_present=True)),
+        absent=Count('pk', filter=Q(is_present=False)),
+    ).order_by()
+
+    with transaction.atomic():
+        AttendanceSummary.objects.all().delete()
+        rows = [AttendanceSummary(**row) for row in counts]
+        AttendanceSummary.objects.bulk_create(rows, batch_size=batch_size)
+    return len(rows)
+
+
+def over_limit(limit=None):
+    """Summaries whose absences exceed ``limit`` percent (``ATTENDANCE_ABSENCE_LIMIT`` by default) of the meetings."""
+    limit = settings.ATTENDANCE_ABSENCE_LIMIT if limit is None else limit
+    return AttendanceSummary.objects.filter(absent__gt=(F('present') + F('absent')) * (limit / 100))
@@ -0,0 +1,368 @@
+import random
+import time
+from datetime import date, datetime, time as clock, timedelta, timezone
+from decimal import Decimal
+from itertools import accumulate, islice
+
+from django.db import transaction
+
+from app import aggregates, attendance, exams, feed, inbox, ratings, registration, standing, versions
+from app.models import Announcement, Assignment, Attendance, BalanceTransaction, Class, Course, \
+    CourseRegistration, Day, Department, ExaminationSchedule, Food, FoodReservation, Grade, Messages, Professor, \
+    Prerequisite, ProfessorRating, Room, Student, StudentCourse, Term
+
+DEFAULT_VOLUMES = {
+    'terms': 8,
+    'departments': 10,
+    'professors': 300,
+    'rooms': 150,
+    'courses': 1000,
+    'students': 10000,
+    'courses_per_student': 6,
+    'grades': 500000,
+    'attendance': 100000,
+    'food_days': 14,
+    'reservations': 50000,
+    'ratings': 20000,
+    'announcements': 3000,
+    'assignments': 5000,
+    'messages': 10000,
+}
+
+# volumes that grow with ``--scale``; the others describe the shape of the university
+SCALABLE = {'professors', 'rooms', 'courses', 'students', 'grades', 'attendance', 'reservations', 'ratings',
+            'announcements', 'assignments', 'messages'}
+
+DEPARTMENTS = ['Computer', 'Electrical', 'Mechanical', 'Civil', 'Mathematics', 'Physics', 'Chemistry',
+               'Chemical', 'Industrial', 'Materials', 'Statistics', 'Economics']
+FIRST_NAMES = ['Ali', 'Mohammad', 'Reza', 'Hossein', 'Mahdi', 'Amir', 'Sara', 'Zahra', 'Fatemeh', 'Maryam',
+               'Narges', 'Hamid', 'Nazanin', 'Parisa', 'Kian', 'Yasaman']
+LAST_NAMES = ['Ahmadi', 'Hosseini', 'Mohammadi', 'Rezaei', 'Karimi', 'Moradi', 'Jafari', 'Rahimi', 'Hashemi',
+              'Kazemi', 'Sadeghi', 'Ebrahimi', 'Oshkooh', 'Azizi', 'Najafi', 'Ghasemi']
+FOODS = {
+    'breakfast': ['Bread and cheese', 'Omelette', 'Haleem', 'Adasi'],
+    'lunch': ['Chelo kabab', 'Ghormeh sabzi', 'Gheymeh', 'Zereshk polo', 'Fesenjan'],
+    'dinner': ['Kotlet', 'Ash reshteh', 'Macaroni', 'Kashk bademjan'],
+}
+TIME_SLOTS = [(8, 10), (10, 12), (13, 15), (15, 17), (17, 19)]
+WEEK_DAYS = [name for name, _ in Day._meta.get_field('name').choices]
+
+
+def scaled(volumes, scale):
+    return {key: max(1, int(value * scale)) if key in SCALABLE else value for key, value in volumes.items()}
+
+
+class DatasetGenerator:
+    """
+    Deterministic synthetic university, written model by model with batched ``bulk_create``.
+
+    Course popularity follows a Pareto curve (a few crowded courses, a long tail of small ones),
+    grades follow a per-course normal curve and rooms are chosen to fit each course's enrolment.
+    Derived data (seat counters, GPA aggregates, attendance and rating summaries, exam seats) is rebuilt
+    once at the end.
+    """
+
+    def __init__(self, seed=1402, batch_size=5000, log=None, **volumes):
+        self.rng = random.Random(seed)
+        self.batch_size = batch_size
+        self.log = log or (lambda message: None)
+        self.volumes = {**DEFAULT_VOLUMES, **{k: v for k, v in volumes.items() if v is not None}}
+        self.counts = {}
+
+    def generate(self):
+        started = time.perf_counter()
+        with transaction.atomic():
+            for step in (self.terms, self.days, self.professors, self.departments, self.courses, self.prerequisites,
+                         self.students, self.rooms_and_classes, self.registrations, self.grades, self.attendance,
+                         self.foods, self.ratings, self.course_feed, self.messages, self.exam_templates):
+                step()
+            self.derived_data()
+        self.log(f'generated {sum(self.counts.values())} rows in {time.perf_counter() - started:.1f}s')
+        return self.counts
+
+    def insert(self, model, rows, keep=True):
+        """Insert ``rows`` in batches without materialising them all; return the saved objects if ``keep``."""
+        started = time.perf_counter()
+        rows = iter(rows)
+        saved = []
+        total = 0
+        while batch := list(islice(rows, self.batch_size)):
+            created = model.objects.bulk_create(batch)
+            total += len(created)
+            if keep:
+                saved.extend(created)
+
+        elapsed = time.perf_counter() - started
+        name = model._meta.label
+        self.counts[name] = self.counts.get(name, 0) + total
+        self.log(f'{name:<26}{total:>10} rows  {total / elapsed if elapsed else 0:>10.0f} rows/s')
+        return saved
+
+    def person(self):
+        return self.rng.choice(FIRST_NAMES), self.rng.choice(LAST_NAMES)
+
+    def terms(self):
+        rows = []
+        year = 1403 - (self.volumes['terms'] + 1) // 2
+        while len(rows) < self.volumes['terms']:
+            for semester in ('fall', 'spring'):
+                if len(rows) < self.volumes['terms']:
+                    rows.append(Term(academic_year=year, semester=semester))
+            year += 1
+        self.term_rows = self.insert(Term, rows)
+
+    def days(self):
+        self.day_rows = self.insert(Day, (Day(name=name) for name in WEEK_DAYS))
+
+    def professors(self):
+        self.department_names = DEPARTMENTS[:self.volumes['departments']] or DEPARTMENTS[:1]
+
+        def rows():
+            for i in range(self.volumes['professors']):
+                first_name, last_name = self.person()
+                yield Professor(first_name=first_name, last_name=last_name, professor_id=f'9{i:05d}',
+                                department=self.rng.choice(self.department_names))
+
+        self.professor_rows = self.insert(Professor, rows())
+
+    def departments(self):
+        heads = {}
+        for professor in self.professor_rows:
+            heads.setdefault(professor.department, professor)
+        opens = date(2024, 1, 20)
+        self.department_rows = self.insert(Department, (
+            Department(name=name, head=heads.get(name), course_selection_date=opens + timedelta(days=i % 3))
+            for i, name in enumerate(self.department_names)
+        ))
+
+    def courses(self):
+        self.course_rows = self.insert(Course, (
+            Course(code=f'C{i:05d}', title=f'{self.rng.choice(self.department_names)} {i}',
+                   professor=self.rng.choice(self.professor_rows),
+                   credits=self.rng.choices([1, 2, 3, 4], weights=[1, 3, 10, 2])[0])
+            for i in range(self.volumes['courses'])
+        ))
+        self.popularity = [self.rng.paretovariate(1.3) for _ in self.course_rows]
+        # per-course grade curve: harder courses have a lower mean
+        self.curves = [(self.rng.gauss(14, 1.5), self.rng.uniform(2, 3.5)) for _ in self.course_rows]
+
+    def prerequisites(self):
+        # about a third of the courses need one or two earlier courses, some with an alternative
+        def rows():
+            for index, course in enumerate(self.course_rows[5:], 5):
+                if self.rng.random() >= 0.3:
+                    continue
+                for group in range(self.rng.choice([1, 1, 2])):
+                    for required in self.rng.sample(range(index), self.rng.choice([1, 1, 2])):
+                        yield Prerequisite(course=course, required=self.course_rows[required], group=group)
+
+        self.insert(Prerequisite, rows(), keep=False)
+
+    def students(self):
+        entry_terms = [term for term in self.term_rows if term.semester == 'fall'] or self.term_rows
+
+        def rows():
+            for i in range(self.volumes['students']):
+                first_name, last_name = self.person()
+                term = self.rng.choice(entry_terms)
+                yield Student(first_name=first_name, last_name=last_name,
+                              student_id=f'{term.academic_year}{i:06d}', balance=0,
+                              total_credits_taken=0, term=term, department=self.rng.choice(self.department_rows))
+
+        self.student_rows = self.insert(Student, rows())
+
+        per_student = min(self.volumes['courses_per_student'], len(self.course_rows))
+        course_indexes = range(len(self.course_rows))
+        cum_weights = list(accumulate(self.popularity))
+        self.enrolments = []
+        for student_index in range(len(self.student_rows)):
+            picked = set()
+            while len(picked) < per_student:
+                for course_index in self.rng.choices(course_indexes, cum_weights=cum_weights, k=per_student):
+                    if len(picked) < per_student:
+                        picked.add(course_index)
+            self.enrolments.extend((student_index, course_index) for course_index in sorted(picked))
+
+    def rooms_and_classes(self):
+        sizes = [0] * len(self.course_rows)
+        for _, course_index in self.enrolments:
+            sizes[course_index] += 1
+
+        capacities = [self.rng.choice([30, 40, 60, 80, 120]) for _ in range(self.volumes['rooms'])]
+        # guarantee that the most crowded course fits somewhere
+        capacities[0] = max(capacities[0], max(sizes, default=0))
+        self.room_rows = self.insert(Room, (
+            Room(name=f'{self.rng.choice("ABCDEFG")}-{i:03d}', capacity=capacity)
+            for i, capacity in enumerate(capacities)
+        ))
+        rooms_by_size = sorted(self.room_rows, key=lambda room: room.capacity)
+
+        # book rooms like the faculty would: a room hosts one class per (day, time slot) where possible
+        booked = set()
+        meetings = []
+        for course, size in zip(self.course_rows, sizes):
+            fitting = [room for room in rooms_by_size if room.capacity >= size] or rooms_by_size[-1:]
+            for _ in range(self.rng.choice([1, 1, 2])):
+                slot = self.rng.choice(TIME_SLOTS)
+                days = self.rng.sample(self.day_rows, 2)
+                free = [room for room in fitting if not any((room.pk, day.pk, slot) in booked for day in days)]
+                room = (free or fitting)[0] if self.rng.random() < 0.7 else self.rng.choice(free[:5] or fitting[:5])
+                booked.update((room.pk, day.pk, slot) for day in days)
+                meetings.append((Class(room=room, course=course, start_time=clock(slot[0]), end_time=clock(slot[1])),
+                                 days))
+
+        self.class_rows = self.insert(Class, (class_obj for class_obj, _ in meetings))
+        self.insert(Class.days.through, (
+            Class.days.through(class_id=class_obj.pk, day_id=day.pk)
+            for class_obj, days in meetings for day in days
+        ), keep=False)
+
+    def registrations(self):
+        pairs = [(self.student_rows[s].pk, self.course_rows[c].pk) for s, c in self.enrolments]
+        self.insert(Course.students.through, (Course.students.through(student_id=s, course_id=c) for s, c in pairs),
+                    keep=False)
+        self.insert(Student.courses.through, (Student.courses.through(student_id=s, course_id=c) for s, c in pairs),
+                    keep=False)
+        self.insert(CourseRegistration, (CourseRegistration(student_id=s, course_id=c) for s, c in pairs),
+                    keep=False)
+        self.insert(StudentCourse, (StudentCourse(student_id=s, course_id=c) for s, c in pairs), keep=False)
+
+    def grades(self):
+        term_index = {term.pk: i for i, term in enumerate(self.term_rows)}
+        past_terms = self.term_rows[:-1] or self.term_rows
+
+        def rows():
+            for _ in range(self.volumes['grades']):
+                student = self.rng.choice(self.student_rows)
+                course_index = self.rng.randrange(len(self.course_rows))
+                mean, spread = self.curves[course_index]
+                first = term_index[student.term_id]
+                term = self.rng.choice(past_terms[first:] or past_terms[-1:])
+                grade = min(20.0, max(0.0, round(self.rng.gauss(mean, spread) * 4) / 4))
+                yield Grade(student=student, course=self.course_rows[course_index], term=term, grade=grade,
+                            have_digital_signature=self.rng.random() < 0.9)
+
+        self.insert(Grade, rows(), keep=False)
+
+    def attendance(self):
+        classes_by_course = {}
+        for class_obj in self.class_rows:
+            classes_by_course.setdefault(class_obj.course_id, []).append(class_obj)
+
+        start = date(2024, 1, 6)
+        recorded = set()
+
+        def rows():
+            for _ in range(self.volumes['attendance'] if self.enrolments else 0):
+                student_index, course_index = self.rng.choice(self.enrolments)
+                class_obj = self.rng.choice(classes_by_course[self.course_rows[course_index].pk])
+                day = start + timedelta(days=self.rng.randrange(120))
+                if (student_index, class_obj.pk, day) in recorded:
+                    continue
+                recorded.add((student_index, class_obj.pk, day))
+                yield Attendance(student=self.student_rows[student_index], class_num=class_obj, date=day,
+                                 is_present=self.rng.random() < 0.9)
+
+        self.insert(Attendance, rows(), keep=False)
+
+    def foods(self):
+        start = datetime(2024, 1, 6, tzinfo=timezone.utc)
+        hours = {'breakfast': 7, 'lunch': 12, 'dinner': 19}
+        self.food_rows = self.insert(Food, (
+            Food(name=self.rng.choice(FOODS[meal]), price=self.rng.choice([15000, 25000, 40000]), meal=meal,
+                 day=WEEK_DAYS[day % 7], date=start + timedelta(days=day, hours=hours[meal]))
+            for day in range(self.volumes['food_days']) for meal in ('breakfast', 'lunch', 'dinner')
+        ))
+
+        wanted = min(self.volumes['reservations'], len(self.student_rows) * len(self.food_rows))
+        reserved = set()
+        while len(reserved) < wanted:
+            reserved.add((self.rng.randrange(len(self.student_rows)), self.rng.randrange(len(self.food_rows))))
+        reserved = sorted(reserved)
+
+        reservations = self.insert(FoodReservation, (
+            FoodReservation(student=self.student_rows[s], food=self.food_rows[f], is_taken=self.rng.random() < 0.7)
+            for s, f in reserved
+        ))
+
+        # every student starts with a deposit; the reservations are paid out of it
+        deposits = [self.rng.choice([500000, 1000000, 2000000]) for _ in self.student_rows]
+        spent = [0] * len(self.student_rows)
+        for s, f in reserved:
+            spent[s] += self.food_rows[f].price
+        for student, deposit, cost in zip(self.student_rows, deposits, spent):
+            student.balance = deposit - cost
+        Student.objects.bulk_update(self.student_rows, ['balance'], batch_size=self.batch_size)
+
+        self.insert(BalanceTransaction, (
+            BalanceTransaction(student=student, amount=deposit, reason=BalanceTransaction.DEPOSIT)
+            for student, deposit in zip(self.student_rows, deposits)
+        ), keep=False)
+        self.insert(BalanceTransaction, (
+            BalanceTransaction(student_id=reservation.student_id, amount=-reservation.food.price,
+                               reason=BalanceTransaction.RESERVATION, reservation=reservation)
+            for reservation in reservations
+        ), keep=False)
+
+    def ratings(self):
+        wanted = min(self.volumes['ratings'], len(self.student_rows) * len(self.professor_rows))
+        rated = set()
+        while len(rated) < wanted:
+            rated.add((self.rng.randrange(len(self.student_rows)), self.rng.randrange(len(self.professor_rows))))
+
+        def rating():
+            return Decimal(str(round(min(5.0, max(1.0, self.rng.gauss(3.8, 0.8))), 2)))
+
+        self.insert(ProfessorRating, (
+            ProfessorRating(student=self.student_rows[s], professor=self.professor_rows[p], rating=rating())
+            for s, p in sorted(rated)
+        ), keep=False)
+
+    def course_feed(self):
+        due = datetime(2024, 1, 10, 23, 59, tzinfo=timezone.utc)
+        self.insert(Announcement, (
+            Announcement(course=self.rng.choice(self.course_rows), title=f'Announcement {i}',
+                         content='Class moved to another room this week.')
+            for i in range(self.volumes['announcements'])
+        ), keep=False)
+        self.insert(Assignment, (
+            Assignment(course=self.rng.choice(self.course_rows), title=f'Assignment {i}',
+                       description='Solve the exercises of the chapter.',
+                       due_date=due + timedelta(days=self.rng.randrange(90)))
+            for i in range(self.volumes['assignments'])
+        ), keep=False)
+
+    def messages(self):
+        self.insert(Messages, (
+            Messages(sender=self.rng.choice(self.student_rows), receiver=self.rng.choice(self.professor_rows),
+                     subject=f'Question {i}', content='Could you explain the last part of the lecture again?',
+                     is_read=self.rng.random() < 0.6)
+            for i in range(self.volumes['messages'])
+        ), keep=False)
+
+    def exam_templates(self):
+        start = datetime(2024, 6, 1, tzinfo=timezone.utc)
+        slots = [start + timedelta(days=day, hours=hour) for day in range(14) for hour in (8, 11, 14)]
+        self.insert(ExaminationSchedule, (
+            ExaminationSchedule(course=course, date=self.rng.choice(slots), room=self.rng.choice(self.room_rows),
+                                seat_number=0, description='Final exam')
+            for course in self.course_rows
+        ), keep=False)
+
+    def derived_data(self):
+        started = time.perf_counter()
+        course_ids = [course.pk for course in self.course_rows]
+        registration.refresh_capacity(course_ids)
+        registration.refresh_seats_taken(course_ids)
+        aggregates.rebuild_all()
+        self.counts['app.TermStanding'] = standing.rebuild()['standings']
+        self.counts['app.AttendanceSummary'] = attendance.rebuild_summaries()
+        self.counts['app.ProfessorRatingStats'] = ratings.rebuild_stats()
+        inbox.rebuild_unread_counts()
+        self.counts['app.CourseEvent'], self.counts['app.FeedItem'] = feed.rebuild()
+        seats = exams.rebuild_courses()
+        self.counts['app.ExaminationSchedule'] += seats
+        # the seeded rows went in without signals, so no ETag issued before the seeding may still match
+        versions.track(course_ids)
+        versions.bump_all()
+        self.log(f'derived data (seats, GPA aggregates, term standings, attendance and rating summaries, unread counters, course feeds, {seats} exam seats) in {time.perf_counter() - started:.1f}s')
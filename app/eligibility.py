@@ -0,0 +1,66 @@
+from collections import defaultdict
+
+from app import read_models
+from app.indexes import LocalIndex
+from app.models import Prerequisite
+
+VERSION_KEY = 'prerequisites:version'
+
+
+class Requirements:
+    """
+    Every course's prerequisite groups as frozen sets of course ids.
+
+    A course is open to a student when each of its groups shares at least one course with the
+    student's passed-course set, so checking a whole catalogue page is a few small set
+    intersections per course and no query.
+    """
+
+    def __init__(self, rows):
+        # rows: (course_id, group, required_id, required_code)
+        groups = defaultdict(lambda: defaultdict(set))
+        self.codes = {}
+        for course_id, group, required_id, required_code in rows:
+            groups[course_id][group].add(required_id)
+            self.codes[required_id] = required_code
+        self.groups = {course_id: [frozenset(required) for required in by_group.values()]
+                       for course_id, by_group in groups.items()}
+
+    def missing(self, course_id, passed):
+        """The course's unmet groups, each as a list of the course codes that would satisfy it."""
+        return [
+            sorted(self.codes[pk] for pk in required)
+            for required in self.groups.get(course_id, ())
+            if passed.isdisjoint(required)
+        ]
+
+    def is_eligible(self, course_id, passed):
+        return not any(passed.isdisjoint(required) for required in self.groups.get(course_id, ()))
+
+    def check(self, course_ids, passed):
+        """``{course_id: missing groups}`` for a batch of courses; an empty list means eligible."""
+        return {course_id: self.missing(course_id, passed) for course_id in course_ids}
+
+
+def build_requirements():
+    return Requirements(Prerequisite.objects.values_list('course_id', 'group', 'required_id', 'required__code'))
+
+
+_requirements = LocalIndex(VERSION_KEY, build_requirements)
+
+
+def get_requirements():
+    """The process-wide requirements, rebuilt once after any prerequisite change."""
+    return _requirements.get()
+
+
+def invalidate():
+    _requirements.invalidate()
+
+
+def missing_prerequisites(student, course):
+    """The unmet prerequisite groups of ``course`` for ``student``; empty when the student may take it."""
+    requirements = get_requirements()
+    if course.pk not in requirements.groups:
+        return []
+    return requirements.missing(course.pk, read_models.get_passed_courses(student))
@@ -0,0 +1,201 @@
+import contextvars
+from collections import defaultdict
+from itertools import islice
+
+from django.db import transaction
+from django.db.models import Max
+
+from app import versions
+from app.models import Course, ExaminationSchedule, Room
+
+Enrolment = Course.students.through
+
+# set while seats are deleted in bulk here; the callers bump the courses' versions once instead of
+# the post_delete receiver bumping them row by row
+_bulk_deleting = contextvars.ContextVar('bulk_deleting', default=False)
+
+
+def exam_templates(course_ids, lock=False):
+    """
+    Return ``{course_id: template}`` for the courses that have an exam template.
+
+    With ``lock``, the templates of every course sharing an exam slot with them are locked in the
+    same query, so transactions seating students into the same slot take turns and never read
+    the same last seat number.
+    """
+    course_ids = list(course_ids)
+    templates = ExaminationSchedule.objects.filter(course_id__in=course_ids, student__isnull=True)
+    if lock:
+        templates = ExaminationSchedule.objects.select_for_update() \
+            .filter(student__isnull=True, date__in=templates.values('date')).order_by('pk')
+        wanted = set(course_ids)
+        return {template.course_id: template for template in templates if template.course_id in wanted}
+    return {template.course_id: template for template in templates}
+
+
+def room_capacities():
+    """Return ``{room_id: capacity}`` of every usable exam room."""
+    return dict(Room.objects.filter(capacity__gt=0).values_list('pk', 'capacity'))
+
+
+def occupied_seats(dates, exclude_course_ids=()):
+    """
+    Return ``{(date, room_id): last seat number}`` of the exams already seated in the slots ``dates``.
+
+    Courses in ``exclude_course_ids`` are about to be reseated, so their seats count as free.
+    """
+    seated = ExaminationSchedule.objects.filter(student__isnull=False, date__in=list(dates)) \
+        .exclude(course_id__in=list(exclude_course_ids)) \
+        .values('date', 'room_id').annotate(last_seat=Max('seat_number')).values_list('date', 'room_id', 'last_seat')
+    return {(date, room_id): last_seat for date, room_id, last_seat in seated}
+
+
+def build_rows(templates, enrolments, capacities, occupied=None):
+    """
+    Seat a whole exam period in memory.
+
+    ``enrolments`` is an iterable of ``(course_id, student_id)`` pairs, ``capacities`` maps room
+    ids to capacities and ``occupied`` maps ``(date, room_id)`` to the last seat already taken.
+    Courses sharing an exam slot share its rooms: the largest course is seated first, starting in
+    its template room and spilling into the slot's emptiest rooms once that one is full. Seats are
+    numbered per room, so a seat number never exceeds the room's capacity unless every room of the
+    slot is full, in which case the rest sit in the template room past its capacity.
+    """
+    students = defaultdict(list)
+    for course_id, student_id in enrolments:
+        if course_id in templates:
+            students[course_id].append(student_id)
+
+    slots = defaultdict(list)
+    for course_id, course_students in students.items():
+        slots[templates[course_id].date].append((len(course_students), course_id))
+
+    last_seat = defaultdict(int, occupied or {})
+    rows = []
+    for date, courses in slots.items():
+        for _, course_id in sorted(courses, key=lambda course: (-course[0], course[1])):
+            template = templates[course_id]
+            rooms = sorted(capacities, key=lambda room_id: last_seat[(date, room_id)] - capacities[room_id])
+            if template.room_id in capacities:
+                rooms.remove(template.room_id)
+                rooms.insert(0, template.room_id)
+
+            pending = iter(students[course_id])
+            for room_id in rooms:
+                free = capacities[room_id] - last_seat[(date, room_id)]
+                if free > 0:
+                    _seat(rows, template, room_id, islice(pending, free), last_seat)
+            _seat(rows, template, template.room_id, pending, last_seat)
+    return rows
+
+
+def _seat(rows, template, room_id, students, last_seat):
+    key = (template.date, room_id)
+    for student_id in students:
+        last_seat[key] += 1
+        rows.append(ExaminationSchedule(
+            student_id=student_id,
+            course_id=template.course_id,
+            date=template.date,
+            room_id=room_id,
+            seat_number=last_seat[key],
+            description=template.description,
+        ))
+
+
+def next_seat(course_id):
+    """Return ``(room_id, seat_number)`` a student newly enrolled in the course would get, or None."""
+    templates = exam_templates([course_id])
+    if course_id not in templates:
+        return None
+    rows = build_rows(templates, [(course_id, None)], room_capacities(), occupied_seats([templates[course_id].date]))
+    return rows[0].room_id, rows[0].seat_number
+
+
+def bulk_deleting():
+    """True inside ``_delete_seats``, whose callers bump the versions of the courses they change."""
+    return _bulk_deleting.get()
+
+
+def _delete_seats(seats):
+    token = _bulk_deleting.set(True)
+    try:
+        deleted, _ = seats.delete()
+    finally:
+        _bulk_deleting.reset(token)
+    return deleted
+
+
+def rebuild_courses(course_ids=None, batch_size=1000):
+    """
+    Reseat every student's exam for ``course_ids`` (all courses when None).
+
+    Templates, rooms and enrolments are read once, the seating is computed in memory by
+    ``build_rows`` and written with one bulk delete and a batched bulk insert inside a single
+    transaction. Seats held by other courses in the same slots stay where they are, and the slots'
+    templates stay locked until the commit so no student is seated into them meanwhile.
+    """
+    with transaction.atomic():
+        enrolments = Enrolment.objects.all()
+        stale = ExaminationSchedule.objects.filter(student__isnull=False)
+        if course_ids is not None:
+            course_ids = list(course_ids)
+            templates = exam_templates(course_ids, lock=True)
+            enrolments = enrolments.filter(course_id__in=course_ids)
+            stale = stale.filter(course_id__in=course_ids)
+        else:
+            templates = ExaminationSchedule.objects.select_for_update().filter(student__isnull=True).order_by('pk')
+            templates = {template.course_id: template for template in templates}
+
+        enrolments = enrolments.order_by('course_id', 'student_id').values_list('course_id', 'student_id')
+        occupied = {}
+        if course_ids is not None:
+            occupied = occupied_seats({template.date for template in templates.values()}, course_ids)
+
+        _delete_seats(stale)
+        rows = build_rows(templates, enrolments.iterator(chunk_size=batch_size), room_capacities(), occupied)
+        ExaminationSchedule.objects.bulk_create(rows, batch_size=batch_size)
+        if course_ids is None:
+            versions.bump_all()
+        else:
+            versions.bump(map(versions.exams, course_ids))
+    return len(rows)
+
+
+def rebuild_student(student_id):
+    """Incrementally regenerate one student's exam rows, leaving the other students' seats alone."""
+    with transaction.atomic():
+        seats = ExaminationSchedule.objects.filter(student_id=student_id)
+        dropped = set(seats.values_list('course_id', flat=True))
+        _delete_seats(seats)
+        course_ids = list(Enrolment.objects.filter(student_id=student_id).values_list('course_id', flat=True))
+        versions.bump(map(versions.exams, dropped.union(course_ids)))
+        return _append(course_ids, student_id)
+
+
+def add_student(course_id, student_id):
+    """Give a newly enrolled student the next free seat of the course's exam slot."""
+    with transaction.atomic():
+        appended = _append([course_id], student_id)
+        if appended:
+            versions.bump([versions.exams(course_id)])
+        return appended
+
+
+def remove_student(course_id, student_id):
+    removed = _delete_seats(ExaminationSchedule.objects.filter(course_id=course_id, student_id=student_id))
+    if removed:
+        versions.bump([versions.exams(course_id)])
+    return removed
+
+
+def _append(course_ids, student_id):
+    templates = exam_templates(course_ids, lock=True)
+    rows = build_rows(
+        templates,
+        ((course_id, student_id) for course_id in templates),
+        room_capacities(),
+        occupied_seats({template.date for template in templates.values()}),
+    )
+    ExaminationSchedule.objects.bulk_create(rows)
+    return len(rows)
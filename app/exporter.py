@@ -0,0 +1,136 @@
+import csv
+import io
+import json
+import time
+import zlib
+from itertools import groupby
+
+from app.models import Student
+
+FORMATS = ('csv', 'jsonl')
+CHUNK_SIZE = 2000
+
+# one row per grade of every student in the cohort; students without grades get one row without a course
+FIELDS = ('student_id', 'first_name', 'last_name', 'term__academic_year', 'term__semester',
+          'grade__course__code', 'grade__course__title', 'grade__course__credits', 'grade__term__academic_year',
+          'grade__term__semester', 'grade__grade', 'grade__have_digital_signature')
+COLUMNS = ('student_id', 'first_name', 'last_name', 'entry_year', 'entry_semester', 'course_code', 'course_title',
+           'credits', 'academic_year', 'semester', 'grade', 'signed')
+STUDENT_COLUMNS = COLUMNS[:5]
+
+
+class ExportFailed(Exception):
+    message = 'Export failed'
+
+    def __init__(self, message=None):
+        super().__init__(message or self.message)
+        self.message = message or self.message
+
+
+def cohort_exists(academic_year):
+    return Student.objects.filter(term__academic_year=academic_year).exists()
+
+
+class TranscriptExport:
+    """
+    The transcripts of every student who entered in ``academic_year``, as CSV (one row per grade)
+    or JSON Lines (one transcript per student), optionally gzipped.
+
+    The rows come from one query joining students, their terms, grades and courses, ordered by
+    student and read through a server-side cursor ``chunk_size`` rows at a time, so memory stays
+    flat however large the cohort is. Iterating yields the encoded bytes; ``stats`` holds the
+    counts and throughput once the iteration is over.
+    """
+
+    def __init__(self, academic_year, fmt='csv', compress=False, chunk_size=CHUNK_SIZE, progress=None):
+        if fmt not in FORMATS:
+            raise ExportFailed(f'Unknown format {fmt!r}, expected one of {", ".join(FORMATS)}')
+        self.academic_year = academic_year
+        self.fmt = fmt
+        self.compress = compress
+        self.chunk_size = chunk_size
+        self.progress = progress
+        self.stats = {'students': 0, 'rows': 0, 'bytes': 0, 'seconds': 0, 'rows_per_second': 0}
+
+    @property
+    def content_type(self):
+        if self.compress:
+            return 'application/gzip'
+        return 'text/csv' if self.fmt == 'csv' else 'application/x-ndjson'
+
+    @property
+    def filename(self):
+        return f'transcripts-{self.academic_year}.{self.fmt}' + ('.gz' if self.compress else '')
+
+    def rows(self):
+        return Student.objects.filter(term__academic_year=self.academic_year) \
+            .order_by('student_id', 'grade__course__code', 'grade__pk') \
+            .values_list(*FIELDS).iterator(chunk_size=self.chunk_size)
+
+    def __iter__(self):
+        started = time.perf_counter()
+        # wbits 31 writes a gzip member instead of a bare zlib stream
+        compressor = zlib.compressobj(wbits=31) if self.compress else None
+        chunks = self._csv() if self.fmt == 'csv' else self._jsonl()
+
+        for text in chunks:
+            data = text.encode()
+            if compressor is not None:
+                data = compressor.compress(data)
+            self.stats['bytes'] += len(data)
+            self._report(started)
+            if data:
+                yield data
+        if compressor is not None:
+            data = compressor.flush()
+            self.stats['bytes'] += len(data)
+            yield data
+        self._report(started, done=True)
+
+    def _report(self, started, done=False):
+        elapsed = time.perf_counter() - started
+        rate = self.stats['rows'] / elapsed if elapsed else 0
+        if done:
+            self.stats['seconds'] = round(elapsed, 3)
+            self.stats['rows_per_second'] = round(rate)
+        elif self.progress:
+            self.progress(self.stats['rows'], rate)
+
+    def _csv(self):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(COLUMNS)
+        pending = 0
+        previous = None
+        for row in self.rows():
+            if row[0] != previous:
+                previous = row[0]
+                self.stats['students'] += 1
+            if row[5] is not None:
+                self.stats['rows'] += 1
+            writer.writerow(row)
+            pending += 1
+            if pending >= self.chunk_size:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+                pending = 0
+        yield buffer.getvalue()
+
+    def _jsonl(self):
+        lines = []
+        pending = 0
+        for _, rows in groupby(self.rows(), key=lambda row: row[0]):
+            rows = list(rows)
+            transcript = dict(zip(STUDENT_COLUMNS, rows[0]))
+            transcript['grades'] = [dict(zip(COLUMNS[5:], row[5:])) for row in rows if row[5] is not None]
+            lines.append(json.dumps(transcript, ensure_ascii=False))
+            self.stats['students'] += 1
+            self.stats['rows'] += len(transcript['grades'])
+            pending += len(rows)
+            if pending >= self.chunk_size:
+                yield '\n'.join(lines) + '\n'
+                lines = []
+                pending = 0
+        if lines:
+            yield '\n'.join(lines) + '\n'
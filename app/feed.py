@@ -0,0 +1,249 @@
+import heapq
+from collections import defaultdict
+from itertools import islice
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+
+from app import routers
+from app.models import Announcement, Assignment, Course, CourseEvent, FeedItem
+
+Enrolment = Course.students.through
+
+# newest merge-on-read events kept in the cached head of every course
+HEAD_SIZE = 50
+PAGE_SIZE = 50
+FIELDS = ('id', 'course_id', 'course__code', 'kind', 'announcement_id', 'assignment_id', 'title', 'timestamp')
+
+
+def _cache():
+    return caches['read_models']
+
+
+def _head_key(course_id):
+    return f'feed:head:{course_id}'
+
+
+def _item(row):
+    return {
+        'id': row['id'],
+        'course_id': row['course_id'],
+        'course': row['course__code'],
+        'kind': row['kind'],
+        'object_id': row['announcement_id'] or row['assignment_id'],
+        'title': row['title'],
+        'timestamp': row['timestamp'],
+    }
+
+
+def _source(instance):
+    if isinstance(instance, Announcement):
+        return 'announcement', instance.date
+    return 'assignment', instance.due_date
+
+
+def _timestamp_field(instance):
+    return 'date' if isinstance(instance, Announcement) else 'due_date'
+
+
+def _in_range(event_id, since, before):
+    return (since is None or event_id > since) and (before is None or event_id < before)
+
+
+def _range(queryset, since, before):
+    if since is not None:
+        queryset = queryset.filter(pk__gt=since)
+    if before is not None:
+        queryset = queryset.filter(pk__lt=before)
+    return queryset.order_by('pk' if since is not None else '-pk')
+
+
+def invalidate_heads(course_ids):
+    keys = [_head_key(course_id) for course_id in course_ids]
+    # readers must not rebuild a head from before the write, so drop it once the write is visible
+    transaction.on_commit(lambda: _cache().delete_many(keys))
+
+
+def publish(instance):
+    """
+    Add a new announcement or assignment to the feeds of the course's students.
+
+    A course with at most ``FEED_FANOUT_LIMIT`` students gets one ``FeedItem`` per student in the
+    same transaction; for a larger course only the course's cached head is dropped.
+    """
+    kind, timestamp = _source(instance)
+    limit = settings.FEED_FANOUT_LIMIT
+    students = list(Enrolment.objects.filter(course_id=instance.course_id)
+                    .values_list('student_id', flat=True)[:limit + 1])
+    fanned_out = len(students) <= limit
+
+    with transaction.atomic():
+        event = CourseEvent.objects.create(course_id=instance.course_id, kind=kind, title=instance.title,
+                                           timestamp=timestamp, fanned_out=fanned_out, **{kind: instance})
+        if fanned_out:
+            FeedItem.objects.bulk_create([FeedItem(student_id=student_id, event=event) for student_id in students])
+    if not fanned_out:
+        invalidate_heads([instance.course_id])
+    return event
+
+
+def source_saved(instance, created):
+    """Publish a new announcement or assignment, or carry an edit over to its feed event."""
+    if created:
+        return publish(instance)
+
+    # a stale instance saved with update_fields still carries the old course; the event follows the stored row
+    instance.refresh_from_db(fields=['course', 'title', _timestamp_field(instance)])
+    kind, timestamp = _source(instance)
+    event = CourseEvent.objects.filter(**{kind: instance}).first()
+    if event is None:
+        return publish(instance)
+    if event.course_id != instance.course_id:
+        # moved to another course: it reaches other students, so publish it again
+        event.delete()
+        if not event.fanned_out:
+            invalidate_heads([event.course_id])
+        return publish(instance)
+
+    CourseEvent.objects.filter(pk=event.pk).update(title=instance.title, timestamp=timestamp)
+    if not event.fanned_out:
+        invalidate_heads([event.course_id])
+    return event
+
+
+def source_deleted(instance):
+    """Drop the heads holding the event of an announcement or assignment that is about to be deleted."""
+    kind, _ = _source(instance)
+    # the event and its feed items go with the source through the cascade; the stored event, not a
+    # possibly stale instance, says which course's head still lists it
+    invalidate_heads(CourseEvent.objects.filter(**{kind: instance}, fanned_out=False)
+                     .values_list('course_id', flat=True))
+
+
+def follow(enrolments):
+    """Copy the fanned-out events of the courses into the feeds of new ``(student_id, course_id)`` enrolments."""
+    enrolments = list(enrolments)
+    events = defaultdict(list)
+    for event_id, course_id in CourseEvent.objects.filter(
+            course_id__in={course_id for _, course_id in enrolments}, fanned_out=True).values_list('pk', 'course_id'):
+        events[course_id].append(event_id)
+    items = [FeedItem(student_id=student_id, event_id=event_id)
+             for student_id, course_id in enrolments for event_id in events.get(course_id, ())]
+    FeedItem.objects.bulk_create(items, batch_size=5000, ignore_conflicts=True)
+
+
+def unfollow(course_ids=None, student_ids=None):
+    """Drop the feed items of ``course_ids`` (every course when None) from ``student_ids`` (everyone when None)."""
+    items = FeedItem.objects.all()
+    if course_ids is not None:
+        items = items.filter(event__course_id__in=course_ids)
+    if student_ids is not None:
+        items = items.filter(student_id__in=student_ids)
+    items.delete()
+
+
+def build_heads(course_ids):
+    """The newest ``HEAD_SIZE`` merge-on-read events of every course, newest first, in one query."""
+    rows = CourseEvent.objects.filter(course_id__in=course_ids, fanned_out=False).annotate(
+        rank=Window(RowNumber(), partition_by=F('course_id'), order_by=F('pk').desc()),
+    ).filter(rank__lte=HEAD_SIZE).order_by('course_id', '-pk').values(*FIELDS)
+
+    heads = {course_id: [] for course_id in course_ids}
+    for row in rows:
+        heads[row['course_id']].append(_item(row))
+    return heads
+
+
+def get_heads(course_ids):
+    """``{course_id: head}``: one cache round trip and one query for the courses that are not cached."""
+    keys = {course_id: _head_key(course_id) for course_id in course_ids}
+    cached = _cache().get_many(keys.values())
+    heads = {course_id: cached[key] for course_id, key in keys.items() if key in cached}
+    missing = [course_id for course_id in course_ids if course_id not in heads]
+    if missing:
+        with routers.primary():
+            built = build_heads(missing)
+        _cache().set_many({keys[course_id]: head for course_id, head in built.items()})
+        heads.update(built)
+    return heads
+
+
+def _from_head(head, since, before, limit):
+    """The head's events in range in feed order, or None when older events may be missing from it."""
+    events = [event for event in head if _in_range(event['id'], since, before)]
+    if len(head) == HEAD_SIZE:
+        oldest = head[-1]['id']
+        if (oldest > since) if since is not None else (len(events) < limit):
+            return None
+    return events[::-1] if since is not None else events
+
+
+def feed(student, since=None, before=None, limit=PAGE_SIZE):
+    """
+    The student's announcements and deadlines across their courses.
+
+    Without ``since`` the newest ``limit`` events (older than ``before``, when given) come newest
+    first. With ``since`` the ``limit`` events published after that cursor come oldest first, so
+    a polling client can pass the last id it got back until nothing is left.
+
+    Fanned-out events are one indexed range query on the student's feed items; the other courses
+    are merged from their cached heads, falling back to one query for courses whose head is too
+    short for the requested range.
+    """
+    ascending = since is not None
+    course_ids = list(Enrolment.objects.filter(student_id=student.pk).values_list('course_id', flat=True))
+    fanned = _range(CourseEvent.objects.filter(feed_items__student_id=student.pk), since, before)
+    streams = [[_item(row) for row in fanned.values(*FIELDS)[:limit]]]
+
+    stale = []
+    for course_id, head in get_heads(course_ids).items():
+        events = _from_head(head, since, before, limit)
+        if events is None:
+            stale.append(course_id)
+        elif events:
+            streams.append(events)
+    if stale:
+        merged = _range(CourseEvent.objects.filter(course_id__in=stale, fanned_out=False), since, before)
+        streams.append([_item(row) for row in merged.values(*FIELDS)[:limit]])
+
+    events = heapq.merge(*streams, key=lambda event: event['id'], reverse=not ascending)
+    return list(islice(events, limit))
+
+
+def rebuild(fanout_limit=None, batch_size=5000):
+    """
+    Recreate every feed event from the announcements and assignments, choosing fan-out or
+    merge-on-read per course against ``fanout_limit`` (``FEED_FANOUT_LIMIT`` by default).
+
+    Returns ``(events, feed items)``.
+    """
+    limit = settings.FEED_FANOUT_LIMIT if fanout_limit is None else fanout_limit
+    students = defaultdict(list)
+    for course_id, student_id in Enrolment.objects.values_list('course_id', 'student_id').iterator(chunk_size=10000):
+        students[course_id].append(student_id)
+
+    sources = [(source, 'announcement', source.date)
+               for source in Announcement.objects.order_by('date', 'pk').iterator(chunk_size=batch_size)]
+    sources += [(source, 'assignment', source.due_date)
+                for source in Assignment.objects.order_by('pk').iterator(chunk_size=batch_size)]
+    events = [
+        CourseEvent(course_id=source.course_id, kind=kind, title=source.title, timestamp=timestamp,
+                    fanned_out=len(students[source.course_id]) <= limit, **{f'{kind}_id': source.pk})
+        for source, kind, timestamp in sources
+    ]
+
+    with transaction.atomic():
+        FeedItem.objects.all().delete()
+        CourseEvent.objects.all().delete()
+        CourseEvent.objects.bulk_create(events, batch_size=batch_size)
+        items = (FeedItem(student_id=student_id, event_id=event.pk)
+                 for event in events if event.fanned_out for student_id in students[event.course_id])
+        total = 0
+        while batch := list(islice(items, batch_size)):
+            FeedItem.objects.bulk_create(batch)
+            total += len(batch)
+        invalidate_heads(Course.objects.values_list('pk', flat=True))
+    return len(events), total
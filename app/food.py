@@ -0,0 +1,92 @@
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum
+
+from app.models import BalanceTransaction, Food, FoodReservation, Student
+
+
+class ReservationError(Exception):
+    message = 'Reservation failed'
+
+    def __init__(self, message=None):
+        super().__init__(message or self.message)
+        self.message = message or self.message
+
+
+class InsufficientBalance(ReservationError):
+    message = 'Not enough balance'
+
+
+class AlreadyReserved(ReservationError):
+    message = 'Food already reserved by the student'
+
+
+def charge(student_id, amount):
+    """Debit ``amount`` with one conditional UPDATE; the balance can never go negative or lose an update."""
+    debited = Student.objects.filter(pk=student_id, balance__gte=amount).update(balance=F('balance') - amount)
+    if not debited:
+        raise InsufficientBalance()
+
+
+def refund(student_id, amount):
+    with transaction.atomic():
+        Student.objects.filter(pk=student_id).update(balance=F('balance') + amount)
+        BalanceTransaction.objects.create(student_id=student_id, amount=amount, reason=BalanceTransaction.REFUND)
+
+
+def deposit(student_id, amount):
+    with transaction.atomic():
+        Student.objects.filter(pk=student_id).update(balance=F('balance') + amount)
+        BalanceTransaction.objects.create(student_id=student_id, amount=amount, reason=BalanceTransaction.DEPOSIT)
+
+
+def reserve(student, food):
+    if FoodReservation.objects.filter(student=student, food=food).exists():
+        raise AlreadyReserved()
+
+    try:
+        with transaction.atomic():
+            reservation = FoodReservation(student=student, food=food)
+            reservation.save()
+    except IntegrityError:
+        # lost the race against a parallel request for the same food; the charge was rolled back
+        raise AlreadyReserved()
+    return reservation
+
+
+def reserve_week(student, start_date, meal=None):
+    """
+    Reserve every food served in the 7 days from ``start_date`` that the student has not reserved yet.
+
+    The whole week is charged with a single debit and written with bulk inserts in one transaction,
+    so either every meal is reserved and paid for or nothing is.
+    """
+    foods = Food.objects.filter(date__date__gte=start_date, date__date__lt=start_date + timedelta(days=7)) \
+        .exclude(foodreservation__student=student)
+    if meal is not None:
+        foods = foods.filter(meal=meal)
+    foods = list(foods.order_by('date'))
+    if not foods:
+        return []
+
+    total = sum(food.price for food in foods)
+    try:
+        with transaction.atomic():
+            charge(student.pk, total)
+            reservations = FoodReservation.objects.bulk_create(
+                FoodReservation(student=student, food=food) for food in foods
+            )
+            BalanceTransaction.objects.bulk_create(
+                BalanceTransaction(student=student, amount=-reservation.food.price,
+                                   reason=BalanceTransaction.RESERVATION, reservation=reservation)
+                for reservation in reservations
+            )
+    except IntegrityError:
+        raise AlreadyReserved('Some of the week was reserved by a parallel request, nothing was reserved')
+    return reservations
+
+
+def ledger_balance(student_id):
+    """The balance according to the ledger, for reconciling against ``Student.balance``."""
+    return BalanceTransaction.objects.filter(student_id=student_id).aggregate(total=Sum('amount'))['total'] or 0
@@ -0,0 +1,74 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Q
+
+from app.models import GradeAggregate, HonoursEntry
+
+
+def build_entries(student_ids=None):
+    """Index rows of ``student_ids`` (every student when None) computed from their overall aggregates."""
+    overall = GradeAggregate.objects.filter(term__isnull=True, total_credits__gt=0)
+    if student_ids is not None:
+        overall = overall.filter(student_id__in=list(student_ids))
+
+    return [
+        HonoursEntry(student_id=student_id, entry_year=entry_year, gpa=points / credits)
+        for student_id, entry_year, credits, points in overall.values_list(
+            'student_id', 'student__term__academic_year', 'total_credits', 'total_grade_points',
+        )
+    ]
+
+
+def refresh(student_ids):
+    """Re-file ``student_ids`` under their current GPA; students left without signed credits drop out."""
+    student_ids = set(student_ids)
+    if not student_ids:
+        return
+
+    rows = build_entries(student_ids)
+    with transaction.atomic(savepoint=False):
+        HonoursEntry.objects.bulk_create(rows, update_conflicts=True, unique_fields=['student'],
+                                         update_fields=['entry_year', 'gpa'])
+        dropped = student_ids - {row.student_id for row in rows}
+        if dropped:
+            HonoursEntry.objects.filter(student_id__in=dropped).delete()
+
+
+def rebuild(batch_size=1000):
+    """Rebuild the whole index from the overall GPA aggregates, e.g. at the end of term."""
+    rows = build_entries()
+    with transaction.atomic():
+        HonoursEntry.objects.all().delete()
+        HonoursEntry.objects.bulk_create(rows, batch_size=batch_size)
+    return len(rows)
+
+
+def ranked(entry_year):
+    return HonoursEntry.objects.filter(entry_year=entry_year).order_by('-gpa', 'student_id')
+
+
+def top(entry_year, k):
+    """The ``k`` best students of the entry year."""
+    return ranked(entry_year).select_related('student')[:k]
+
+
+def above(entry_year, threshold=None):
+    """Students of the entry year whose GPA reaches ``threshold`` (``HONOURS_GPA_THRESHOLD`` by default)."""
+    threshold = settings.HONOURS_GPA_THRESHOLD if threshold is None else threshold
+    return ranked(entry_year).filter(gpa__gte=threshold)
+
+
+def standing(entry):
+    """
+    Return ``(rank, percentile)`` of an index entry within its entry year.
+
+    The percentile is the share of the year's students with a lower GPA; both numbers come from
+    one counting query over the year's slice of the (entry_year, gpa) index.
+    """
+    counts = HonoursEntry.objects.filter(entry_year=entry.entry_year).aggregate(
+        total=Count('pk'),
+        better=Count('pk', filter=Q(gpa__gt=entry.gpa)),
+        worse=Count('pk', filter=Q(gpa__lt=entry.gpa)),
+    )
+    percentile = counts['worse'] * 100 / counts['total'] if counts['total'] else 0
+    return counts['better'] + 1, round(percentile, 2)
@@ -0,0 +1,342 @@
+import csv
+import io
+import json
+import time
+
+from django.db import transaction
+
+from app import aggregates, exams, feed, honours, read_models, registration, versions
+from app.models import Course, Department, Grade, Professor, Student, Term
+
+Enrolment = Course.students.through
+
+FORMATS = ('csv', 'jsonl')
+CHUNK_SIZE = 2000
+MAX_ERRORS = 100
+
+
+class ImportFailed(Exception):
+    message = 'Import failed'
+
+    def __init__(self, message=None):
+        super().__init__(message or self.message)
+        self.message = message or self.message
+
+
+class RowError(ValueError):
+    pass
+
+
+def read_rows(stream, fmt):
+    """Yield ``(line_number, row)`` from a text stream of CSV (with a header) or JSON Lines."""
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+    elif fmt == 'jsonl':
+        for line_number, line in enumerate(stream, 1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                row = None
+            yield line_number, row if isinstance(row, dict) else line
+    else:
+        raise ImportFailed(f'Unknown format {fmt!r}, expected one of {", ".join(FORMATS)}')
+
+
+def text_stream(binary):
+    return io.TextIOWrapper(binary, encoding='utf-8-sig', newline='')
+
+
+def format_of(filename, default='csv'):
+    extension = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    return {'csv': 'csv', 'jsonl': 'jsonl', 'ndjson': 'jsonl'}.get(extension, default)
+
+
+def _required(row, field):
+    value = row.get(field)
+    if value is None or str(value).strip() == '':
+        raise RowError(f'{field} is required')
+    return str(value).strip()
+
+
+def _number(row, field, cast=int, minimum=None, maximum=None):
+    value = _required(row, field)
+    try:
+        value = cast(value)
+    except ValueError:
+        raise RowError(f'{field} must be a number, got {value!r}')
+    if minimum is not None and value < minimum:
+        raise RowError(f'{field} must be at least {minimum}, got {value}')
+    if maximum is not None and value > maximum:
+        raise RowError(f'{field} must be at most {maximum}, got {value}')
+    return value
+
+
+def _flag(row, field):
+    value = row.get(field)
+    if isinstance(value, bool):
+        return value
+    return str(value or '').strip().lower() in ('1', 'true', 'yes')
+
+
+def _lookup(mapping, key, label):
+    try:
+        return mapping[key]
+    except KeyError:
+        raise RowError(f'unknown {label} {key!r}')
+
+
+class Importer:
+    """
+    Base of the bulk importers: rows are validated and resolved through in-memory lookup maps,
+    written a chunk at a time with set-based statements, and the derived data (seat counters,
+    GPA aggregates, exam seats, cached documents) is recomputed once in ``finish``.
+
+    Subclasses implement ``clean(row)``, returning the resolved row or raising ``RowError``,
+    and ``write(rows)``, returning ``(created, updated)``.
+    """
+    kind = None
+
+    def __init__(self, chunk_size=CHUNK_SIZE, progress=None):
+        self.chunk_size = chunk_size
+        self.progress = progress
+        self.stats = {'kind': self.kind, 'rows': 0, 'created': 0, 'updated': 0, 'skipped': 0, 'errors': []}
+
+    def run(self, rows):
+        started = time.perf_counter()
+        self.load_maps()
+        chunk = []
+        try:
+            for line_number, row in rows:
+                self.stats['rows'] += 1
+                try:
+                    if not isinstance(row, dict):
+                        raise RowError('not a JSON object')
+                    chunk.append(self.clean(row))
+                except RowError as e:
+                    self.skip(line_number, str(e))
+
+                if len(chunk) >= self.chunk_size:
+                    self.flush(chunk, started)
+                    chunk = []
+            if chunk:
+                self.flush(chunk, started)
+        finally:
+            self.finish()
+
+        elapsed = time.perf_counter() - started
+        self.stats['seconds'] = round(elapsed, 3)
+        self.stats['rows_per_second'] = round(self.stats['rows'] / elapsed) if elapsed else None
+        return self.stats
+
+    def skip(self, line_number, message):
+        self.stats['skipped'] += 1
+        if len(self.stats['errors']) < MAX_ERRORS:
+            self.stats['errors'].append({'line': line_number, 'message': message})
+
+    def flush(self, chunk, started):
+        with transaction.atomic():
+            created, updated = self.write(chunk)
+        self.stats['created'] += created
+        self.stats['updated'] += updated
+        if self.progress:
+            elapsed = time.perf_counter() - started
+            self.progress(self.stats['rows'], self.stats['rows'] / elapsed if elapsed else 0)
+
+    def load_maps(self):
+        pass
+
+    def finish(self):
+        pass
+
+
+class StudentImporter(Importer):
+    """
+    Columns: student_id, first_name, last_name, academic_year, semester and an optional department
+    (its name). Upserts on student_id; a row without a department keeps the student's current one.
+    """
+    kind = 'students'
+
+    def load_maps(self):
+        self.terms = {}
+        for pk, year, semester in Term.objects.order_by('-pk').values_list('pk', 'academic_year', 'semester'):
+            self.terms[(year, semester)] = pk
+        self.departments = dict(Department.objects.values_list('name', 'pk'))
+        self.existing = set(Student.objects.values_list('student_id', flat=True))
+        self.updated = set()
+
+    def clean(self, row):
+        term = (_number(row, 'academic_year'), _required(row, 'semester').lower())
+        department = str(row.get('department') or '').strip()
+        return Student(
+            student_id=_required(row, 'student_id'),
+            first_name=_required(row, 'first_name'),
+            last_name=_required(row, 'last_name'),
+            term_id=_lookup(self.terms, term, 'term'),
+            department_id=_lookup(self.departments, department, 'department') if department else None,
+            total_credits_taken=0,
+        )
+
+    def write(self, rows):
+        rows = list({row.student_id: row for row in rows}.values())
+        updated = sum(1 for row in rows if row.student_id in self.existing)
+        for with_department in (True, False):
+            batch = [row for row in rows if (row.department_id is not None) == with_department]
+            if batch:
+                Student.objects.bulk_create(batch, update_conflicts=True, unique_fields=['student_id'],
+                                            update_fields=['first_name', 'last_name', 'term']
+                                            + (['department'] if with_department else []))
+        self.updated.update(row.student_id for row in rows if row.student_id in self.existing)
+        self.existing.update(row.student_id for row in rows)
+        return len(rows) - updated, updated
+
+    def finish(self):
+        # a new term moves the student to another entry year of the honours index
+        honours.refresh(Student.objects.filter(student_id__in=self.updated).values_list('pk', flat=True))
+
+
+class CourseImporter(Importer):
+    """Columns: code, title, professor_id, credits. Upserts on code."""
+    kind = 'courses'
+
+    def load_maps(self):
+        self.professors = dict(Professor.objects.values_list('professor_id', 'pk'))
+        self.existing = set(Course.objects.values_list('code', flat=True))
+        self.codes = set()
+
+    def clean(self, row):
+        return Course(
+            code=_required(row, 'code'),
+            title=_required(row, 'title'),
+            professor_id=_lookup(self.professors, _required(row, 'professor_id'), 'professor'),
+            credits=_number(row, 'credits', minimum=0),
+        )
+
+    def write(self, rows):
+        rows = list({row.code: row for row in rows}.values())
+        updated = sum(1 for row in rows if row.code in self.existing)
+        Course.objects.bulk_create(rows, update_conflicts=True, unique_fields=['code'],
+                                   update_fields=['title', 'professor', 'credits'])
+        self.existing.update(row.code for row in rows)
+        self.codes.update(row.code for row in rows)
+        return len(rows) - updated, updated
+
+    def finish(self):
+        # credits feed the GPA of everyone graded in the course
+        course_ids = list(Course.objects.filter(code__in=self.codes).values_list('pk', flat=True))
+        students = read_models.graded_student_pks(course_ids)
+        aggregates.rebuild_students(students)
+        read_models.invalidate_schedules(read_models.enrolled_student_pks(course_ids))
+        read_models.invalidate_transcripts(students)
+        # the bulk upsert sends no post_save, so the course detail validators are moved here
+        versions.bump(map(versions.course, course_ids))
+
+
+class EnrolmentImporter(Importer):
+    """Columns: student_id, code. Adds the student to the course; existing enrolments are left alone."""
+    kind = 'enrolments'
+
+    def load_maps(self):
+        self.students = dict(Student.objects.values_list('student_id', 'pk'))
+        self.courses = dict(Course.objects.values_list('code', 'pk'))
+        self.course_ids, self.student_ids = set(), set()
+        self.enrolments = []
+
+    def clean(self, row):
+        return Enrolment(
+            student_id=_lookup(self.students, _required(row, 'student_id'), 'student'),
+            course_id=_lookup(self.courses, _required(row, 'code'), 'course'),
+        )
+
+    def write(self, rows):
+        pairs = {(row.student_id, row.course_id) for row in rows}
+        existing = set(Enrolment.objects.filter(
+            student_id__in={student_id for student_id, _ in pairs},
+            course_id__in={course_id for _, course_id in pairs},
+        ).values_list('student_id', 'course_id'))
+        new = pairs - existing
+        Enrolment.objects.bulk_create([Enrolment(student_id=student_id, course_id=course_id)
+                                       for student_id, course_id in new], ignore_conflicts=True)
+        self.student_ids.update(student_id for student_id, _ in new)
+        self.course_ids.update(course_id for _, course_id in new)
+        self.enrolments.extend(new)
+        return len(new), 0
+
+    def finish(self):
+        course_ids = list(self.course_ids)
+        registration.refresh_seats_taken(course_ids)
+        exams.rebuild_courses(course_ids)
+        read_models.invalidate_schedules(self.student_ids)
+        feed.follow(self.enrolments)
+
+
+class GradeImporter(Importer):
+    """
+    Columns: student_id, code, grade, academic_year and semester (optional), have_digital_signature.
+
+    A grade replaces the one the student already has for the course in the same term.
+    """
+    kind = 'grades'
+
+    def load_maps(self):
+        self.students = dict(Student.objects.values_list('student_id', 'pk'))
+        self.courses = dict(Course.objects.values_list('code', 'pk'))
+        self.terms = {}
+        for pk, year, semester in Term.objects.order_by('-pk').values_list('pk', 'academic_year', 'semester'):
+            self.terms[(year, semester)] = pk
+        self.student_ids = set()
+
+    def clean(self, row):
+        term_id = None
+        if str(row.get('academic_year') or '').strip():
+            term = (_number(row, 'academic_year'), _required(row, 'semester').lower())
+            term_id = _lookup(self.terms, term, 'term')
+
+        return Grade(
+            student_id=_lookup(self.students, _required(row, 'student_id'), 'student'),
+            course_id=_lookup(self.courses, _required(row, 'code'), 'course'),
+            term_id=term_id,
+            grade=_number(row, 'grade', float, 0, 20),
+            have_digital_signature=_flag(row, 'have_digital_signature'),
+        )
+
+    def write(self, rows):
+        rows = list({(row.student_id, row.course_id, row.term_id): row for row in rows}.values())
+        existing = {
+            (student_id, course_id, term_id): pk
+            for pk, student_id, course_id, term_id in Grade.objects.filter(
+                student_id__in={row.student_id for row in rows},
+                course_id__in={row.course_id for row in rows},
+            ).values_list('pk', 'student_id', 'course_id', 'term_id')
+        }
+
+        for row in rows:
+            row.pk = existing.get((row.student_id, row.course_id, row.term_id))
+        changed = sum(1 for row in rows if row.pk is not None)
+
+        # an upsert on the primary key updates the known grades without bulk_update's per-row CASE
+        Grade.objects.bulk_create(rows, update_conflicts=True, unique_fields=['id'],
+                                  update_fields=['grade', 'have_digital_signature'])
+        self.student_ids.update(row.student_id for row in rows)
+        return len(rows) - changed, changed
+
+    def finish(self):
+        aggregates.rebuild_students(self.student_ids)
+        read_models.invalidate_transcripts(self.student_ids)
+        read_models.invalidate_passed_courses(self.student_ids)
+
+
+IMPORTERS = {importer.kind: importer for importer in (StudentImporter, CourseImporter, EnrolmentImporter,
+                                                      GradeImporter)}
+
+
+def import_stream(kind, stream, fmt, chunk_size=CHUNK_SIZE, progress=None):
+    """Import a text stream of ``kind`` rows and return the run's counts, errors and throughput."""
+    try:
+        importer = IMPORTERS[kind]
+    except KeyError:
+        raise ImportFailed(f'Unknown kind {kind!r}, expected one of {", ".join(IMPORTERS)}')
+    return importer(chunk_size, progress).run(read_rows(stream, fmt))
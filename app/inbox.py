@@ -0,0 +1,70 @@
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from app.models import Messages, Professor
+
+
+class MessageError(Exception):
+    message = 'Message could not be sent'
+
+    def __init__(self, message=None):
+        super().__init__(message or self.message)
+        self.message = message or self.message
+
+
+class EmptyMessage(MessageError):
+    message = 'A message needs a subject and a content'
+
+
+def send(sender, receiver, subject, content):
+    """Send a message from a student to a professor; the professor's unread counter moves with the insert."""
+    subject, content = (subject or '').strip(), (content or '').strip()
+    if not subject or not content:
+        raise EmptyMessage()
+    if len(subject) > Messages._meta.get_field('subject').max_length:
+        raise MessageError('Subject is too long')
+
+    message = Messages(sender=sender, receiver=receiver, subject=subject, content=content)
+    message.save()
+    return message
+
+
+def inbox(professor, unread=False):
+    """A professor's messages, newest first, served from the (receiver, timestamp) index."""
+    messages = Messages.objects.filter(receiver_id=professor.pk).select_related('sender')
+    return messages.filter(is_read=False) if unread else messages
+
+
+def outbox(student):
+    """A student's sent messages, newest first, served from the (sender, timestamp) index."""
+    return Messages.objects.filter(sender_id=student.pk).select_related('receiver')
+
+
+def mark_thread_read(professor, student):
+    """
+    Mark every unread message ``student`` sent to ``professor`` as read and return how many were.
+
+    One UPDATE flips the flags and a second moves the counter by the number of rows it touched,
+    in the same transaction, so the badge never counts a message twice.
+    """
+    with transaction.atomic():
+        marked = Messages.objects.filter(receiver_id=professor.pk, sender_id=student.pk, is_read=False) \
+            .update(is_read=True)
+        if marked:
+            Professor.objects.filter(pk=professor.pk).update(unread_messages=F('unread_messages') - marked)
+    return marked
+
+
+def message_deleted(message):
+    # cascades from a deleted student reach here too, one message at a time
+    if not message.is_read:
+        Professor.objects.filter(pk=message.receiver_id, unread_messages__gt=0) \
+            .update(unread_messages=F('unread_messages') - 1)
+
+
+def rebuild_unread_counts():
+    """Recount every professor's unread messages in one UPDATE."""
+    unread = Messages.objects.filter(receiver_id=OuterRef('pk'), is_read=False).order_by() \
+        .values('receiver_id').annotate(count=Count('pk')).values('count')
+    return Professor.objects.update(unread_messages=Coalesce(Subquery(unread), 0))
@@ -0,0 +1,57 @@
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from app import routers
+
+
+def bump(key):
+    """Move the shared version counter ``key`` on, once the current transaction commits."""
+    def incr():
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, timeout=None)
+
+    # a process rebuilding before the commit would file the old rows under the new version
+    transaction.on_commit(incr)
+
+
+class LocalIndex:
+    """
+    A structure built from the database once per process and rebuilt when it goes stale.
+
+    It is stale when the version counter ``key`` in the ``default`` cache (shared between the
+    processes when ``REDIS_URL`` is set) moved since it was built, or when it is older than
+    ``LOCAL_INDEX_TTL`` seconds, which bounds how long a lost bump or an evicted counter can go
+    unnoticed. ``invalidate`` drops this process's copy at once and bumps the counter on commit.
+    """
+
+    def __init__(self, key, build):
+        self.key = key
+        self.build = build
+        self.lock = threading.Lock()
+        self.current = None  # (version, built at, index)
+
+    def _fresh(self, current, version):
+        return current is not None and current[0] == version \
+            and time.monotonic() - current[1] < settings.LOCAL_INDEX_TTL
+
+    def get(self):
+        version = cache.get(self.key, 0)
+        current = self.current
+        if self._fresh(current, version):
+            return current[2]
+
+        with self.lock:
+            if not self._fresh(self.current, version):
+                with routers.primary():
+                    self.current = (version, time.monotonic(), self.build())
+            return self.current[2]
+
+    def invalidate(self):
+        self.current = None
+        bump(self.key)
@@ -0,0 +1,46 @@
+import os
+import sqlite3
+import tempfile
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+@contextmanager
+def throwaway_database(alias=DEFAULT_DB_ALIAS):
+    """
+    Run the body against a freshly migrated copy of the database, like the test runner does.
+
+    SQLite gets a temporary file instead of the shared in-memory database so that worker
+    threads see real file locking. Configured replicas read the copy too, as under the test runner.
+    """
+    connection = connections[alias]
+    if connection.vendor == 'sqlite' and not connection.settings_dict['TEST'].get('NAME'):
+        fd, path = tempfile.mkstemp(prefix='fum-bench-', suffix='.sqlite3')
+        os.close(fd)
+        connection.settings_dict['TEST']['NAME'] = path
+
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    replicas = {replica: connections[replica].settings_dict['NAME'] for replica in settings.REPLICA_DATABASES}
+    for replica in replicas:
+        connections[replica].close()
+        connections[replica].settings_dict['NAME'] = connection.settings_dict['NAME']
+    try:
+        yield connection
+    finally:
+        for replica, name in replicas.items():
+            connections[replica].close()
+            connections[replica].settings_dict['NAME'] = name
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+def copy_sqlite(source, target):
+    """Copy the SQLite database file ``source`` over ``target`` with SQLite's online backup."""
+    src, dst = sqlite3.connect(source), sqlite3.connect(target)
+    try:
+        src.backup(dst)
+    finally:
+        dst.close()
+        src.close()
@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import Max
+
+from app import exams
+from app.models import ExaminationSchedule
+
+
+class Command(BaseCommand):
+    help = 'Seat every enrolled student of every exam across the rooms of its slot, in one pass'
+
+    def add_arguments(self, parser):
+        parser.add_argument('courses', nargs='*', type=int, help='reseat only these course ids')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        seats = exams.rebuild_courses(options['courses'] or None, batch_size=options['batch_size'])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f'seated {seats} student-exams in {elapsed:.2f}s ({seats / elapsed if elapsed else 0:.0f}/s)')
+
+        capacities = exams.room_capacities()
+        rooms = ExaminationSchedule.objects.filter(student__isnull=False) \
+            .values('date', 'room_id').annotate(last_seat=Max('seat_number')).values_list('room_id', 'last_seat')
+        overfull = sum(1 for room_id, last_seat in rooms if last_seat > capacities.get(room_id, 0))
+        if overfull:
+            self.stdout.write(self.style.WARNING(f'{overfull} exam rooms are over capacity'))
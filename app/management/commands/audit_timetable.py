@@ -0,0 +1,51 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from app import timetable
+from app.models import Course
+
+
+class Command(BaseCommand):
+    help = 'List every room double booking and every student with clashing courses'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--probes', type=int, default=10000,
+                            help='random registration-time checks to time against the index')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        index = timetable.build_index()
+        self.stdout.write(f'index built in {(time.perf_counter() - started) * 1000:.1f}ms')
+
+        started = time.perf_counter()
+        rooms = index.audit_rooms()
+        enrolments = Course.students.through.objects.order_by('student_id') \
+            .values_list('student_id', 'course_id').iterator(chunk_size=5000)
+        students = index.audit_students(enrolments)
+        self.stdout.write(f'audit swept in {(time.perf_counter() - started) * 1000:.1f}ms')
+
+        for room_id, day_id, first, second in rooms:
+            self.stdout.write(f'room {room_id} day {day_id}: classes {first} and {second} overlap')
+        for student_id, first, second in students:
+            self.stdout.write(f'student {student_id}: courses {first} and {second} overlap')
+        self.stdout.write(f'{len(rooms)} room conflicts, {len(students)} student conflicts')
+
+        self.probe(index, options['probes'])
+
+    def probe(self, index, probes):
+        rooms = list(index.rooms)
+        courses = list(index.by_course)
+        if not probes or not rooms or not courses:
+            return
+
+        rng = random.Random(0)
+        started = time.perf_counter()
+        for _ in range(probes):
+            room_id, day_id = rng.choice(rooms)
+            start = rng.randrange(8 * 60, 18 * 60)
+            index.room_conflict(room_id, day_id, start, start + 90)
+            index.course_conflict(rng.choice(courses), rng.sample(courses, min(6, len(courses))))
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f'{probes} room + selection checks: {elapsed / probes * 1e6:.1f}us per check')
@@ -0,0 +1,264 @@
+import json
+import random
+import time
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import F, Q
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from app import admission, eligibility, timetable
+from app.datagen import DEFAULT_VOLUMES, DatasetGenerator, scaled
+from app.management.benchmark import throwaway_database
+from app.models import Class, Course, CourseEvent, Department, Food, Professor, Student, Term
+from app.profiling import percentile
+
+# (name, method, url, query budget); urls are filled from the sampled ``ids`` of every iteration
+ENDPOINTS = [
+    ('class_schedule', 'get', '/api/class/schedule/{student_id}/', 3),
+    ('transcript', 'get', '/api/transcript/{student_id}/', 2),
+    ('gpa', 'get', '/api/gpa/{student_id}/', 2),
+    ('attendance', 'get', '/api/attendance/{student_id}/', 2),
+    ('attendance_summary', 'get', '/api/attendance/summary/{student_id}/', 2),
+    ('class_attendance_summary', 'get', '/api/attendance/class/{class_id}/summary/', 2),
+    ('absence_limit', 'get', '/api/attendance/over-limit/', 1),
+    ('course_eligibility', 'get', '/api/course/eligibility/{student_id}/', 3),
+    ('student_feed', 'get', '/api/feed/{student_id}/', 4),
+    ('student_feed_poll', 'get', '/api/feed/{student_id}/?since={feed_cursor}', 4),
+    ('course_detail', 'get', '/api/course/detail/{course_id}/', 3),
+    ('course_detail_unchanged', 'get', '/api/course/detail/{course_id}/', 1),
+    ('examination_schedule', 'get', '/api/examination/schedule/{course_id}/', 3),
+    ('examination_schedule_unchanged', 'get', '/api/examination/schedule/{course_id}/', 1),
+    ('term_list', 'get', '/api/terms/', 2),
+    ('term_list_unchanged', 'get', '/api/terms/', 1),
+    ('food_menu', 'get', '/api/food/menu/', 2),
+    ('food_menu_unchanged', 'get', '/api/food/menu/', 1),
+    ('student_detail', 'get', '/api/students/{student_id}/', 2),
+    ('students_with_alif', 'get', '/api/students/alif/?year_of_entry={year}', 2),
+    ('honours_top', 'get', '/api/honours/{year}/?top=20', 1),
+    ('honours_standing', 'get', '/api/honours/standing/{student_id}/', 2),
+    ('student_profile_update', 'patch', '/api/student/profile/update/{student_id}/', 4),
+    ('food_reservation', 'post', '/api/food/reservation/{student_id}/{food_id}/', 10),
+    ('food_reservation_cancel', 'delete', '/api/food/reservation/{student_id}/{food_id}/', 11),
+    ('selection_window', 'get', '/api/course/selection/{student_id}/window/', 3),
+    ('course_selection', 'post', '/api/course/selection/{student_id}/{free_course_id}/', 17),
+    ('course_deselection', 'delete', '/api/course/selection/{student_id}/{free_course_id}/', 10),
+    ('professor_rating', 'post', '/api/professor/rating/{student_id}/{professor_id}/', 10),
+    ('professor_ranking', 'get', '/api/professor/ranking/?department={department}', 1),
+    ('roll_call', 'post', '/api/attendance/rollcall/{class_id}/', 11),
+    ('message_send', 'post', '/api/message/send/{student_pk}/{professor_pk}/', 6),
+    ('message_inbox', 'get', '/api/message/inbox/{professor_id}/', 2),
+    ('message_unread', 'get', '/api/message/inbox/{professor_id}/unread/', 1),
+    ('message_thread_read', 'post', '/api/message/inbox/{professor_id}/read/{student_id}/', 6),
+    ('message_outbox', 'get', '/api/message/outbox/{student_id}/', 2),
+    ('weekly_food_reservation', 'post', '/api/food/reservation/{student_id}/week/', 7),
+    ('balance_deposit', 'post', '/api/food/deposit/{student_id}/', 8),
+    ('class_deletion', 'delete', '/api/class/deletion/{student_id}/{class_id}/', 10),
+    ('async_class_schedule', 'get', '/api/async/class/schedule/{student_id}/', 3),
+    ('async_transcript', 'get', '/api/async/transcript/{student_id}/', 2),
+    ('async_attendance', 'get', '/api/async/attendance/{student_id}/', 2),
+    ('async_examination_schedule', 'get', '/api/async/examination/schedule/{course_id}/', 2),
+    ('async_course_detail', 'get', '/api/async/course/detail/{course_id}/', 2),
+    ('transcript_export', 'get', '/api/transcript/export/{entry_year}/', 4),
+    ('bulk_import', 'post', '/api/import/students/', 13),
+    ('timetable_conflicts', 'get', '/api/timetable/conflicts/', 3),
+    ('read_model_stats', 'get', '/api/cache/stats/', 2),
+    ('profiler_summary', 'get', '/api/profiler/summary/', 2),
+]
+
+# request bodies, built from the sampled ids
+BODIES = {
+    'student_profile_update': lambda ids: {'first_name': 'Bench'},
+    'professor_rating': lambda ids: {'rating': '4.25'},
+    'roll_call': lambda ids: {'date': '2024-02-01', 'present': [ids['student_id']]},
+    'message_send': lambda ids: {'subject': 'Bench', 'content': 'Is the midterm open book?'},
+    'weekly_food_reservation': lambda ids: {'start_date': ids['menu_start'], 'meal': ids['meal']},
+    'balance_deposit': lambda ids: {'amount': 100000},
+    'bulk_import': lambda ids: {'file': SimpleUploadedFile('students.csv', (
+        'student_id,first_name,last_name,academic_year,semester\n'
+        f"{ids['student_id']},Bench,Import,{ids['entry_year']},{ids['entry_semester']}\n"
+    ).encode())},
+}
+
+# bodies sent as multipart/form-data instead of JSON
+UPLOADS = {'bulk_import'}
+
+# endpoints that need a staff login; they are requested with a second, logged in client
+ADMIN = {'balance_deposit', 'transcript_export', 'bulk_import', 'timetable_conflicts', 'read_model_stats', 'profiler_summary'}
+
+# the only statuses an endpoint may answer with during the run; any other fails the benchmark
+EXPECTED_STATUSES = {'get': {200}, 'post': {201}, 'patch': {200}, 'delete': {204}}
+STATUSES = {
+    'course_detail_unchanged': {304},
+    'examination_schedule_unchanged': {304},
+    'term_list_unchanged': {304},
+    'food_menu_unchanged': {304},
+    # a second rating of the same professor by the same student updates it
+    'professor_rating': {200, 201},
+    'message_thread_read': {200},
+    'bulk_import': {200},
+}
+
+# conditional GETs revalidating the ETag the previous request to the same url got; answered 304 when unchanged
+REVALIDATE = {'course_detail_unchanged', 'examination_schedule_unchanged', 'term_list_unchanged',
+              'food_menu_unchanged'}
+
+
+class Command(BaseCommand):
+    help = 'Seed a realistic dataset and check every API endpoint against a query budget and a latency baseline'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=10000)
+        parser.add_argument('--courses', type=int, default=1000)
+        parser.add_argument('--grades', type=int, default=500000)
+        parser.add_argument('--attendance', type=int, default=100000)
+        parser.add_argument('--scale', type=float, default=1.0, help='multiply every volume, e.g. 0.01 for a smoke run')
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--seed', type=int, default=1402)
+        parser.add_argument('--only', nargs='*', help='benchmark only these endpoint names')
+        parser.add_argument('--output', help='write the measured results to this JSON file')
+        parser.add_argument('--compare', help='fail when an endpoint regresses against this baseline JSON file')
+        parser.add_argument('--tolerance', type=float, default=0.25,
+                            help='allowed relative p95 slowdown before --compare fails')
+        parser.add_argument('--min-delta-ms', type=float, default=1.0,
+                            help='ignore p95 slowdowns smaller than this, to absorb timer noise')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        volumes = {**DEFAULT_VOLUMES, **{key: options[key] for key in ('students', 'courses', 'grades', 'attendance')}}
+        volumes = scaled(volumes, options['scale'])
+
+        with throwaway_database():
+            started = time.perf_counter()
+            DatasetGenerator(seed=options['seed'], **volumes).generate()
+            self.stdout.write(f'seeded {volumes} in {time.perf_counter() - started:.1f}s')
+            # the seeded selection dates are in the past; open every window (and all of its waves) for the run
+            Department.objects.update(course_selection_date=timezone.localdate() - timedelta(days=1))
+            admission.invalidate()
+
+            endpoints = [e for e in ENDPOINTS if not options['only'] or e[0] in options['only']]
+            results = self.measure(rng, endpoints, options['iterations'])
+
+        self.print_results(results)
+        failures = [f"{name}: {row['queries']} queries, budget is {row['budget']}"
+                    for name, row in results.items() if row['queries'] > row['budget']]
+        failures += [f"{name}: answered {row['unexpected']}, expected {row['expected']}"
+                     for name, row in results.items() if row['unexpected']]
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump({'volumes': volumes, 'endpoints': results}, f, indent=2, sort_keys=True)
+            self.stdout.write(f"results written to {options['output']}")
+
+        if options['compare']:
+            with open(options['compare']) as f:
+                baseline = json.load(f)['endpoints']
+            failures += self.regressions(results, baseline, options['tolerance'], options['min_delta_ms'])
+
+        if failures:
+            raise CommandError('Benchmark failed:\n  ' + '\n  '.join(failures))
+        self.stdout.write(self.style.SUCCESS('All endpoints within budget'))
+
+    def sample_ids(self, rng, student_pks, course_pks, food_pks, years, professors, menu):
+        student_pk = rng.choice(student_pks)
+        student = Student.objects.select_related('term').get(pk=student_pk)
+        enrolled = set(student.courses_taken.values_list('pk', flat=True))
+        reserved = set(student.foodreservation_set.values_list('food_id', flat=True))
+        free_courses = Course.objects.exclude(pk__in=enrolled) \
+            .filter(Q(capacity__isnull=True) | Q(seats_taken__lt=F('capacity'))).order_by('seats_taken')[:50]
+        free_course = next((course for course in free_courses if timetable.student_conflict(student, course) is None
+                            and not eligibility.missing_prerequisites(student, course)), free_courses[0])
+        professor = rng.choice(professors)
+        latest_event = CourseEvent.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+        class_id = Class.objects.filter(course_id__in=enrolled or course_pks).values_list('pk', flat=True).first()
+        return {
+            'student_id': student.student_id,
+            'student_pk': student.pk,
+            'class_id': class_id,
+            'professor_id': professor.professor_id,
+            'professor_pk': professor.pk,
+            'department': professor.department,
+            'course_id': rng.choice(course_pks),
+            'free_course_id': free_course.pk,
+            'food_id': rng.choice([pk for pk in food_pks if pk not in reserved] or food_pks),
+            'year': rng.choice(years),
+            'feed_cursor': rng.randrange(latest_event + 1),
+            'entry_year': student.term.academic_year,
+            'entry_semester': student.term.semester,
+            'menu_start': menu[0].date().isoformat(),
+            'meal': rng.choice(menu[1]),
+        }
+
+    def measure(self, rng, endpoints, iterations):
+        client = Client(HTTP_HOST='localhost')
+        staff = Client(HTTP_HOST='localhost')
+        staff.force_login(User.objects.create_superuser('bench', 'bench@localhost', None))
+        student_pks = list(Student.objects.values_list('pk', flat=True))
+        course_pks = list(Course.objects.values_list('pk', flat=True))
+        food_pks = list(Food.objects.values_list('pk', flat=True))
+        years = sorted(set(Term.objects.values_list('academic_year', flat=True)))
+        professors = list(Professor.objects.order_by('pk'))
+        menu = (Food.objects.order_by('date').values_list('date', flat=True).first(),
+                sorted(set(Food.objects.values_list('meal', flat=True))))
+
+        samples = {name: {'queries': 0, 'latencies': [], 'statuses': set()} for name, *_ in endpoints}
+        etags = {}
+        for _ in range(iterations):
+            ids = self.sample_ids(rng, student_pks, course_pks, food_pks, years, professors, menu)
+            for name, method, url, budget in endpoints:
+                data = BODIES[name](ids) if name in BODIES else None
+                url = url.format(**ids)
+                headers = {'HTTP_IF_NONE_MATCH': etags.get(url, '')} if name in REVALIDATE else {}
+                if name not in UPLOADS:
+                    headers['content_type'] = 'application/json'
+                with CaptureQueriesContext(connection) as queries:
+                    started = time.perf_counter()
+                    response = getattr(staff if name in ADMIN else client, method)(url, data, **headers)
+                    if response.streaming:
+                        # a streamed body runs its queries as it is read
+                        b''.join(response.streaming_content)
+                    elapsed = time.perf_counter() - started
+                if response.has_header('ETag'):
+                    etags[url] = response['ETag']
+
+                sample = samples[name]
+                sample['queries'] = max(sample['queries'], len(queries))
+                sample['latencies'].append(elapsed)
+                sample['statuses'].add(response.status_code)
+
+        return {
+            name: {
+                'budget': budget,
+                'queries': samples[name]['queries'],
+                'p50_ms': round(percentile(samples[name]['latencies'], 50) * 1000, 3),
+                'p95_ms': round(percentile(samples[name]['latencies'], 95) * 1000, 3),
+                'statuses': sorted(samples[name]['statuses']),
+                'expected': sorted(STATUSES.get(name, EXPECTED_STATUSES[method])),
+                'unexpected': sorted(samples[name]['statuses'] - STATUSES.get(name, EXPECTED_STATUSES[method])),
+            }
+            for name, method, url, budget in endpoints
+        }
+
+    def regressions(self, results, baseline, tolerance, min_delta_ms):
+        failures = []
+        for name, row in results.items():
+            previous = baseline.get(name)
+            if previous is None:
+                continue
+            if row['queries'] > previous['queries']:
+                failures.append(f"{name}: {row['queries']} queries, baseline has {previous['queries']}")
+            slower = row['p95_ms'] - previous['p95_ms']
+            if slower > min_delta_ms and row['p95_ms'] > previous['p95_ms'] * (1 + tolerance):
+                failures.append(f"{name}: p95 {row['p95_ms']}ms, baseline has {previous['p95_ms']}ms")
+        return failures
+
+    def print_results(self, results):
+        self.stdout.write(f"{'endpoint':<32}{'queries':>8}{'budget':>8}{'p50 ms':>10}{'p95 ms':>10}  statuses")
+        for name, row in results.items():
+            self.stdout.write(f"{name:<32}{row['queries']:>8}{row['budget']:>8}{row['p50_ms']:>10}"
+                              f"{row['p95_ms']:>10}  {row['statuses']}")
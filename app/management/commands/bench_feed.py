@@ -0,0 +1,110 @@
+import random
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+
+from app import feed
+from app.datagen import DEFAULT_VOLUMES, DatasetGenerator, scaled
+from app.management.benchmark import throwaway_database
+from app.models import Announcement, Course, Student
+from app.profiling import percentile
+
+READS = ('cold', 'warm', 'poll', 'older')
+
+
+class Command(BaseCommand):
+    help = 'Compare fan-out-on-write, merge-on-read and the configured hybrid for the student course feed'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', type=float, default=0.1, help='multiply every volume of the seeded dataset')
+        parser.add_argument('--announcements', type=int, default=20000)
+        parser.add_argument('--assignments', type=int, default=20000)
+        parser.add_argument('--students', type=int, default=200, help='students whose feeds are read')
+        parser.add_argument('--publishes', type=int, default=20, help='announcements published per strategy')
+        parser.add_argument('--seed', type=int, default=1402)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        volumes = {**DEFAULT_VOLUMES, 'announcements': options['announcements'],
+                   'assignments': options['assignments']}
+        volumes = scaled(volumes, options['scale'])
+
+        with throwaway_database():
+            started = time.perf_counter()
+            DatasetGenerator(seed=options['seed'], **volumes).generate()
+            self.stdout.write(f'seeded {volumes} in {time.perf_counter() - started:.1f}s')
+
+            largest = Course.objects.annotate(size=Count('students')).order_by('-size').first()
+            students = list(Student.objects.all())
+            students = rng.sample(students, min(options['students'], len(students)))
+            strategies = [
+                ('fan-out', largest.size),
+                ('merge', -1),
+                (f'hybrid ({settings.FEED_FANOUT_LIMIT})', settings.FEED_FANOUT_LIMIT),
+            ]
+            results = {name: self.measure(limit, students, largest, options['publishes'])
+                       for name, limit in strategies}
+
+        self.print_results(results)
+
+    def measure(self, limit, students, largest, publishes):
+        started = time.perf_counter()
+        events, items = feed.rebuild(limit)
+        result = {'events': events, 'feed_items': items, 'rebuild_s': time.perf_counter() - started}
+
+        with override_settings(FEED_FANOUT_LIMIT=limit):
+            latencies = []
+            for i in range(publishes):
+                # the largest course is fan-out's worst case; rolled back to keep the strategies comparable
+                with transaction.atomic():
+                    started = time.perf_counter()
+                    Announcement.objects.create(course=largest, title=f'Bench {i}', content='Benchmark announcement')
+                    latencies.append(time.perf_counter() - started)
+                    transaction.set_rollback(True)
+            result['publish'] = {'p50_ms': percentile(latencies, 50) * 1000,
+                                 'p95_ms': percentile(latencies, 95) * 1000}
+
+        caches['read_models'].clear()
+        samples = {read: {'queries': [], 'latencies': []} for read in READS}
+        for student in students:
+            page = self.read(samples['cold'], student)
+            self.read(samples['warm'], student)
+            self.read(samples['poll'], student, since=page[min(len(page), 5) - 1]['id'] if page else 0)
+            if page:
+                self.read(samples['older'], student, before=page[-1]['id'])
+
+        for read, sample in samples.items():
+            result[read] = {
+                'queries': max(sample['queries'], default=0),
+                'p50_ms': percentile(sample['latencies'], 50) * 1000,
+                'p95_ms': percentile(sample['latencies'], 95) * 1000,
+            }
+        return result
+
+    def read(self, sample, student, since=None, before=None):
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            events = feed.feed(student, since, before)
+            sample['latencies'].append(time.perf_counter() - started)
+        sample['queries'].append(len(queries))
+        return events
+
+    def print_results(self, results):
+        self.stdout.write(f"{'strategy':<16}{'events':>8}{'items':>10}{'rebuild s':>11}{'publish p50':>13}"
+                          f"{'publish p95':>13}")
+        for name, row in results.items():
+            self.stdout.write(f"{name:<16}{row['events']:>8}{row['feed_items']:>10}{row['rebuild_s']:>11.2f}"
+                              f"{row['publish']['p50_ms']:>13.3f}{row['publish']['p95_ms']:>13.3f}")
+
+        self.stdout.write('')
+        self.stdout.write(f"{'strategy':<16}{'read':<8}{'queries':>8}{'p50 ms':>10}{'p95 ms':>10}")
+        for name, row in results.items():
+            for read in READS:
+                self.stdout.write(f"{name:<16}{read:<8}{row[read]['queries']:>8}{row[read]['p50_ms']:>10.3f}"
+                                  f"{row[read]['p95_ms']:>10.3f}")
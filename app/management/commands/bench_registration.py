@@ -0,0 +1,146 @@
+import queue
+import threading
+import time
+from datetime import time as clock
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connections
+
+from app import admission, registration
+from app.management.benchmark import throwaway_database
+from app.models import Class, Course, Professor, Room, Student, Term
+from app.profiling import percentile
+
+
+class Command(BaseCommand):
+    help = 'Hammer the registration engine from parallel workers and check that no seat is lost or oversold'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=2000)
+        parser.add_argument('--seats', type=int, default=500)
+        parser.add_argument('--workers', type=int, default=16)
+        parser.add_argument('--retries', type=int, default=50,
+                            help='retries per request when the database reports a lock timeout')
+        parser.add_argument('--max-in-flight', type=int, default=0,
+                            help='admit requests through a waiting room allowing this many registrations at once')
+        parser.add_argument('--rate', type=float, default=1000,
+                            help="the waiting room's admissions per second, with --max-in-flight")
+
+    def handle(self, *args, **options):
+        with throwaway_database():
+            course, students = self.seed(options['students'], options['seats'])
+            room = None
+            if options['max_in_flight']:
+                room = admission.WaitingRoom(options['rate'], options['max_in_flight'])
+            result = self.run(course, students, options['workers'], options['retries'], room)
+            self.report(course, result, options)
+
+    def seed(self, student_count, seats):
+        term = Term.objects.create(academic_year=1402, semester='fall')
+        professor = Professor.objects.create(first_name='Bench', last_name='Mark', professor_id='P-BENCH',
+                                             department='Computer')
+        room = Room.objects.create(name='Bench hall', capacity=seats)
+        course = Course.objects.create(code='BENCH-1', title='Registration benchmark', professor=professor,
+                                       credits=3)
+        Class.objects.create(room=room, course=course, start_time=clock(8), end_time=clock(10))
+
+        Student.objects.bulk_create(
+            Student(first_name='Student', last_name=str(i), student_id=f'B{i:08d}', balance=0,
+                    total_credits_taken=0, term=term)
+            for i in range(student_count)
+        )
+        course.refresh_from_db()
+        return course, list(Student.objects.all())
+
+    def run(self, course, students, workers, retries, room=None):
+        pending = queue.Queue()
+        for student in students:
+            pending.put(student)
+
+        lock = threading.Lock()
+        result = {'accepted': 0, 'full': 0, 'failed': 0, 'retries': 0, 'queued': 0, 'in_flight': 0, 'peak': 0,
+                  'latencies': []}
+
+        def admitted(student):
+            # the bench's stand-in for admission.admitted: the waiting room without the window check
+            while True:
+                try:
+                    room.enter(student.pk)
+                    break
+                except admission.Queued as e:
+                    with lock:
+                        result['queued'] += 1
+                    time.sleep(min(e.retry_after, e.position / room.rate) if room.rate else e.retry_after)
+            with lock:
+                result['in_flight'] += 1
+                result['peak'] = max(result['peak'], result['in_flight'])
+
+        def left():
+            with lock:
+                result['in_flight'] -= 1
+            room.leave()
+
+        def worker():
+            try:
+                while True:
+                    try:
+                        student = pending.get_nowait()
+                    except queue.Empty:
+                        return
+                    if room is not None:
+                        admitted(student)
+                    try:
+                        outcome, attempts, elapsed = self.attempt(course, student, retries)
+                    finally:
+                        if room is not None:
+                            left()
+                    with lock:
+                        result[outcome] += 1
+                        result['retries'] += attempts
+                        result['latencies'].append(elapsed)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=worker) for _ in range(workers)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        result['elapsed'] = time.perf_counter() - started
+        return result
+
+    def attempt(self, course, student, retries):
+        started = time.perf_counter()
+        for attempt in range(retries + 1):
+            try:
+                registration.register(student, course)
+                return 'accepted', attempt, time.perf_counter() - started
+            except registration.CourseFull:
+                return 'full', attempt, time.perf_counter() - started
+            except OperationalError:
+                time.sleep(0.001 * (attempt + 1))
+        return 'failed', retries, time.perf_counter() - started
+
+    def report(self, course, result, options):
+        course.refresh_from_db()
+        enrolled = course.students.count()
+        requests = options['students']
+        latencies = result['latencies']
+
+        self.stdout.write(f"requests:     {requests} from {options['workers']} workers")
+        self.stdout.write(f"elapsed:      {result['elapsed']:.3f}s ({requests / result['elapsed']:.0f} req/s)")
+        self.stdout.write(f"accepted:     {result['accepted']}  rejected (full): {result['full']}  "
+                          f"failed: {result['failed']}  lock retries: {result['retries']}")
+        if options['max_in_flight']:
+            self.stdout.write(f"admission:    at most {result['peak']} registrations at once "
+                              f"(cap {options['max_in_flight']}), {result['queued']} requests told to wait")
+        self.stdout.write(f"latency:      p50 {percentile(latencies, 50) * 1000:.2f}ms  "
+                          f"p95 {percentile(latencies, 95) * 1000:.2f}ms  "
+                          f"p99 {percentile(latencies, 99) * 1000:.2f}ms")
+        self.stdout.write(f"seats:        {course.seats_taken}/{course.capacity} taken, {enrolled} enrolled")
+
+        expected = min(requests, options['seats']) if not result['failed'] else result['accepted']
+        if not (course.seats_taken == enrolled == result['accepted'] == expected) or enrolled > course.capacity:
+            raise CommandError('Seat accounting is inconsistent')
+        self.stdout.write(self.style.SUCCESS('No seat lost or oversold'))
@@ -0,0 +1,208 @@
+import os
+import random
+import tempfile
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.core.cache import cache, caches
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test import Client, override_settings
+
+from app.datagen import DEFAULT_VOLUMES, DatasetGenerator, scaled
+from app.management.benchmark import copy_sqlite, throwaway_database
+from app.management.commands.bench_servers import READ_ENDPOINTS
+from app.models import Course, Professor, Student
+from app.profiling import percentile
+
+
+class DatabaseCapacity:
+    """
+    An execute wrapper standing in for database servers of finite capacity.
+
+    Every alias runs at most ``slots`` queries at once and each query holds its slot for an extra
+    ``service_time`` seconds, so adding replicas adds capacity the way separate servers would,
+    instead of every alias sharing one process and one disk. Queries inside a transaction skip
+    the line, so SQLite's single writer never holds its lock while waiting for a slot. Counts
+    queries per alias and remembers which aliases the current thread's request touched.
+    """
+
+    def __init__(self, aliases, slots, service_time):
+        self.slots = {alias: threading.BoundedSemaphore(slots) for alias in aliases} if slots else {}
+        self.service_time = service_time
+        self.queries = Counter()
+        self.lock = threading.Lock()
+        self.local = threading.local()
+
+    def __call__(self, execute, sql, params, many, context):
+        alias = context['connection'].alias
+        with self.lock:
+            self.queries[alias] += 1
+        self.local.touched.add(alias)
+        slot = self.slots.get(alias)
+        if slot is None or context['connection'].in_atomic_block:
+            return execute(sql, params, many, context)
+        with slot:
+            if self.service_time:
+                time.sleep(self.service_time)
+            return execute(sql, params, many, context)
+
+
+class Command(BaseCommand):
+    help = ('Load the API GET endpoints with a share of writes through 0..N read replicas and report read '
+            'scaling and whether every client read its own writes')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', type=float, default=0.05, help='multiply every volume of the seeded dataset')
+        parser.add_argument('--replicas', type=int, nargs='+', default=[0, 1, 2, 4])
+        parser.add_argument('--workers', type=int, default=16, help='clients, each with its own cookies')
+        parser.add_argument('--requests', type=int, default=2000, help='requests per replica count')
+        parser.add_argument('--write-ratio', type=float, default=0.05,
+                            help='share of requests that send a message, pinning their client to the primary')
+        parser.add_argument('--db-slots', type=int, default=2,
+                            help='queries each database runs at once; 0 leaves the databases unbounded')
+        parser.add_argument('--query-ms', type=float, default=20,
+                            help='service time every query holds its slot for, on top of running it')
+        parser.add_argument('--sticky-seconds', type=int, default=1, help='REPLICA_STICKY_SECONDS for the run')
+        parser.add_argument('--seed', type=int, default=1402)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        volumes = scaled(DEFAULT_VOLUMES, options['scale'])
+
+        with throwaway_database() as primary:
+            started = time.perf_counter()
+            DatasetGenerator(seed=options['seed'], **volumes).generate()
+            self.stdout.write(f'seeded {volumes} in {time.perf_counter() - started:.1f}s')
+
+            if primary.vendor == 'sqlite':
+                # without WAL every write waits for, and blocks, the readers of the primary file
+                with primary.cursor() as cursor:
+                    cursor.execute('PRAGMA journal_mode=WAL')
+            samples = self.sample_requests(rng, options['requests'], options['write_ratio'])
+            aliases, files = self.add_replicas(primary, max(options['replicas']))
+            try:
+                results = []
+                for count in options['replicas']:
+                    with override_settings(REPLICA_DATABASES=aliases[:count],
+                                           REPLICA_STICKY_SECONDS=options['sticky_seconds']):
+                        results.append({'replicas': count, **self.load(samples, aliases, options)})
+                    self.print_row(results[-1], aliases, header=len(results) == 1)
+            finally:
+                self.drop_replicas(aliases, files)
+
+        violations = sum(row['stale_reads'] for row in results)
+        if violations:
+            raise CommandError(f'{violations} reads after a write went to a replica')
+        self.stdout.write(self.style.SUCCESS('Every client read its own writes from the primary'))
+
+    def sample_requests(self, rng, count, write_ratio):
+        student_ids = list(Student.objects.values_list('pk', 'student_id'))
+        course_ids = list(Course.objects.values_list('pk', flat=True))
+        professor_ids = list(Professor.objects.values_list('pk', flat=True))
+        if not student_ids or not course_ids or not professor_ids:
+            raise CommandError('The seeded dataset has no students, courses or professors; raise --scale')
+
+        samples = []
+        for _ in range(count):
+            student_pk, student_id = rng.choice(student_ids)
+            if rng.random() < write_ratio:
+                samples.append(('post', f'/api/message/send/{student_pk}/{rng.choice(professor_ids)}/',
+                                {'subject': 'Bench', 'content': 'Is the midterm open book?'}))
+            else:
+                _, path, _ = rng.choice(READ_ENDPOINTS)
+                samples.append(('get', path.format(student_id=student_id, course_id=rng.choice(course_ids)), None))
+        return samples
+
+    def add_replicas(self, primary, count):
+        """Register ``count`` replica aliases: SQLite copies of the primary, or the primary itself elsewhere."""
+        aliases, files = [], []
+        for index in range(1, count + 1):
+            alias = f'bench_replica{index}'
+            name = primary.settings_dict['NAME']
+            if primary.vendor == 'sqlite':
+                fd, name = tempfile.mkstemp(prefix=f'fum-{alias}-', suffix='.sqlite3')
+                os.close(fd)
+                copy_sqlite(primary.settings_dict['NAME'], name)
+                files.append(name)
+            connections.settings[alias] = {**primary.settings_dict, 'NAME': name}
+            aliases.append(alias)
+        return aliases, files
+
+    def drop_replicas(self, aliases, files):
+        for alias in aliases:
+            connections[alias].close()
+            del connections.settings[alias]
+        for name in files:
+            os.remove(name)
+
+    def load(self, samples, aliases, options):
+        # every replica count starts from cold caches
+        cache.clear()
+        caches['read_models'].clear()
+        capacity = DatabaseCapacity([DEFAULT_DB_ALIAS, *aliases], options['db_slots'], options['query_ms'] / 1000)
+        pending = iter(samples)
+        lock = threading.Lock()
+        result = {'latencies': [], 'errors': 0, 'sticky_reads': 0, 'stale_reads': 0}
+
+        def worker():
+            client = Client(HTTP_HOST='localhost', raise_request_exception=False)
+            wrote_at = None
+            try:
+                with ExitStack() as stack:
+                    for alias in (DEFAULT_DB_ALIAS, *aliases):
+                        stack.enter_context(connections[alias].execute_wrapper(capacity))
+                    while True:
+                        with lock:
+                            sample = next(pending, None)
+                        if sample is None:
+                            return
+                        method, path, data = sample
+                        capacity.local.touched = set()
+                        started = time.perf_counter()
+                        response = getattr(client, method)(path, data, content_type='application/json')
+                        elapsed = time.perf_counter() - started
+
+                        # reads within the window after this client's write must not touch a replica
+                        sticky = method == 'get' and wrote_at is not None \
+                            and started - wrote_at < options['sticky_seconds']
+                        stale = sticky and bool(capacity.local.touched - {DEFAULT_DB_ALIAS})
+                        if method != 'get':
+                            wrote_at = time.perf_counter()
+                        with lock:
+                            result['latencies'].append(elapsed)
+                            result['errors'] += response.status_code >= 400
+                            result['sticky_reads'] += sticky
+                            result['stale_reads'] += stale
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=worker) for _ in range(options['workers'])]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        latencies = result.pop('latencies')
+        total = sum(capacity.queries.values()) or 1
+        return {
+            **result,
+            'requests': len(latencies),
+            'rps': len(latencies) / elapsed if elapsed else 0,
+            'p50_ms': percentile(latencies, 50) * 1000,
+            'p95_ms': percentile(latencies, 95) * 1000,
+            'shares': {alias: capacity.queries[alias] / total for alias in (DEFAULT_DB_ALIAS, *aliases)},
+        }
+
+    def print_row(self, row, aliases, header=False):
+        if header:
+            self.stdout.write(f"{'replicas':>8}{'requests':>10}{'errors':>8}{'req/s':>8}{'p50 ms':>10}{'p95 ms':>10}"
+                              f"{'sticky':>8}{'stale':>7}  query share (primary, replicas)")
+        shares = ' '.join(f"{row['shares'][alias]:.0%}" for alias in (DEFAULT_DB_ALIAS, *aliases[:row['replicas']]))
+        self.stdout.write(f"{row['replicas']:>8}{row['requests']:>10}{row['errors']:>8}{row['rps']:>8.0f}"
+                          f"{row['p50_ms']:>10.2f}{row['p95_ms']:>10.2f}{row['sticky_reads']:>8}"
+                          f"{row['stale_reads']:>7}  {shares}")
@@ -0,0 +1,144 @@
+import asyncio
+import random
+import time
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app.models import Course, Student
+from app.profiling import percentile
+
+# (name, sync path, async path); filled from a random student and course per request
+READ_ENDPOINTS = [
+    ('class_schedule', '/api/class/schedule/{student_id}/', '/api/async/class/schedule/{student_id}/'),
+    ('transcript', '/api/transcript/{student_id}/', '/api/async/transcript/{student_id}/'),
+    ('attendance', '/api/attendance/{student_id}/', '/api/async/attendance/{student_id}/'),
+    ('examination_schedule', '/api/examination/schedule/{course_id}/', '/api/async/examination/schedule/{course_id}/'),
+    ('course_detail', '/api/course/detail/{course_id}/', '/api/async/course/detail/{course_id}/'),
+]
+
+
+async def read_response(reader):
+    """Read one HTTP/1.1 response and return its status; the body is drained, not decoded."""
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError('server closed the connection')
+    status = int(status_line.split()[1])
+
+    headers = {}
+    while (line := await reader.readline()) not in (b'\r\n', b''):
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+
+    if headers.get('transfer-encoding', '').lower() == 'chunked':
+        while size := int((await reader.readline()).split(b';')[0], 16):
+            await reader.readexactly(size + 2)
+        await reader.readline()
+    else:
+        await reader.readexactly(int(headers.get('content-length', 0)))
+    return status, headers.get('connection', '').lower() == 'close'
+
+
+class Command(BaseCommand):
+    help = ('Load the read endpoints of running WSGI and ASGI servers side by side and report throughput and '
+            'tail latency per concurrency level')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--wsgi', help='base URL of a WSGI server, e.g. http://127.0.0.1:8001')
+        parser.add_argument('--asgi', help='base URL of an ASGI server, e.g. http://127.0.0.1:8002')
+        parser.add_argument('--concurrency', type=int, nargs='+', default=[16, 64, 256],
+                            help='clients with one keep-alive connection each')
+        parser.add_argument('--requests', type=int, default=2000, help='requests per server and concurrency level')
+        parser.add_argument('--only', nargs='*', help='load only these endpoint names')
+        parser.add_argument('--sync-on-asgi', action='store_true',
+                            help='also load the synchronous views through the ASGI server')
+        parser.add_argument('--seed', type=int, default=1402)
+
+    def handle(self, *args, **options):
+        runs = []
+        if options['wsgi']:
+            runs.append(('wsgi', 'sync', options['wsgi']))
+        if options['asgi']:
+            runs.append(('asgi', 'async', options['asgi']))
+            if options['sync_on_asgi']:
+                runs.append(('asgi', 'sync', options['asgi']))
+        if not runs:
+            raise CommandError('Give --wsgi and/or --asgi with the base URL of a running server')
+
+        # the servers must be serving this database so that the sampled ids exist
+        student_ids = list(Student.objects.values_list('student_id', flat=True))
+        course_ids = list(Course.objects.values_list('pk', flat=True))
+        if not student_ids or not course_ids:
+            raise CommandError('The database has no students or courses; run generate_data first')
+
+        endpoints = [e for e in READ_ENDPOINTS if not options['only'] or e[0] in options['only']]
+        rng = random.Random(options['seed'])
+        samples = [(rng.choice(endpoints), rng.choice(student_ids), rng.choice(course_ids))
+                   for _ in range(options['requests'])]
+        # both servers get the same request sequence, through their sync or async paths
+        paths = {
+            flavour: [(sync if flavour == 'sync' else asynchronous).format(student_id=student_id, course_id=course_id)
+                      for (_, sync, asynchronous), student_id, course_id in samples]
+            for flavour in ('sync', 'async')
+        }
+
+        results = []
+        for concurrency in options['concurrency']:
+            for server, flavour, url in runs:
+                row = asyncio.run(self.load(url, paths[flavour], concurrency))
+                results.append({'server': server, 'views': flavour, 'concurrency': concurrency, **row})
+                self.print_row(results[-1], header=len(results) == 1)
+
+    async def load(self, url, paths, concurrency):
+        parts = urlsplit(url)
+        host, port = parts.hostname, parts.port or 80
+        prefix = parts.path.rstrip('/')
+        pending = iter(paths)
+        latencies, errors = [], 0
+
+        async def client():
+            nonlocal errors
+            reader = writer = None
+            for path in pending:
+                started = time.perf_counter()
+                try:
+                    if writer is None:
+                        reader, writer = await asyncio.open_connection(host, port)
+                    writer.write(f'GET {prefix}{path} HTTP/1.1\r\nHost: {parts.netloc}\r\n\r\n'.encode())
+                    await writer.drain()
+                    status, closed = await read_response(reader)
+                except (OSError, ConnectionError, asyncio.IncompleteReadError, ValueError, IndexError):
+                    errors += 1
+                    if writer is not None:
+                        writer.close()
+                    reader = writer = None
+                    continue
+
+                latencies.append(time.perf_counter() - started)
+                if status >= 400:
+                    errors += 1
+                if closed:
+                    writer.close()
+                    reader = writer = None
+            if writer is not None:
+                writer.close()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+        return {
+            'requests': len(latencies),
+            'errors': errors,
+            'rps': len(latencies) / elapsed if elapsed else 0,
+            'p50_ms': percentile(latencies, 50) * 1000,
+            'p95_ms': percentile(latencies, 95) * 1000,
+            'p99_ms': percentile(latencies, 99) * 1000,
+        }
+
+    def print_row(self, row, header=False):
+        if header:
+            self.stdout.write(f"{'server':<8}{'views':<7}{'clients':>8}{'requests':>10}{'errors':>8}{'req/s':>10}"
+                              f"{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+        self.stdout.write(f"{row['server']:<8}{row['views']:<7}{row['concurrency']:>8}{row['requests']:>10}"
+                          f"{row['errors']:>8}{row['rps']:>10.0f}{row['p50_ms']:>10.2f}{row['p95_ms']:>10.2f}"
+                          f"{row['p99_ms']:>10.2f}")
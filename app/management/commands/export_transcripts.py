@@ -0,0 +1,49 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app import exporter
+
+
+class Command(BaseCommand):
+    help = 'Stream the transcripts of every student of an entry year to a CSV or JSON Lines file, optionally gzipped'
+
+    def add_arguments(self, parser):
+        parser.add_argument('academic_year', type=int, help='entry year of the cohort')
+        parser.add_argument('path', help="file to write, '-' for stdout; a .gz suffix turns on --gzip")
+        parser.add_argument('--format', choices=exporter.FORMATS, help='defaults to the file extension, else csv')
+        parser.add_argument('--gzip', action='store_true')
+        parser.add_argument('--chunk-size', type=int, default=exporter.CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        path = options['path']
+        name = path[:-3] if path.endswith('.gz') else path
+        fmt = options['format'] or ('jsonl' if name.endswith(('.jsonl', '.ndjson')) else 'csv')
+        # the file itself may be going to stdout
+        log = self.stderr if path == '-' else self.stdout
+
+        if not exporter.cohort_exists(options['academic_year']):
+            raise CommandError(f"No students entered in {options['academic_year']}")
+
+        def progress(rows, rate):
+            log.write(f'{rows} rows ({rate:.0f} rows/s)')
+
+        try:
+            export = exporter.TranscriptExport(options['academic_year'], fmt, options['gzip'] or path.endswith('.gz'),
+                                               options['chunk_size'], progress)
+            if path == '-':
+                for data in export:
+                    sys.stdout.buffer.write(data)
+                sys.stdout.buffer.flush()
+            else:
+                with open(path, 'wb') as f:
+                    for data in export:
+                        f.write(data)
+        except (OSError, exporter.ExportFailed) as e:
+            raise CommandError(str(e))
+
+        stats = export.stats
+        log.write(self.style.SUCCESS(
+            f"{stats['students']} students, {stats['rows']} grades in {stats['seconds']}s "
+            f"({stats['rows_per_second']} rows/s), {stats['bytes']} bytes"
+        ))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from app.datagen import DEFAULT_VOLUMES, DatasetGenerator, scaled
+
+
+class Command(BaseCommand):
+    help = 'Fill the database with a deterministic synthetic university for load testing'
+
+    def add_arguments(self, parser):
+        for name, default in DEFAULT_VOLUMES.items():
+            parser.add_argument(f"--{name.replace('_', '-')}", dest=name, type=int, default=default)
+        parser.add_argument('--scale', type=float, default=1.0, help='multiply every population volume')
+        parser.add_argument('--seed', type=int, default=1402)
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        volumes = scaled({name: options[name] for name in DEFAULT_VOLUMES}, options['scale'])
+        generator = DatasetGenerator(seed=options['seed'], batch_size=options['batch_size'],
+                                     log=self.stdout.write, **volumes)
+        counts = generator.generate()
+        self.stdout.write(self.style.SUCCESS(f'Generated {sum(counts.values())} rows'))
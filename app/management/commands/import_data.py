@@ -0,0 +1,38 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app import importer
+
+
+class Command(BaseCommand):
+    help = 'Bulk import students, courses, enrolments or grades from a CSV or JSON Lines file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=list(importer.IMPORTERS))
+        parser.add_argument('path', help="file to read, '-' for stdin")
+        parser.add_argument('--format', choices=importer.FORMATS, help='defaults to the file extension, else csv')
+        parser.add_argument('--chunk-size', type=int, default=importer.CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or importer.format_of(path)
+
+        def progress(rows, rate):
+            self.stdout.write(f'{rows} rows ({rate:.0f} rows/s)')
+
+        try:
+            if path == '-':
+                stats = importer.import_stream(options['kind'], sys.stdin, fmt, options['chunk_size'], progress)
+            else:
+                with open(path, encoding='utf-8-sig', newline='') as f:
+                    stats = importer.import_stream(options['kind'], f, fmt, options['chunk_size'], progress)
+        except (OSError, importer.ImportFailed) as e:
+            raise CommandError(str(e))
+
+        for error in stats['errors']:
+            self.stderr.write(f"line {error['line']}: {error['message']}")
+        self.stdout.write(self.style.SUCCESS(
+            f"{stats['rows']} rows in {stats['seconds']}s ({stats['rows_per_second']} rows/s): "
+            f"{stats['created']} created, {stats['updated']} updated, {stats['skipped']} skipped"
+        ))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from app import attendance
+
+
+class Command(BaseCommand):
+    help = 'Recompute every per-(student, class) attendance summary from the attendance records'
+
+    def handle(self, *args, **options):
+        rows = attendance.rebuild_summaries()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {rows} attendance summaries'))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from app import aggregates
+
+
+class Command(BaseCommand):
+    help = 'Recompute every student GPA aggregate from the signed grades'
+
+    def handle(self, *args, **options):
+        rows = aggregates.rebuild_all()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {rows} grade aggregates'))
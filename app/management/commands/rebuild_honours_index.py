@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from app import honours
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the per-entry-year honours index from the overall GPA aggregates, e.g. at the end of term'
+
+    def handle(self, *args, **options):
+        rows = honours.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Indexed {rows} students'))
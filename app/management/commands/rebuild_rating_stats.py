@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from app import ratings
+
+
+class Command(BaseCommand):
+    help = 'Recompute every professor rating aggregate from the ratings'
+
+    def handle(self, *args, **options):
+        rows = ratings.rebuild_stats()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {rows} professor rating aggregates'))
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from app import standing
+from app.models import Term
+
+
+class Command(BaseCommand):
+    help = ('Compute every student\'s term and cumulative GPA, credits and academic standing from the signed grades '
+            'in one batch, e.g. at the end of term')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--year', type=int, help='only write the standings of this academic year')
+        parser.add_argument('--semester', choices=standing.SEMESTERS, help='with --year, only this semester')
+        parser.add_argument('--batch-size', type=int, default=standing.BATCH_SIZE)
+        parser.add_argument('--chunk-size', type=int, default=standing.CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        term_ids = None
+        if options['year'] is not None:
+            terms = Term.objects.filter(academic_year=options['year'])
+            if options['semester']:
+                terms = terms.filter(semester=options['semester'])
+            term_ids = set(terms.values_list('pk', flat=True))
+            if not term_ids:
+                raise CommandError(f"No term in {options['year']} {options['semester'] or ''}".rstrip())
+        elif options['semester']:
+            raise CommandError('--semester needs --year')
+
+        stats = standing.rebuild(term_ids, options['batch_size'], options['chunk_size'])
+        elapsed = stats['load_s'] + stats['compute_s'] + stats['write_s']
+        self.stdout.write(f"loaded {stats['term_totals']} student grade totals in {stats['load_s']:.2f}s, computed in "
+                          f"{stats['compute_s']:.2f}s, wrote in {stats['write_s']:.2f}s")
+        self.stdout.write(self.style.SUCCESS(
+            f"{stats['standings']} standings of {stats['students']} students over {stats['terms']} terms in "
+            f"{elapsed:.2f}s ({stats['students'] / elapsed if elapsed else 0:.0f} students/s)"
+        ))
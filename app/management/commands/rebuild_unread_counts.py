@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from app import inbox
+
+
+class Command(BaseCommand):
+    help = "Recount every professor's unread messages"
+
+    def handle(self, *args, **options):
+        rows = inbox.rebuild_unread_counts()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {rows} unread message counters'))
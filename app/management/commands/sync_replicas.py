@@ -0,0 +1,22 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from app.management.benchmark import copy_sqlite
+
+
+class Command(BaseCommand):
+    help = 'Copy the primary SQLite database over every SQLite replica, for trying the replica routing locally'
+
+    def handle(self, *args, **options):
+        if not settings.REPLICA_DATABASES:
+            raise CommandError('No replicas configured; set DATABASE_REPLICAS, e.g. DATABASE_REPLICAS=sqlite-replica')
+        primary = connections[DEFAULT_DB_ALIAS]
+        for alias in settings.REPLICA_DATABASES:
+            replica = connections[alias]
+            if primary.vendor != 'sqlite' or replica.vendor != 'sqlite':
+                raise CommandError(f'{alias} is not SQLite; PostgreSQL replicas are kept in step by replication')
+            replica.close()
+            copy_sqlite(primary.settings_dict['NAME'], replica.settings_dict['NAME'])
+            self.stdout.write(f"{alias}: copied {primary.settings_dict['NAME']} to {replica.settings_dict['NAME']}")
+        self.stdout.write(self.style.SUCCESS(f'Synced {len(settings.REPLICA_DATABASES)} replicas'))
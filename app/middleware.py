@@ -0,0 +1,155 @@
+import math
+import random
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+
+from app import profiling, routers
+
+
+class QueryProfileMiddleware:
+    """
+    Profile a sample of requests: view name, wall time, SQL query count, DB time and repeated queries.
+
+    Enabled by ``PROFILER_SAMPLE_RATE`` (0 to 1). Sampled responses carry ``X-Response-Time``,
+    ``X-Query-Count``, ``X-Query-Time`` and ``X-Duplicate-Queries`` headers and are added to the
+    rolling summary served by ``ProfileSummaryView``. Unsampled requests cost a single comparison.
+    A streamed response is recorded once its body has been sent, without the headers.
+    Runs natively under ASGI, so the async views do not hold a thread for the middleware.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, 'PROFILER_SAMPLE_RATE', 0)
+        profiling.store.window = getattr(settings, 'PROFILER_WINDOW', profiling.store.window)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.sampled():
+            return self.get_response(request)
+
+        recorder = profiling.QueryRecorder()
+        started = time.perf_counter()
+        with self.recording(recorder):
+            response = self.get_response(request)
+        return self.record(request, response, recorder, started)
+
+    async def __acall__(self, request):
+        if not self.sampled():
+            return await self.get_response(request)
+
+        recorder = profiling.QueryRecorder()
+        started = time.perf_counter()
+        # connections belong to a thread and the async ORM queries from the request's worker thread,
+        # so the wrappers are installed (and removed) there
+        recording = await sync_to_async(self.recording)(recorder)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(recording.close)()
+        return self.record(request, response, recorder, started)
+
+    def sampled(self):
+        return self.sample_rate and random.random() < self.sample_rate
+
+    def recording(self, recorder):
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(recorder))
+        return stack
+
+    def record(self, request, response, recorder, started):
+        match = request.resolver_match
+        view = match.view_name if match else request.path
+        if response.streaming and not response.is_async:
+            # the body's queries run while the server sends it, after the headers
+            response.streaming_content = self.record_stream(view, response.streaming_content, recorder, started)
+            return response
+
+        wall_time = time.perf_counter() - started
+        profiling.store.record(view, wall_time, recorder)
+        response['X-Response-Time'] = f'{wall_time * 1000:.2f}ms'
+        response['X-Query-Count'] = str(recorder.count)
+        response['X-Query-Time'] = f'{recorder.duration * 1000:.2f}ms'
+        response['X-Duplicate-Queries'] = str(sum(recorder.duplicates.values()))
+        return response
+
+    def record_stream(self, view, content, recorder, started):
+        try:
+            # installed in whichever thread reads the body
+            with self.recording(recorder):
+                yield from content
+        finally:
+            profiling.store.record(view, time.perf_counter() - started, recorder)
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Read from a replica during safe API requests, unless the client wrote in the last ``REPLICA_STICKY_SECONDS``.
+
+    A request that writes, or uses an unsafe method, leaves a ``primary_until`` cookie behind that
+    keeps the client's following reads on the primary until its write has reached the replicas.
+    Runs natively under ASGI; the routing lives in a context variable the async ORM's threads inherit,
+    and a streamed body is read in the routing of its request.
+    """
+    cookie = 'primary_until'
+    safe_methods = ('GET', 'HEAD', 'OPTIONS')
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.routed(request):
+            return self.get_response(request)
+
+        with routers.replica_reads(self.replica(request)) as routing:
+            response = self.carry(self.get_response(request))
+        return self.pin(request, response, routing)
+
+    async def __acall__(self, request):
+        if not self.routed(request):
+            return await self.get_response(request)
+
+        with routers.replica_reads(self.replica(request)) as routing:
+            response = self.carry(await self.get_response(request))
+        return self.pin(request, response, routing)
+
+    def routed(self, request):
+        return settings.REPLICA_DATABASES and request.path.startswith('/api/')
+
+    def replica(self, request):
+        if request.method in self.safe_methods and not self.sticky(request):
+            return random.choice(settings.REPLICA_DATABASES)
+        return None
+
+    def carry(self, response):
+        if response.streaming and not response.is_async:
+            response.streaming_content = routers.carry(response.streaming_content)
+        return response
+
+    def pin(self, request, response, routing):
+        if routing.wrote or request.method not in self.safe_methods:
+            window = settings.REPLICA_STICKY_SECONDS
+            response.set_cookie(self.cookie, str(math.ceil(time.time() + window)), max_age=window, httponly=True,
+                                samesite='Lax')
+        return response
+
+    def sticky(self, request):
+        try:
+            return float(request.COOKIES.get(self.cookie, 0)) > time.time()
+        except ValueError:
+            return False
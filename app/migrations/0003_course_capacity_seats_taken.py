@@ -0,0 +1,44 @@
+# Generated by Django 4.2.1 on 2026-10-18 14:46
+
+from django.db import migrations, models
+from django.db.models import Count, Min, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_seat_counters(apps, schema_editor):
+    Course = apps.get_model('app', 'Course')
+    Class = apps.get_model('app', 'Class')
+    Enrolment = Course.students.through
+
+    smallest_room = Class.objects.filter(course=OuterRef('pk')).values('course') \
+        .annotate(smallest=Min('room__capacity')).values('smallest')
+    enrolled = Enrolment.objects.filter(course_id=OuterRef('pk')).values('course_id') \
+        .annotate(total=Count('pk')).values('total')
+    Course.objects.update(capacity=Subquery(smallest_room), seats_taken=Coalesce(Subquery(enrolled), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0002_term_course_credits_student_balance_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='capacity',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='seats_taken',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='term',
+            name='overall_gpa',
+            field=models.CharField(default='0', max_length=20),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_seat_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.1 on 2026-10-18 14:48
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0003_course_capacity_seats_taken'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='examinationschedule',
+            name='student',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='app.student'),
+        ),
+    ]
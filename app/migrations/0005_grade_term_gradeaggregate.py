@@ -0,0 +1,60 @@
+# Generated by Django 4.2.1 on 2026-10-18 14:48
+
+from django.db import migrations, models
+from django.db.models import ExpressionWrapper, F, FloatField, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+import django.db.models.deletion
+
+
+def fill_grade_aggregates(apps, schema_editor):
+    Grade = apps.get_model('app', 'Grade')
+    GradeAggregate = apps.get_model('app', 'GradeAggregate')
+    Student = apps.get_model('app', 'Student')
+
+    totals = {
+        'credits': Sum('course__credits'),
+        'points': Sum(ExpressionWrapper(F('grade') * F('course__credits'), output_field=FloatField())),
+    }
+    rows = Grade.objects.filter(have_digital_signature=True).values('student_id').annotate(**totals)
+    GradeAggregate.objects.bulk_create(
+        GradeAggregate(student_id=row['student_id'], total_credits=row['credits'], total_grade_points=row['points'])
+        for row in rows
+    )
+
+    # total_credits_taken follows the aggregates from now on; start it from the same signed grades
+    overall_credits = GradeAggregate.objects.filter(student=OuterRef('pk'), term__isnull=True).values('total_credits')
+    Student.objects.update(total_credits_taken=Coalesce(Subquery(overall_credits), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0004_examinationschedule_student'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='grade',
+            name='term',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='app.term'),
+        ),
+        migrations.CreateModel(
+            name='GradeAggregate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_credits', models.PositiveIntegerField(default=0)),
+                ('total_grade_points', models.FloatField(default=0)),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='grade_aggregates', to='app.student')),
+                ('term', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='app.term')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='gradeaggregate',
+            constraint=models.UniqueConstraint(fields=('student', 'term'), name='unique_term_grade_aggregate'),
+        ),
+        migrations.AddConstraint(
+            model_name='gradeaggregate',
+            constraint=models.UniqueConstraint(condition=models.Q(('term__isnull', True)), fields=('student',), name='unique_overall_grade_aggregate'),
+        ),
+        migrations.RunPython(fill_grade_aggregates, migrations.RunPython.noop),
+    ]
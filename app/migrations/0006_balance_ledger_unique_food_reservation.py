@@ -0,0 +1,69 @@
+# Generated by Django 4.2.1 on 2026-10-18 14:49
+
+from django.db import migrations, models
+from django.db.models import Min
+import django.db.models.deletion
+
+
+def clean_balances(apps, schema_editor):
+    Student = apps.get_model('app', 'Student')
+    for student in Student.objects.all():
+        if not str(student.balance).lstrip('-').isdigit():
+            student.balance = '0'
+            student.save(update_fields=['balance'])
+
+
+def remove_duplicate_reservations(apps, schema_editor):
+    FoodReservation = apps.get_model('app', 'FoodReservation')
+    keep = FoodReservation.objects.values('student_id', 'food_id').annotate(first=Min('pk')).values('first')
+    FoodReservation.objects.exclude(pk__in=list(keep)).delete()
+
+
+def open_ledger(apps, schema_editor):
+    Student = apps.get_model('app', 'Student')
+    BalanceTransaction = apps.get_model('app', 'BalanceTransaction')
+    BalanceTransaction.objects.bulk_create(
+        BalanceTransaction(student_id=student_id, amount=balance, reason='deposit')
+        for student_id, balance in Student.objects.exclude(balance=0).values_list('pk', 'balance')
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0005_grade_term_gradeaggregate'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BalanceTransaction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.IntegerField()),
+                ('reason', models.CharField(choices=[('deposit', 'Deposit'), ('reservation', 'Reservation'), ('refund', 'Refund')], max_length=15)),
+                ('date', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.RunPython(clean_balances, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='student',
+            name='balance',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(remove_duplicate_reservations, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='foodreservation',
+            constraint=models.UniqueConstraint(fields=('student', 'food'), name='unique_food_reservation'),
+        ),
+        migrations.AddField(
+            model_name='balancetransaction',
+            name='reservation',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='app.foodreservation'),
+        ),
+        migrations.AddField(
+            model_name='balancetransaction',
+            name='student',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='transactions', to='app.student'),
+        ),
+        migrations.RunPython(open_ledger, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.1 on 2026-10-18 15:10
+
+from django.db import migrations, models
+from django.db.models import Max
+import django.utils.timezone
+
+
+def remove_duplicate_attendance(apps, schema_editor):
+    # keep the latest record of every (student, class, date)
+    Attendance = apps.get_model('app', 'Attendance')
+    keep = Attendance.objects.values('student_id', 'class_num_id', 'date').annotate(last=Max('pk')).values('last')
+    Attendance.objects.exclude(pk__in=list(keep)).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0006_balance_ledger_unique_food_reservation'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='attendance',
+            name='date',
+            field=models.DateField(default=django.utils.timezone.localdate),
+        ),
+        migrations.RunPython(remove_duplicate_attendance, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='attendance',
+            constraint=models.UniqueConstraint(fields=('student', 'class_num', 'date'), name='unique_attendance'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 4.2.1 on 2026-10-18 15:12
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+import django.db.models.deletion
+
+
+def fill_attendance_summaries(apps, schema_editor):
+    Attendance = apps.get_model('app', 'Attendance')
+    AttendanceSummary = apps.get_model('app', 'AttendanceSummary')
+
+    rows = Attendance.objects.values('student_id', 'class_num_id').annotate(
+        present=Count('pk', filter=Q(is_present=True)),
+        absent=Count('pk', filter=Q(is_present=False)),
+    ).order_by()
+    AttendanceSummary.objects.bulk_create(AttendanceSummary(**row) for row in rows)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0007_attendance_unique_roll_call'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('present', models.PositiveIntegerField(default=0)),
+                ('absent', models.PositiveIntegerField(default=0)),
+                ('class_num', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_summaries', to='app.class')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_summaries', to='app.student')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='attendancesummary',
+            constraint=models.UniqueConstraint(fields=('student', 'class_num'), name='unique_attendance_summary'),
+        ),
+        migrations.RunPython(fill_attendance_summaries, migrations.RunPython.noop),
+    ]
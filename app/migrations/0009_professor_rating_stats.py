@@ -0,0 +1,61 @@
+# Generated by Django 4.2.1 on 2026-10-18 15:14
+
+import django.core.validators
+from django.db import migrations, models
+from django.db.models import Count, FloatField, Max, Sum
+from django.db.models.functions import Cast
+import django.db.models.deletion
+
+
+def remove_duplicate_ratings(apps, schema_editor):
+    # keep the latest rating of every (student, professor)
+    ProfessorRating = apps.get_model('app', 'ProfessorRating')
+    keep = ProfessorRating.objects.values('student_id', 'professor_id').annotate(last=Max('pk')).values('last')
+    ProfessorRating.objects.exclude(pk__in=list(keep)).delete()
+
+
+def fill_rating_stats(apps, schema_editor):
+    ProfessorRating = apps.get_model('app', 'ProfessorRating')
+    ProfessorRatingStats = apps.get_model('app', 'ProfessorRatingStats')
+
+    rows = ProfessorRating.objects.values('professor_id').annotate(
+        count=Count('pk'),
+        total=Sum(Cast('rating', FloatField())),
+        total_squares=Sum(Cast('rating', FloatField()) * Cast('rating', FloatField())),
+    ).order_by()
+    ProfessorRatingStats.objects.bulk_create(ProfessorRatingStats(**row) for row in rows)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0008_attendancesummary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProfessorRatingStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('total', models.FloatField(default=0)),
+                ('total_squares', models.FloatField(default=0)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='professorrating',
+            name='rating',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=3, validators=[django.core.validators.MinValueValidator(0), django.core.validators.MaxValueValidator(5)]),
+        ),
+        migrations.RunPython(remove_duplicate_ratings, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='professorrating',
+            constraint=models.UniqueConstraint(fields=('student', 'professor'), name='unique_professor_rating'),
+        ),
+        migrations.AddField(
+            model_name='professorratingstats',
+            name='professor',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='rating_stats', to='app.professor'),
+        ),
+        migrations.RunPython(fill_rating_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 4.2.1 on 2026-10-18 15:16
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_honours_index(apps, schema_editor):
+    GradeAggregate = apps.get_model('app', 'GradeAggregate')
+    HonoursEntry = apps.get_model('app', 'HonoursEntry')
+
+    overall = GradeAggregate.objects.filter(term__isnull=True, total_credits__gt=0).values_list(
+        'student_id', 'student__term__academic_year', 'total_credits', 'total_grade_points',
+    )
+    HonoursEntry.objects.bulk_create(
+        HonoursEntry(student_id=student_id, entry_year=entry_year, gpa=points / credits)
+        for student_id, entry_year, credits, points in overall
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0009_professor_rating_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HonoursEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entry_year', models.PositiveIntegerField()),
+                ('gpa', models.FloatField()),
+                ('student', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='honours', to='app.student')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['entry_year', '-gpa'], name='honours_year_gpa_idx')],
+            },
+        ),
+        migrations.RunPython(fill_honours_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 4.2.1 on 2026-10-18 15:17
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0010_honoursentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Prerequisite',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('group', models.PositiveSmallIntegerField(default=0)),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='prerequisites', to='app.course')),
+                ('required', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='required_by', to='app.course')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='prerequisite',
+            constraint=models.UniqueConstraint(fields=('course', 'group', 'required'), name='unique_prerequisite'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 4.2.1 on 2026-10-18 15:19
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_unread_counts(apps, schema_editor):
+    Messages = apps.get_model('app', 'Messages')
+    Professor = apps.get_model('app', 'Professor')
+    unread = Messages.objects.filter(receiver_id=OuterRef('pk'), is_read=False).order_by() \
+        .values('receiver_id').annotate(count=Count('pk')).values('count')
+    Professor.objects.update(unread_messages=Coalesce(Subquery(unread), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0011_prerequisite'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='messages',
+            name='is_read',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='professor',
+            name='unread_messages',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='messages',
+            index=models.Index(fields=['receiver', '-timestamp'], name='messages_inbox_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='messages',
+            index=models.Index(fields=['sender', '-timestamp'], name='messages_outbox_idx'),
+        ),
+        migrations.RunPython(fill_unread_counts, migrations.RunPython.noop),
+    ]
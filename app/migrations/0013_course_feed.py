@@ -0,0 +1,58 @@
+# Generated by Django 4.2.1 on 2026-10-18 15:23
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_course_events(apps, schema_editor):
+    # existing announcements and deadlines start out merge-on-read; new ones fan out by course size
+    Announcement = apps.get_model('app', 'Announcement')
+    Assignment = apps.get_model('app', 'Assignment')
+    CourseEvent = apps.get_model('app', 'CourseEvent')
+    events = [CourseEvent(course_id=row.course_id, kind='announcement', announcement_id=row.pk, title=row.title,
+                          timestamp=row.date)
+              for row in Announcement.objects.order_by('date', 'pk')]
+    events += [CourseEvent(course_id=row.course_id, kind='assignment', assignment_id=row.pk, title=row.title,
+                           timestamp=row.due_date)
+               for row in Assignment.objects.order_by('pk')]
+    CourseEvent.objects.bulk_create(events, batch_size=5000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0012_inbox_unread_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CourseEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('announcement', 'Announcement'), ('assignment', 'Assignment')], max_length=12)),
+                ('title', models.CharField(max_length=100)),
+                ('timestamp', models.DateTimeField()),
+                ('fanned_out', models.BooleanField(default=False)),
+                ('announcement', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='app.announcement')),
+                ('assignment', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='app.assignment')),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='events', to='app.course')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='FeedItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_items', to='app.courseevent')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_items', to='app.student')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='feeditem',
+            constraint=models.UniqueConstraint(fields=('student', 'event'), name='unique_feed_item'),
+        ),
+        migrations.AddIndex(
+            model_name='courseevent',
+            index=models.Index(fields=['course', 'fanned_out', '-id'], name='course_event_head_idx'),
+        ),
+        migrations.RunPython(fill_course_events, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.1 on 2026-10-18 15:28
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0013_course_feed'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='student',
+            name='department',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='students', to='app.department'),
+        ),
+    ]
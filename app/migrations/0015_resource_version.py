@@ -0,0 +1,35 @@
+# Generated by Django 4.2.1 on 2026-10-18 15:35
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+def create_versions(apps, schema_editor):
+    # every counter starts with a row, so its first bump is a single UPDATE
+    ResourceVersion = apps.get_model('app', 'ResourceVersion')
+    Course = apps.get_model('app', 'Course')
+    names = ['*', 'terms', 'menu']
+    for course_id in Course.objects.values_list('pk', flat=True):
+        names += [f'course:{course_id}', f'exams:{course_id}']
+    ResourceVersion.objects.bulk_create([ResourceVersion(name=name) for name in names], batch_size=1000,
+                                        ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0014_student_department'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResourceVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=64, unique=True)),
+                ('version', models.PositiveBigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.RunPython(create_versions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 4.2.1 on 2026-10-18 15:53
+
+import math
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def clean_overall_gpa(apps, schema_editor):
+    # the column turns numeric next; free text that is no number would not convert
+    Term = apps.get_model('app', 'Term')
+    for term in Term.objects.all():
+        try:
+            gpa = float(term.overall_gpa)
+        except (TypeError, ValueError):
+            gpa = 0
+        if not math.isfinite(gpa):
+            gpa = 0
+        Term.objects.filter(pk=term.pk).update(overall_gpa=repr(gpa))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0015_resource_version'),
+    ]
+
+    operations = [
+        migrations.RunPython(clean_overall_gpa, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='term',
+            name='overall_gpa',
+            field=models.FloatField(default=0),
+        ),
+        migrations.CreateModel(
+            name='TermStanding',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('credits', models.PositiveIntegerField()),
+                ('gpa', models.FloatField()),
+                ('cumulative_credits', models.PositiveIntegerField()),
+                ('cumulative_gpa', models.FloatField()),
+                ('on_probation', models.BooleanField(default=False)),
+                ('probations', models.PositiveIntegerField(default=0)),
+                ('honours', models.BooleanField(default=False)),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='standings', to='app.student')),
+                ('term', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='standings', to='app.term')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='termstanding',
+            constraint=models.UniqueConstraint(fields=('student', 'term'), name='unique_term_standing'),
+        ),
+    ]
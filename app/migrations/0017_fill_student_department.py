@@ -0,0 +1,43 @@
+from collections import Counter, defaultdict
+
+from django.db import migrations
+from django.db.models import Count
+
+
+def fill_student_department(apps, schema_editor):
+    # a student belongs to the department teaching most of their enrolled, then graded, courses;
+    # professors name their department, so students whose courses match no department stay unset
+    Department = apps.get_model('app', 'Department')
+    Student = apps.get_model('app', 'Student')
+    Grade = apps.get_model('app', 'Grade')
+    departments = dict(Department.objects.values_list('name', 'pk'))
+    if not departments:
+        return
+
+    votes = defaultdict(Counter)
+    enrolled = Student.courses.through.objects.values('student_id', 'course__professor__department') \
+        .annotate(count=Count('pk'))
+    graded = Grade.objects.values('student_id', 'course__professor__department').annotate(count=Count('pk'))
+    for weight, rows in ((1000000, enrolled), (1, graded)):
+        for row in rows:
+            department = departments.get(row['course__professor__department'])
+            if department is not None:
+                votes[row['student_id']][department] += weight * row['count']
+
+    students = [
+        Student(pk=student_id, department_id=votes[student_id].most_common(1)[0][0])
+        for student_id in Student.objects.filter(department__isnull=True).values_list('pk', flat=True)
+        if votes[student_id]
+    ]
+    Student.objects.bulk_update(students, ['department'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0016_term_standing'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_student_department, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.1 on 2026-10-18 16:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0017_fill_student_department'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='professor',
+            name='unread_messages',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.1 on 2026-10-18 16:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0018_professor_unread_messages_not_editable'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='course',
+            name='capacity',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AlterField(
+            model_name='course',
+            name='seats_taken',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.2.1 on 2026-10-18 16:31
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0019_course_seat_counters_not_editable'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='foodreservation',
+            name='food',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='app.food'),
+        ),
+        migrations.AlterField(
+            model_name='student',
+            name='balance',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+    ]
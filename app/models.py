@@ -1,5 +1,7 @@
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
+from django.utils import timezone
 
 
 class Student(models.Model):
@@ -7,17 +9,31 @@ class Student(models.Model):
     last_name = models.CharField(max_length=25)
     student_id = models.CharField(max_length=10, unique=True)
     courses = models.ManyToManyField('Course', related_name='enrolled_students', blank=True)
-    balance = models.CharField(max_length=15)
+    # moved only by the ledger functions in ``food``, with F() updates next to a ``BalanceTransaction``
+    balance = models.IntegerField(default=0, editable=False)
     total_credits_taken = models.IntegerField()
     term = models.ForeignKey('Term', on_delete=models.CASCADE)
+    # the department whose course selection window applies to the student
+    department = models.ForeignKey('Department', on_delete=models.SET_NULL, null=True, blank=True,
+                                   related_name='students')
 
     def __str__(self):
         return self.student_id
 
+    def save(self, *args, **kwargs):
+        if not self._state.adding and not kwargs.get('force_insert') and kwargs.get('update_fields') is None:
+            # a full-row save would write back a balance read before a concurrent debit or refund
+            kwargs['update_fields'] = [field.name for field in self._meta.concrete_fields
+                                       if not field.primary_key and field.name != 'balance']
+        super().save(*args, **kwargs)
+
+    def get_gpa(self, term=None):
+        aggregate = self.grade_aggregates.filter(term=term).first()
+        return aggregate.gpa if aggregate else 0
+
     def get_passed_courses(self):
-        passed_courses = self.courses.filter(grade__grade__gte=10)
-        course_numbers = passed_courses.values_list('code', flat=True)
-        return course_numbers
+        from app import read_models
+        return Course.objects.filter(pk__in=read_models.get_passed_courses(self)).values_list('code', flat=True)
 
 
 class Professor(models.Model):
@@ -25,10 +41,19 @@ class Professor(models.Model):
     last_name = models.CharField(max_length=25)
     professor_id = models.CharField(max_length=10, unique=True)
     department = models.CharField(max_length=50)
+    # unread messages in the inbox, kept in step with ``Messages.is_read`` by F() updates only
+    unread_messages = models.PositiveIntegerField(default=0, editable=False)
 
     def __str__(self):
         return self.professor_id
 
+    def save(self, *args, **kwargs):
+        if not self._state.adding and not kwargs.get('force_insert') and kwargs.get('update_fields') is None:
+            # a full-row save would write back a counter read before a concurrent message
+            kwargs['update_fields'] = [field.name for field in self._meta.concrete_fields
+                                       if not field.primary_key and field.name != 'unread_messages']
+        super().save(*args, **kwargs)
+
 
 class Term(models.Model):
     academic_year = models.PositiveIntegerField()
@@ -37,8 +62,9 @@ class Term(models.Model):
         ('spring', 'Spring'),
         ('summer', 'Summer'),
     ])
+    # credits and credit-weighted GPA of every signed grade of the term, written by ``standing.rebuild``
     credits_taken = models.PositiveIntegerField(default=0)
-    overall_gpa = models.CharField(max_length=20)
+    overall_gpa = models.FloatField(default=0)
 
     def __str__(self):
         return f"{self.academic_year} - {self.get_semester_display()}"
@@ -66,26 +92,130 @@ class Food(models.Model):
 
 class FoodReservation(models.Model):
     student = models.ForeignKey(Student, on_delete=models.CASCADE)
-    food = models.ForeignKey(Food, on_delete=models.CASCADE)
+    # a served food keeps its reservations: they are cancelled, and refunded, one by one before it can go
+    food = models.ForeignKey(Food, on_delete=models.PROTECT)
     is_taken = models.BooleanField(default=False)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['student', 'food'], name='unique_food_reservation'),
+        ]
+
     def save(self, *args, **kwargs):
-        if not self.is_taken:
-            student = self.student
-            student.balance -= self.food.price
-            student.save()
+        if not self._state.adding:
+            return super().save(*args, **kwargs)
 
-        super().save(*args, **kwargs)
+        from app import food
+        with transaction.atomic():
+            food.charge(self.student_id, self.food.price)
+            super().save(*args, **kwargs)
+            BalanceTransaction.objects.create(student_id=self.student_id, amount=-self.food.price,
+                                              reason=BalanceTransaction.RESERVATION, reservation=self)
+
+    def delete(self, *args, **kwargs):
+        from app import food
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            if not self.is_taken:
+                food.refund(self.student_id, self.food.price)
+        return result
+
+
+class BalanceTransaction(models.Model):
+    """Append-only ledger of every change to ``Student.balance``."""
+    DEPOSIT = 'deposit'
+    RESERVATION = 'reservation'
+    REFUND = 'refund'
+
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='transactions')
+    amount = models.IntegerField()
+    reason = models.CharField(max_length=15, choices=[
+        (DEPOSIT, 'Deposit'),
+        (RESERVATION, 'Reservation'),
+        (REFUND, 'Refund'),
+    ])
+    reservation = models.ForeignKey(FoodReservation, on_delete=models.SET_NULL, null=True, blank=True)
+    date = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f'{self.student} {self.amount:+d}'
 
 
 class ProfessorRating(models.Model):
     student = models.ForeignKey(Student, on_delete=models.CASCADE)
     professor = models.ForeignKey(Professor, on_delete=models.CASCADE)
-    rating = models.DecimalField(max_digits=3, decimal_places=2, default=0)
+    rating = models.DecimalField(max_digits=3, decimal_places=2, default=0,
+                                 validators=[MinValueValidator(0), MaxValueValidator(5)])
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['student', 'professor'], name='unique_professor_rating'),
+        ]
 
     def __str__(self):
         return f'{self.student} - {self.professor}'
 
+    def save(self, *args, **kwargs):
+        from app import ratings
+
+        update_fields = kwargs.get('update_fields')
+
+        with transaction.atomic():
+            previous = None
+            if not self._state.adding:
+                # locked: a concurrent change of the same rating waits instead of moving the totals
+                # from the same previous value
+                previous = ProfessorRating.objects.select_for_update().filter(pk=self.pk) \
+                    .values_list('professor_id', 'rating').first()
+
+            super().save(*args, **kwargs)
+
+            professor_id, rating = self.professor_id, self.rating
+            if previous is not None and update_fields is not None:
+                # fields left out of ``update_fields`` keep their stored values
+                updated = {self._meta.get_field(name).name for name in update_fields}
+                professor_id = professor_id if 'professor' in updated else previous[0]
+                rating = rating if 'rating' in updated else previous[1]
+
+            if previous is not None and previous[0] != professor_id:
+                # the rating leaves one professor's totals for another's
+                ratings.rating_changed(previous[0], previous[1], None)
+                previous = None
+            ratings.rating_changed(professor_id, previous and previous[1], rating)
+
+    def delete(self, *args, **kwargs):
+        from app import ratings
+
+        with transaction.atomic():
+            # the stored value, not this instance's, leaves the totals
+            stored = ProfessorRating.objects.select_for_update().filter(pk=self.pk) \
+                .values_list('professor_id', 'rating').first()
+            result = super().delete(*args, **kwargs)
+            if stored is not None:
+                ratings.rating_changed(*stored, None)
+
+        return result
+
+
+class ProfessorRatingStats(models.Model):
+    """Running count, sum and sum of squares of a professor's ratings, kept in step with ``ProfessorRating``."""
+    professor = models.OneToOneField(Professor, on_delete=models.CASCADE, related_name='rating_stats')
+    count = models.PositiveIntegerField(default=0)
+    total = models.FloatField(default=0)
+    total_squares = models.FloatField(default=0)
+
+    def __str__(self):
+        return f'{self.professor}'
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0
+
+    @property
+    def variance(self):
+        # population variance; clamped because float sums can leave a tiny negative residue
+        return max(self.total_squares / self.count - self.mean ** 2, 0) if self.count else 0
+
 
 class Course(models.Model):
     code = models.CharField(max_length=10, unique=True)
@@ -93,59 +223,80 @@ class Course(models.Model):
     professor = models.ForeignKey(Professor, on_delete=models.CASCADE)
     students = models.ManyToManyField(Student, related_name='courses_taken', blank=True)
     credits = models.IntegerField()
+    # smallest room capacity among the course's classes, None while no class is defined; both seat
+    # counters are written by ``registration`` with single UPDATEs only
+    capacity = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    seats_taken = models.PositiveIntegerField(default=0, editable=False)
 
     def __str__(self):
         return self.title
 
     def save(self, *args, **kwargs):
+        from app import aggregates
+
         is_new_course = self._state.adding
+        if not is_new_course and not kwargs.get('force_insert') and kwargs.get('update_fields') is None:
+            # a full-row save would write back seat counters read before a concurrent registration
+            kwargs['update_fields'] = [field.name for field in self._meta.concrete_fields
+                                       if not field.primary_key and field.name not in ('capacity', 'seats_taken')]
+        update_fields = kwargs.get('update_fields')
 
-        super().save(*args, **kwargs)
+        with transaction.atomic():
+            previous_credits = None
+            if not is_new_course and (update_fields is None or 'credits' in update_fields):
+                previous_credits = Course.objects.select_for_update().filter(pk=self.pk) \
+                    .values_list('credits', flat=True).first()
 
-        if not is_new_course:
-            self.update_examination_schedule()
+            super().save(*args, **kwargs)
 
-    def delete(self, *args, **kwargs):
-        self.update_examination_schedule()
+            if previous_credits is not None and previous_credits != self.credits:
+                # every signed grade of the course now weighs differently in its students' GPAs
+                aggregates.rebuild_students(Grade.objects.filter(course_id=self.pk, have_digital_signature=True)
+                                            .values_list('student_id', flat=True).distinct())
 
-        super().delete(*args, **kwargs)
+        if not is_new_course:
+            self.update_examination_schedule()
 
     def update_examination_schedule(self):
-        enrolled_students = self.enrolled_students.all()
-
-        for student in enrolled_students:
-            student.examinationschedule_set.filter(course=self).delete()
+        from app import exams
+        exams.rebuild_courses([self.pk])
 
-            examination_schedule = ExaminationSchedule(
-                student=student,
-                course=self,
-                date=self.get_exam_date(),
-                room=self.get_exam_room(),
-                seat_number=self.get_seat_number(),
-                description=self.get_exam_description(),
-            )
-            examination_schedule.save()
+    def get_exam_template(self):
+        return ExaminationSchedule.objects.get(course=self, student__isnull=True)
 
     def get_exam_date(self):
-        exam_schedule = ExaminationSchedule.objects.get(course=self)
-        exam_date = exam_schedule.date
-        return exam_date
+        return self.get_exam_template().date
 
     def get_exam_room(self):
-        exam_schedule = ExaminationSchedule.objects.get(course=self)
-        room = exam_schedule.room
-        return room
+        return self.get_exam_template().room
 
     def get_seat_number(self):
-        enrolled_students = self.students.all()
-        seat_number = enrolled_students.count() + 1
-        return seat_number
+        from app import exams
+        seat = exams.next_seat(self.pk)
+        return seat[1] if seat else None
 
     def get_exam_description(self):
-        exam_schedule = ExaminationSchedule.objects.get(course=self)
-        description = exam_schedule.description
+        return self.get_exam_template().description
 
-        return description
+
+class Prerequisite(models.Model):
+    """
+    One course that satisfies a requirement of ``course``.
+
+    Rows of a course that share a ``group`` are alternatives (any one of them will do); every
+    group of the course has to be satisfied, so the requirements read as an AND of ORs.
+    """
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='prerequisites')
+    required = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='required_by')
+    group = models.PositiveSmallIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['course', 'group', 'required'], name='unique_prerequisite'),
+        ]
+
+    def __str__(self):
+        return f'{self.course} <- {self.required} (group {self.group})'
 
 
 class Day(models.Model):
@@ -179,7 +330,7 @@ class Class(models.Model):
     days = models.ManyToManyField(Day)
 
     def __str__(self):
-        return self.room
+        return self.room.name
 
 
 class StudentCourse(models.Model):
@@ -190,12 +341,69 @@ class StudentCourse(models.Model):
 class Attendance(models.Model):
     student = models.ForeignKey(Student, on_delete=models.CASCADE)
     class_num = models.ForeignKey(Class, on_delete=models.CASCADE)
-    date = models.DateField(auto_now_add=True)
+    date = models.DateField(default=timezone.localdate)
     is_present = models.BooleanField()
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['student', 'class_num', 'date'], name='unique_attendance'),
+        ]
+
     def __str__(self):
         return f'{self.student} - {self.class_num}'
 
+    def save(self, *args, **kwargs):
+        from app import attendance
+
+        update_fields = kwargs.get('update_fields')
+
+        with transaction.atomic():
+            previous = None
+            if not self._state.adding:
+                previous = attendance.stored_state(self.pk)
+
+            super().save(*args, **kwargs)
+
+            current = attendance.record_state(self)
+            if previous is not None and update_fields is not None:
+                # fields left out of ``update_fields`` keep their stored values
+                current = {key: current[key] if field in update_fields or key in update_fields else previous[key]
+                           for field, key in (('student', 'student_id'), ('class_num', 'class_num_id'),
+                                              ('is_present', 'is_present'))}
+            attendance.summaries_changed(attendance.record_deltas([previous], [current]))
+
+    def delete(self, *args, **kwargs):
+        from app import attendance
+
+        with transaction.atomic():
+            # the stored record, not this instance's possibly stale copy, leaves the summaries
+            state = attendance.stored_state(self.pk)
+            result = super().delete(*args, **kwargs)
+            attendance.summaries_changed(attendance.record_deltas([state], []))
+
+        return result
+
+
+class AttendanceSummary(models.Model):
+    """Running present/absent counts of a student in a class, kept in step with ``Attendance``."""
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='attendance_summaries')
+    class_num = models.ForeignKey(Class, on_delete=models.CASCADE, related_name='attendance_summaries')
+    present = models.PositiveIntegerField(default=0)
+    absent = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['student', 'class_num'], name='unique_attendance_summary'),
+        ]
+
+    def __str__(self):
+        return f'{self.student} - {self.class_num}'
+
+    @property
+    def absence_percentage(self):
+        meetings = self.present + self.absent
+        return round(self.absent * 100 / meetings, 2) if meetings else 0
+
 
 class CourseRegistration(models.Model):
     student = models.ForeignKey(Student, on_delete=models.CASCADE)
@@ -207,35 +415,20 @@ class CourseRegistration(models.Model):
     def save(self, *args, **kwargs):
         super().save(*args, **kwargs)
 
-        student = self.student
-        student.term.last().credits_taken += self.course.credits
-        student.save()
-
         # Update examination schedule before selecting a course
-        self.update_examination_schedule(student)
+        self.update_examination_schedule(self.student)
 
     def delete(self, *args, **kwargs):
         student = self.student
 
-        # Update examination schedule before deleting a course
-        self.update_examination_schedule(student)
-
         super().delete(*args, **kwargs)
 
-    def update_examination_schedule(self, student):
-        courses_taken = student.courses_taken.all()
-
-        student.examinationschedule_set.all().delete()
+        # Update examination schedule after dropping the course
+        self.update_examination_schedule(student)
 
-        for course in courses_taken:
-            examination_schedule = ExaminationSchedule(
-                course=course,
-                date=course.get_exam_date(),
-                room=course.get_exam_room(),
-                seat_number=course.get_seat_number(),
-                description=course.get_exam_description(),
-            )
-            examination_schedule.save()
+    def update_examination_schedule(self, student):
+        from app import exams
+        exams.rebuild_student(student.pk)
 
 
 class Department(models.Model):
@@ -250,6 +443,7 @@ class Department(models.Model):
 class Grade(models.Model):
     student = models.ForeignKey(Student, on_delete=models.CASCADE)
     course = models.ForeignKey(Course, on_delete=models.CASCADE)
+    term = models.ForeignKey(Term, on_delete=models.SET_NULL, null=True, blank=True)
     grade = models.FloatField(validators=[MaxValueValidator(20), MinValueValidator(0)])
     date = models.DateTimeField(auto_now_add=True)
     have_digital_signature = models.BooleanField(default=False)
@@ -258,25 +452,100 @@ class Grade(models.Model):
         return f'{self.student} - {self.course}'
 
     def save(self, *args, **kwargs):
-        super().save(*args, **kwargs)
+        from app import aggregates
 
-    def save(self, *args, **kwargs):
-        super().save(*args, **kwargs)
+        update_fields = kwargs.get('update_fields')
+
+        with transaction.atomic():
+            previous = None
+            if not self._state.adding:
+                previous = aggregates.stored_state(self.pk)
+
+            super().save(*args, **kwargs)
+
+            current = aggregates.grade_state(self)
+            if previous is not None and update_fields is not None:
+                # fields left out of ``update_fields`` keep their stored values
+                updated = {self._meta.get_field(name).name for name in update_fields}
+                current = {key: current[key] if field in updated else previous[key]
+                           for key, field in (('student_id', 'student'), ('term_id', 'term'), ('grade', 'grade'),
+                                              ('have_digital_signature', 'have_digital_signature'),
+                                              ('credits', 'course'))}
+            # Move the student's GPA aggregates by the difference instead of re-reading every grade
+            aggregates.grade_changed(previous, current)
+
+    def delete(self, *args, **kwargs):
+        from app import aggregates
 
-        if self.have_digital_signature:
-            student = self.student
-            student.total_credits_taken += self.course.credits
-            student.save()
+        with transaction.atomic():
+            # the stored grade, not this instance's possibly stale copy, leaves the aggregates
+            state = aggregates.stored_state(self.pk)
+            result = super().delete(*args, **kwargs)
+            aggregates.grade_changed(state, None)
 
-            # Calculate the new overall GPA
-            grades = Grade.objects.filter(student=student, have_digital_signature=True)
-            total_credits = sum(grade.course.credits for grade in grades)
-            total_grade_points = sum(grade.grade * grade.course.credits for grade in grades)
-            overall_gpa = total_grade_points / total_credits if total_credits != 0 else 0
+        return result
 
-            # Update the student's overall GPA
-            student.overall_gpa = overall_gpa
-            student.save()
+
+class GradeAggregate(models.Model):
+    """Running credit and grade point totals of a student's signed grades, per term and overall."""
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='grade_aggregates')
+    # None holds the overall totals
+    term = models.ForeignKey(Term, on_delete=models.CASCADE, null=True, blank=True)
+    total_credits = models.PositiveIntegerField(default=0)
+    total_grade_points = models.FloatField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['student', 'term'], name='unique_term_grade_aggregate'),
+            models.UniqueConstraint(fields=['student'], condition=models.Q(term__isnull=True),
+                                    name='unique_overall_grade_aggregate'),
+        ]
+
+    def __str__(self):
+        return f'{self.student} - {self.term or "overall"}'
+
+    @property
+    def gpa(self):
+        return self.total_grade_points / self.total_credits if self.total_credits else 0
+
+
+class TermStanding(models.Model):
+    """A student's end-of-term result: term and cumulative GPA and credits, and the standing they earn."""
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='standings')
+    term = models.ForeignKey(Term, on_delete=models.CASCADE, related_name='standings')
+    credits = models.PositiveIntegerField()
+    gpa = models.FloatField()
+    # every signed credit up to and including this term, and those of grades without a term
+    cumulative_credits = models.PositiveIntegerField()
+    cumulative_gpa = models.FloatField()
+    # term GPA under PROBATION_GPA_THRESHOLD, and the terms on probation so far including this one
+    on_probation = models.BooleanField(default=False)
+    probations = models.PositiveIntegerField(default=0)
+    # term GPA reaching HONOURS_GPA_THRESHOLD
+    honours = models.BooleanField(default=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['student', 'term'], name='unique_term_standing'),
+        ]
+
+    def __str__(self):
+        return f'{self.student} - {self.term}: {self.gpa:.2f}'
+
+
+class HonoursEntry(models.Model):
+    """A student's overall GPA filed under their entry year, ranked by the (entry_year, gpa) index."""
+    student = models.OneToOneField(Student, on_delete=models.CASCADE, related_name='honours')
+    entry_year = models.PositiveIntegerField()
+    gpa = models.FloatField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['entry_year', '-gpa'], name='honours_year_gpa_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.student} - {self.entry_year}: {self.gpa:.2f}'
 
 
 class Announcement(models.Model):
@@ -296,7 +565,45 @@ class Assignment(models.Model):
     due_date = models.DateTimeField()
 
 
+class CourseEvent(models.Model):
+    """
+    One announcement or assignment deadline in the order it was published; the id is the feed cursor.
+
+    Events of courses small enough for fan-out are copied into every enrolled student's feed as
+    ``FeedItem`` rows; the others are merged into the feed on read (see app/feed.py).
+    """
+    KIND_CHOICES = (
+        ('announcement', 'Announcement'),
+        ('assignment', 'Assignment'),
+    )
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='events')
+    kind = models.CharField(max_length=12, choices=KIND_CHOICES)
+    announcement = models.ForeignKey(Announcement, on_delete=models.CASCADE, null=True, blank=True)
+    assignment = models.ForeignKey(Assignment, on_delete=models.CASCADE, null=True, blank=True)
+    title = models.CharField(max_length=100)
+    # the announcement's date or the assignment's deadline
+    timestamp = models.DateTimeField()
+    fanned_out = models.BooleanField(default=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['course', 'fanned_out', '-id'], name='course_event_head_idx'),
+        ]
+
+
+class FeedItem(models.Model):
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='feed_items')
+    event = models.ForeignKey(CourseEvent, on_delete=models.CASCADE, related_name='feed_items')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['student', 'event'], name='unique_feed_item'),
+        ]
+
+
 class ExaminationSchedule(models.Model):
+    # rows without a student are the course's exam template (date, room, description)
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, null=True, blank=True)
     course = models.ForeignKey(Course, on_delete=models.CASCADE)
     date = models.DateTimeField()
     room = models.ForeignKey(Room, on_delete=models.CASCADE)
@@ -310,3 +617,61 @@ class Messages(models.Model):
     subject = models.CharField(max_length=100)
     content = models.TextField()
     timestamp = models.DateTimeField(auto_now_add=True)
+    is_read = models.BooleanField(default=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['receiver', '-timestamp'], name='messages_inbox_idx'),
+            models.Index(fields=['sender', '-timestamp'], name='messages_outbox_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        with transaction.atomic():
+            previous = None
+            if not self._state.adding:
+                # locked: a concurrent save of the same message waits instead of moving the counter twice
+                previous = Messages.objects.select_for_update().filter(pk=self.pk) \
+                    .values_list('is_read', 'receiver_id').first()
+
+            super().save(*args, **kwargs)
+
+            unread = {}
+            if previous is not None:
+                was_read, previous_receiver = previous
+                if not was_read:
+                    unread[previous_receiver] = -1
+                # fields left out of ``update_fields`` keep their stored values
+                is_read = self.is_read if update_fields is None or 'is_read' in update_fields else was_read
+                receiver_id = self.receiver_id if update_fields is None or 'receiver' in update_fields \
+                    else previous_receiver
+            else:
+                is_read, receiver_id = self.is_read, self.receiver_id
+            if not is_read:
+                unread[receiver_id] = unread.get(receiver_id, 0) + 1
+
+            for professor_id, delta in unread.items():
+                if delta > 0:
+                    Professor.objects.filter(pk=professor_id).update(unread_messages=F('unread_messages') + delta)
+                elif delta < 0:
+                    Professor.objects.filter(pk=professor_id, unread_messages__gt=0) \
+                        .update(unread_messages=F('unread_messages') - 1)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            # the post_delete receiver moves the counter by the stored flags, not this instance's
+            # possibly stale copy; a message that is already gone moves nothing
+            stored = Messages.objects.select_for_update().filter(pk=self.pk) \
+                .values_list('is_read', 'receiver_id').first()
+            self.is_read, self.receiver_id = stored or (True, self.receiver_id)
+            return super().delete(*args, **kwargs)
+
+
+class ResourceVersion(models.Model):
+    """Change counter of a resource behind cacheable read endpoints, e.g. ``course:12`` (app/versions.py)."""
+    name = models.CharField(max_length=64, unique=True)
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f'{self.name} v{self.version}'
@@ -0,0 +1,86 @@
+import math
+import re
+import threading
+import time
+from collections import Counter, defaultdict, deque
+
+_whitespace = re.compile(r'\s+')
+_placeholder_lists = re.compile(r'\((?:%s|\?)(?:\s*,\s*(?:%s|\?))*\)')
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(0, math.ceil(pct / 100 * len(ordered)) - 1)
+    return ordered[rank]
+
+
+def fingerprint(sql):
+    """Normalise a parametrised query so repeated executions of the same statement compare equal."""
+    return _placeholder_lists.sub('(...)', _whitespace.sub(' ', sql.strip()))
+
+
+class QueryRecorder:
+    """A ``connection.execute_wrapper`` that counts queries and their time without needing DEBUG."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.fingerprints = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+            self.fingerprints[fingerprint(sql)] += 1
+
+    @property
+    def duplicates(self):
+        """``{fingerprint: executions}`` for the statements that ran more than once (N+1 suspects)."""
+        return {sql: count for sql, count in self.fingerprints.items() if count > 1}
+
+
+class ProfileStore:
+    """Rolling in-process window of the last ``window`` profiles of every view."""
+
+    def __init__(self, window=500):
+        self.window = window
+        self._lock = threading.Lock()
+        self._samples = defaultdict(lambda: deque(maxlen=self.window))
+        self._duplicates = defaultdict(Counter)
+
+    def record(self, view, wall_time, recorder):
+        with self._lock:
+            self._samples[view].append((wall_time, recorder.count, recorder.duration))
+            self._duplicates[view].update(recorder.duplicates)
+
+    def summary(self, top=5):
+        with self._lock:
+            samples = {view: list(rows) for view, rows in self._samples.items()}
+            duplicates = {view: counter.most_common(top) for view, counter in self._duplicates.items()}
+
+        summary = {}
+        for view, rows in samples.items():
+            wall_times = [row[0] for row in rows]
+            summary[view] = {
+                'requests': len(rows),
+                'wall_ms_p50': round(percentile(wall_times, 50) * 1000, 2),
+                'wall_ms_p95': round(percentile(wall_times, 95) * 1000, 2),
+                'queries_avg': round(sum(row[1] for row in rows) / len(rows), 2),
+                'queries_max': max(row[1] for row in rows),
+                'db_ms_avg': round(sum(row[2] for row in rows) / len(rows) * 1000, 2),
+                'duplicate_queries': [{'sql': sql, 'executions': count} for sql, count in duplicates.get(view, [])],
+            }
+        return summary
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self._duplicates.clear()
+
+
+store = ProfileStore()
@@ -0,0 +1,124 @@
+from decimal import Decimal, InvalidOperation
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, ExpressionWrapper, F, FloatField, Sum
+from django.db.models.functions import Cast
+
+from app import indexes, routers
+from app.models import ProfessorRating, ProfessorRatingStats
+
+VERSION_KEY = 'ratings:version'
+RANKING_TIMEOUT = 60 * 60
+
+
+class RatingError(Exception):
+    message = 'Rating failed'
+
+    def __init__(self, message=None):
+        super().__init__(message or self.message)
+        self.message = message or self.message
+
+
+class InvalidRating(RatingError):
+    message = 'Rating must be a number between 0 and 5'
+
+
+def clean_rating(value):
+    try:
+        rating = Decimal(str(value)).quantize(Decimal('0.01'))
+    except (InvalidOperation, ValueError):
+        raise InvalidRating()
+    if not 0 <= rating <= 5:
+        raise InvalidRating()
+    return rating
+
+
+def rate(student, professor, value):
+    """Store the student's rating of the professor and return ``(rating, created)``."""
+    value = clean_rating(value)
+    # get_or_create survives a parallel first rating through the unique constraint, and each
+    # save moves the professor's totals in its own transaction
+    rating, created = ProfessorRating.objects.get_or_create(student=student, professor=professor,
+                                                            defaults={'rating': value})
+    if not created and rating.rating != value:
+        rating.rating = value
+        rating.save()
+    return rating, created
+
+
+def rating_changed(professor_id, previous, current):
+    """
+    Move the professor's running totals from a rating's ``previous`` value to its ``current`` one.
+
+    Either side may be None (rating created or deleted). The totals are changed by one ``F()``
+    update, so concurrent ratings of the same professor never lose an update.
+    """
+    count = (current is not None) - (previous is not None)
+    previous = float(previous or 0)
+    current = float(current or 0)
+    if not count and previous == current:
+        return
+
+    with transaction.atomic(savepoint=False):
+        ProfessorRatingStats.objects.bulk_create([ProfessorRatingStats(professor_id=professor_id)],
+                                                 ignore_conflicts=True)
+        ProfessorRatingStats.objects.filter(professor_id=professor_id).update(
+            count=F('count') + count,
+            total=F('total') + (current - previous),
+            total_squares=F('total_squares') + (current ** 2 - previous ** 2),
+        )
+    invalidate_rankings()
+
+
+def rebuild_stats():
+    """Recompute every professor's totals from the ratings in one grouped query."""
+    totals = ProfessorRating.objects.values('professor_id').annotate(
+        count=Count('pk'),
+        total=Sum(Cast('rating', FloatField())),
+        total_squares=Sum(Cast('rating', FloatField()) * Cast('rating', FloatField())),
+    ).order_by()
+
+    with transaction.atomic():
+        ProfessorRatingStats.objects.all().delete()
+        rows = [ProfessorRatingStats(**row) for row in totals]
+        ProfessorRatingStats.objects.bulk_create(rows, batch_size=1000)
+    invalidate_rankings()
+    return len(rows)
+
+
+def invalidate_rankings():
+    indexes.bump(VERSION_KEY)
+
+
+def build_ranking(department=None, min_ratings=1):
+    stats = ProfessorRatingStats.objects.filter(count__gte=max(min_ratings, 1)).select_related('professor') \
+        .annotate(mean_rating=ExpressionWrapper(F('total') / F('count'), output_field=FloatField())) \
+        .order_by('-mean_rating', '-count', 'professor_id')
+    if department is not None:
+        stats = stats.filter(professor__department=department)
+
+    return [{
+        'professor_id': row.professor.professor_id,
+        'name': f'{row.professor.first_name} {row.professor.last_name}',
+        'department': row.professor.department,
+        'ratings': row.count,
+        'mean': round(row.mean_rating, 3),
+        'variance': round(row.variance, 3),
+    } for row in stats]
+
+
+def get_ranking(department=None, min_ratings=1):
+    """
+    The department's professors ordered by mean rating, from the running totals only.
+
+    Rankings are cached until the next rating change, so reads during evaluation week hit the
+    cache and a rebuild reads one ``ProfessorRatingStats`` row per professor, never the ratings.
+    """
+    key = f'ratings:ranking:{cache.get(VERSION_KEY, 0)}:{min_ratings}:{department or ""}'
+    ranking = cache.get(key)
+    if ranking is None:
+        with routers.primary():
+            ranking = build_ranking(department, min_ratings)
+        cache.set(key, ranking, RANKING_TIMEOUT)
+    return ranking
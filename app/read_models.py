@@ -0,0 +1,201 @@
+import threading
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import Prefetch
+
+from app import routers
+from app.models import Class, Course, Grade
+
+_lock = threading.Lock()
+_stats = Counter()
+
+# smallest grade that passes a course
+PASSING_GRADE = 10
+
+
+def _cache():
+    return caches['read_models']
+
+
+def _key(kind, student_pk):
+    return f'{kind}:{student_pk}'
+
+
+def _count(kind, hit):
+    with _lock:
+        _stats[(kind, 'hits' if hit else 'misses')] += 1
+
+
+def _get(kind, student, build):
+    key = _key(kind, student.pk)
+    document = _cache().get(key)
+    _count(kind, document is not None)
+
+    if document is None:
+        with routers.primary():
+            document = build(student)
+        _cache().set(key, document)
+    return document
+
+
+async def _aget(kind, student, abuild):
+    key = _key(kind, student.pk)
+    document = await _cache().aget(key)
+    _count(kind, document is not None)
+
+    if document is None:
+        with routers.primary():
+            document = await abuild(student)
+        await _cache().aset(key, document)
+    return document
+
+
+def _schedule_courses(student):
+    return student.courses_taken.select_related('professor').prefetch_related(
+        Prefetch('class_set', queryset=Class.objects.select_related('room').order_by('pk'))
+    )
+
+
+def _schedule_row(course):
+    classes = course.class_set.all()
+    return {
+        'course_code': course.code,
+        'course_title': course.title,
+        'professor': f'{course.professor.first_name} {course.professor.last_name}',
+        'class_number': classes[0].room.name if classes else None,
+    }
+
+
+def _transcript_grades(student):
+    return Grade.objects.filter(student=student).select_related('course')
+
+
+def _transcript_row(grade):
+    return {
+        'course_code': grade.course.code,
+        'course_title': grade.course.title,
+        'grade': grade.grade
+    }
+
+
+def build_class_schedule(student):
+    return [_schedule_row(course) for course in _schedule_courses(student)]
+
+
+async def abuild_class_schedule(student):
+    return [_schedule_row(course) async for course in _schedule_courses(student)]
+
+
+def build_transcript(student):
+    return [_transcript_row(grade) for grade in _transcript_grades(student)]
+
+
+async def abuild_transcript(student):
+    return [_transcript_row(grade) async for grade in _transcript_grades(student)]
+
+
+def _passed_query():
+    return Grade.objects.filter(have_digital_signature=True, grade__gte=PASSING_GRADE)
+
+
+def build_passed_courses(student):
+    return frozenset(_passed_query().filter(student=student).values_list('course_id', flat=True))
+
+
+def get_class_schedule(student):
+    return _get('schedule', student, build_class_schedule)
+
+
+def get_transcript(student):
+    return _get('transcript', student, build_transcript)
+
+
+async def aget_class_schedule(student):
+    return await _aget('schedule', student, abuild_class_schedule)
+
+
+async def aget_transcript(student):
+    return await _aget('transcript', student, abuild_transcript)
+
+
+def get_passed_courses(student):
+    """
+    Frozen set of the pks of the courses the student passed with a signed grade.
+
+    Its cached size follows the number of courses passed (a few bytes each), not the largest course pk.
+    """
+    return _get('passed', student, build_passed_courses)
+
+
+def get_passed_courses_many(student_pks):
+    """``{student_pk: passed course pks}`` for many students: one cache round trip and one query for the misses."""
+    student_pks = list(student_pks)
+    cached = _cache().get_many([_key('passed', pk) for pk in student_pks])
+    passed = {pk: cached[_key('passed', pk)] for pk in student_pks if _key('passed', pk) in cached}
+    missing = [pk for pk in student_pks if pk not in passed]
+    with _lock:
+        _stats[('passed', 'hits')] += len(passed)
+        _stats[('passed', 'misses')] += len(missing)
+
+    if missing:
+        built = {pk: set() for pk in missing}
+        with routers.primary():
+            for student_pk, course_pk in _passed_query().filter(student_id__in=missing) \
+                    .values_list('student_id', 'course_id'):
+                built[student_pk].add(course_pk)
+        built = {pk: frozenset(course_pks) for pk, course_pks in built.items()}
+        _cache().set_many({_key('passed', pk): course_pks for pk, course_pks in built.items()})
+        passed.update(built)
+    return passed
+
+
+def _invalidate(kind, student_pks):
+    keys = [_key(kind, pk) for pk in student_pks]
+    # a reader between the delete and the commit would cache the old rows again until TIMEOUT,
+    # so drop the documents once the write is visible
+    transaction.on_commit(lambda: _cache().delete_many(keys))
+
+
+def invalidate_schedules(student_pks):
+    _invalidate('schedule', student_pks)
+
+
+def invalidate_transcripts(student_pks):
+    _invalidate('transcript', student_pks)
+
+
+def invalidate_passed_courses(student_pks):
+    _invalidate('passed', student_pks)
+
+
+def enrolled_student_pks(course_pks):
+    return set(Course.students.through.objects.filter(course_id__in=course_pks).values_list('student_id', flat=True))
+
+
+def graded_student_pks(course_pks):
+    return set(Grade.objects.filter(course_id__in=course_pks).values_list('student_id', flat=True).distinct())
+
+
+def stats():
+    with _lock:
+        counts = dict(_stats)
+
+    result = {}
+    for kind in ('schedule', 'transcript', 'passed'):
+        hits, misses = counts.get((kind, 'hits'), 0), counts.get((kind, 'misses'), 0)
+        result[kind] = {
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': round(hits / (hits + misses), 4) if hits + misses else None,
+        }
+    result['max_entries'] = settings.CACHES['read_models'].get('OPTIONS', {}).get('MAX_ENTRIES')
+    result['timeout'] = _cache().default_timeout
+    return result
+
+
+def reset_stats():
+    with _lock:
+        _stats.clear()
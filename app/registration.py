@@ -0,0 +1,107 @@
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Min, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.dispatch import Signal
+
+from app import eligibility, timetable
+from app.models import Class, Course
+
+Enrolment = Course.students.through
+
+# sent inside the engine's transaction (while the course row is locked) after a student is added
+# or removed, with ``course`` and ``student`` arguments; the engine writes the through table
+# directly, so ``m2m_changed`` is not fired
+student_registered = Signal()
+student_deregistered = Signal()
+
+
+class RegistrationError(Exception):
+    message = 'Registration failed'
+
+    def __init__(self, message=None):
+        super().__init__(message or self.message)
+        self.message = message or self.message
+
+
+class CourseFull(RegistrationError):
+    message = 'Course has no free seats'
+
+
+class AlreadyRegistered(RegistrationError):
+    message = 'Course already selected'
+
+
+class NotRegistered(RegistrationError):
+    message = 'Course not selected by the student'
+
+
+class ScheduleConflict(RegistrationError):
+    message = 'Course clashes with another selected course'
+
+
+class PrerequisitesNotMet(RegistrationError):
+    message = 'Course prerequisites not passed'
+
+
+def is_registered(student, course):
+    return Enrolment.objects.filter(course_id=course.pk, student_id=student.pk).exists()
+
+
+def register(student, course):
+    """
+    Take a seat in ``course`` for ``student``.
+
+    The seat is reserved by a single conditional UPDATE, so parallel requests can never push
+    ``seats_taken`` past ``capacity``; the enrolment row is inserted in the same transaction and
+    a duplicate insert rolls the reserved seat back.
+    """
+    if is_registered(student, course):
+        raise AlreadyRegistered()
+
+    missing = eligibility.missing_prerequisites(student, course)
+    if missing:
+        raise PrerequisitesNotMet('Prerequisites not passed: ' + '; '.join(' or '.join(group) for group in missing))
+
+    conflict = timetable.student_conflict(student, course)
+    if conflict is not None:
+        raise ScheduleConflict(f'Course clashes with {conflict.code} ({conflict.title})')
+
+    with transaction.atomic():
+        reserved = Course.objects.filter(
+            Q(capacity__isnull=True) | Q(seats_taken__lt=F('capacity')),
+            pk=course.pk,
+        ).update(seats_taken=F('seats_taken') + 1)
+        if not reserved:
+            raise CourseFull()
+
+        try:
+            Enrolment.objects.create(course_id=course.pk, student_id=student.pk)
+        except IntegrityError:
+            raise AlreadyRegistered()
+
+        student_registered.send(sender=Course, course=course, student=student)
+
+
+def deregister(student, course):
+    with transaction.atomic():
+        deleted, _ = Enrolment.objects.filter(course_id=course.pk, student_id=student.pk).delete()
+        if not deleted:
+            raise NotRegistered()
+
+        Course.objects.filter(pk=course.pk, seats_taken__gt=0).update(seats_taken=F('seats_taken') - 1)
+
+        student_deregistered.send(sender=Course, course=course, student=student)
+
+
+def refresh_capacity(course_ids):
+    """Copy the smallest room capacity of each course's classes onto ``Course.capacity``."""
+    smallest_room = Class.objects.filter(course=OuterRef('pk')).values('course') \
+        .annotate(smallest=Min('room__capacity')).values('smallest')
+    Course.objects.filter(pk__in=course_ids).update(capacity=Subquery(smallest_room))
+
+
+def refresh_seats_taken(course_ids):
+    """Recount ``Course.seats_taken`` from the enrolment table (for writes that bypass the engine)."""
+    enrolled = Enrolment.objects.filter(course_id=OuterRef('pk')).values('course_id') \
+        .annotate(total=Count('pk')).values('total')
+    Course.objects.filter(pk__in=course_ids).update(seats_taken=Coalesce(Subquery(enrolled), 0))
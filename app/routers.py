@@ -0,0 +1,100 @@
+"""
+Read-replica routing.
+
+``ReplicaRoutingMiddleware`` (app/middleware.py) lets the reads of a safe API request go to one of
+``REPLICA_DATABASES``; everything else, management commands included, uses the primary. Within
+such a request a write, a transaction or a ``primary()`` block moves reads back to the primary,
+and the client keeps reading from the primary for ``REPLICA_STICKY_SECONDS`` after a write.
+"""
+import contextvars
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+_routing = contextvars.ContextVar('routing', default=None)
+
+
+class Routing:
+    """Where the current request reads from; a write moves it to the primary for the rest of the request."""
+
+    def __init__(self, replica):
+        self.replica = replica
+        self.pinned = 0
+        self.wrote = False
+
+
+@contextmanager
+def replica_reads(alias):
+    """Route the body's reads to the replica ``alias`` (the primary when None); yields the ``Routing``."""
+    routing = Routing(alias)
+    token = _routing.set(routing)
+    try:
+        yield routing
+    finally:
+        _routing.reset(token)
+
+
+@contextmanager
+def primary():
+    """
+    Read from the primary inside the body.
+
+    Anything kept past the request (cached documents, process-wide indexes, validators) is built
+    in such a block, so a lagging replica cannot leave it stale until the next invalidation.
+    """
+    routing = _routing.get()
+    if routing is None:
+        yield
+        return
+    routing.pinned += 1
+    try:
+        yield
+    finally:
+        routing.pinned -= 1
+
+
+def carry(iterable):
+    """
+    Iterate ``iterable`` in the routing of the caller.
+
+    A streamed response body is read after the view and the middleware's ``replica_reads`` block
+    have returned; its queries would otherwise run without any routing, on the primary.
+    """
+    context = contextvars.copy_context()
+    iterator = iter(iterable)
+
+    def chunks():
+        while True:
+            try:
+                chunk = context.run(next, iterator)
+            except StopIteration:
+                return
+            yield chunk
+
+    return chunks()
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        routing = _routing.get()
+        if routing is None or routing.replica is None or routing.pinned:
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return routing.replica
+
+    def db_for_write(self, model, **hints):
+        routing = _routing.get()
+        if routing is not None:
+            routing.replica = None
+            routing.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # replicas hold the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        # replicas get their schema from the primary
+        return db not in settings.REPLICA_DATABASES
@@ -0,0 +1,238 @@
+from django.db.models import Subquery
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from app import admission, eligibility, exams, feed, inbox, ratings, read_models, timetable, versions
+from app.models import Announcement, Assignment, Class, Course, CourseRegistration, Department, ExaminationSchedule, \
+    Food, Grade, HonoursEntry, Messages, Prerequisite, Professor, Room, Student, Term
+from app.registration import refresh_capacity, refresh_seats_taken, student_deregistered, student_registered
+
+
+@receiver([post_save, post_delete], sender=Class)
+def class_changed(sender, instance, **kwargs):
+    refresh_capacity([instance.course_id])
+    timetable.invalidate()
+
+
+@receiver(m2m_changed, sender=Class.days.through)
+def class_days_changed(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        timetable.invalidate()
+
+
+@receiver(post_save, sender=Room)
+def room_changed(sender, instance, created, **kwargs):
+    if not created:
+        refresh_capacity(Class.objects.filter(room=instance).values('course_id'))
+
+
+@receiver(m2m_changed, sender=Course.students.through)
+def course_students_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            refresh_seats_taken([instance.pk])
+            exams.rebuild_courses([instance.pk])
+        return
+
+    # student.courses_taken.clear() does not report which courses it touched
+    if action == 'pre_clear':
+        instance._cleared_course_ids = list(instance.courses_taken.values_list('pk', flat=True))
+    elif action == 'post_clear':
+        refresh_seats_taken(instance.__dict__.pop('_cleared_course_ids', []))
+        exams.rebuild_student(instance.pk)
+    elif action in ('post_add', 'post_remove') and pk_set:
+        refresh_seats_taken(pk_set)
+        exams.rebuild_student(instance.pk)
+
+
+@receiver(student_registered)
+def seat_student_in_exam(sender, course, student, **kwargs):
+    exams.add_student(course.pk, student.pk)
+
+
+@receiver(student_deregistered)
+def unseat_student_from_exam(sender, course, student, **kwargs):
+    exams.remove_student(course.pk, student.pk)
+
+
+@receiver(post_save, sender=ExaminationSchedule)
+def exam_template_changed(sender, instance, **kwargs):
+    if instance.student_id is None:
+        exams.rebuild_courses([instance.course_id])
+
+
+# read model invalidation
+
+@receiver([post_save, post_delete], sender=Grade)
+def grade_changed(sender, instance, **kwargs):
+    read_models.invalidate_transcripts([instance.student_id])
+    read_models.invalidate_passed_courses([instance.student_id])
+
+
+@receiver([post_save, post_delete], sender=Prerequisite)
+def prerequisite_changed(sender, instance, **kwargs):
+    eligibility.invalidate()
+
+
+@receiver([post_save, post_delete], sender=Department)
+@receiver([post_save, post_delete], sender=Term)
+def admission_schedule_changed(sender, instance, **kwargs):
+    admission.invalidate()
+
+
+@receiver([post_save, post_delete], sender=CourseRegistration)
+def course_registration_changed(sender, instance, **kwargs):
+    read_models.invalidate_schedules([instance.student_id])
+
+
+@receiver(post_save, sender=Course)
+@receiver(pre_delete, sender=Course)
+def course_changed(sender, instance, **kwargs):
+    read_models.invalidate_schedules(read_models.enrolled_student_pks([instance.pk]))
+    read_models.invalidate_transcripts(read_models.graded_student_pks([instance.pk]))
+
+
+@receiver([post_save, post_delete], sender=Class)
+def class_schedule_changed(sender, instance, **kwargs):
+    read_models.invalidate_schedules(read_models.enrolled_student_pks([instance.course_id]))
+
+
+@receiver(post_save, sender=Room)
+def room_schedule_changed(sender, instance, created, **kwargs):
+    if not created:
+        course_pks = Class.objects.filter(room=instance).values('course_id')
+        read_models.invalidate_schedules(read_models.enrolled_student_pks(course_pks))
+
+
+@receiver(post_save, sender=Student)
+def student_entry_year_changed(sender, instance, created, update_fields=None, **kwargs):
+    # one UPDATE keeps the honours index filed under the student's current entry year
+    if not created and (update_fields is None or 'term' in update_fields):
+        entry_year = Term.objects.filter(pk=instance.term_id).values('academic_year')
+        HonoursEntry.objects.filter(student_id=instance.pk).update(entry_year=Subquery(entry_year))
+
+
+@receiver([post_save, post_delete], sender=Professor)
+def professor_ranking_changed(sender, instance, **kwargs):
+    # a rename or a move to another department changes the cached rankings
+    ratings.invalidate_rankings()
+
+
+@receiver(post_delete, sender=Messages)
+def message_deleted(sender, instance, **kwargs):
+    inbox.message_deleted(instance)
+
+
+@receiver(post_save, sender=Professor)
+def professor_schedule_changed(sender, instance, created, **kwargs):
+    if not created:
+        course_pks = Course.objects.filter(professor=instance).values('pk')
+        read_models.invalidate_schedules(read_models.enrolled_student_pks(course_pks))
+
+
+@receiver(m2m_changed, sender=Course.students.through)
+def course_students_schedule_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            read_models.invalidate_schedules([instance.pk])
+    elif action == 'pre_clear':
+        read_models.invalidate_schedules(read_models.enrolled_student_pks([instance.pk]))
+    elif action in ('post_add', 'post_remove') and pk_set:
+        read_models.invalidate_schedules(pk_set)
+
+
+@receiver([student_registered, student_deregistered])
+def registration_schedule_changed(sender, course, student, **kwargs):
+    read_models.invalidate_schedules([student.pk])
+
+
+# course feed
+
+@receiver(post_save, sender=Announcement)
+@receiver(post_save, sender=Assignment)
+def feed_source_saved(sender, instance, created, **kwargs):
+    feed.source_saved(instance, created)
+
+
+@receiver(pre_delete, sender=Announcement)
+@receiver(pre_delete, sender=Assignment)
+def feed_source_deleted(sender, instance, **kwargs):
+    feed.source_deleted(instance)
+
+
+@receiver(student_registered)
+def follow_course_feed(sender, course, student, **kwargs):
+    feed.follow([(student.pk, course.pk)])
+
+
+@receiver(student_deregistered)
+def unfollow_course_feed(sender, course, student, **kwargs):
+    feed.unfollow([course.pk], [student.pk])
+
+
+@receiver(m2m_changed, sender=Course.students.through)
+def course_students_feed_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear':
+        if reverse:
+            feed.unfollow(student_ids=[instance.pk])
+        else:
+            feed.unfollow(course_ids=[instance.pk])
+    elif action == 'post_add' and pk_set:
+        feed.follow((instance.pk, pk) if reverse else (pk, instance.pk) for pk in pk_set)
+    elif action == 'post_remove' and pk_set:
+        if reverse:
+            feed.unfollow(pk_set, [instance.pk])
+        else:
+            feed.unfollow([instance.pk], pk_set)
+
+
+# conditional GET versions
+
+@receiver([post_save, post_delete], sender=Term)
+def terms_version_changed(sender, instance, **kwargs):
+    versions.bump([versions.terms()])
+
+
+@receiver([post_save, post_delete], sender=Food)
+def menu_version_changed(sender, instance, **kwargs):
+    versions.bump([versions.menu()])
+
+
+@receiver([post_save, post_delete], sender=Course)
+def course_version_changed(sender, instance, **kwargs):
+    versions.bump([versions.course(instance.pk), versions.exams(instance.pk)])
+
+
+@receiver([post_save, post_delete], sender=Class)
+def class_version_changed(sender, instance, **kwargs):
+    versions.bump([versions.course(instance.course_id)])
+
+
+@receiver([post_save, post_delete], sender=ExaminationSchedule)
+def exam_version_changed(sender, instance, **kwargs):
+    # bulk seat writes in app/exams.py bump their courses themselves
+    if not exams.bulk_deleting():
+        versions.bump([versions.exams(instance.course_id)])
+
+
+@receiver(post_save, sender=Professor)
+def professor_version_changed(sender, instance, created, **kwargs):
+    if not created:
+        courses = Course.objects.filter(professor=instance).values_list('pk', flat=True)
+        versions.bump(map(versions.course, courses))
+
+
+@receiver(post_save, sender=Room)
+@receiver(pre_delete, sender=Room)
+def room_version_changed(sender, instance, created=False, **kwargs):
+    if not created:
+        classes = Class.objects.filter(room=instance).values_list('course_id', flat=True)
+        seats = ExaminationSchedule.objects.filter(room=instance).values_list('course_id', flat=True).distinct()
+        versions.bump([*map(versions.course, classes), *map(versions.exams, seats)])
+
+
+@receiver(pre_delete, sender=Student)
+def student_exams_version_changed(sender, instance, **kwargs):
+    # the student's seats go with the cascade, which sends no signal for them
+    seats = ExaminationSchedule.objects.filter(student=instance).values_list('course_id', flat=True)
+    versions.bump(map(versions.exams, seats))
@@ -0,0 +1,141 @@
+import time
+from array import array
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+
+from app.models import GradeAggregate, Term, TermStanding
+
+SEMESTERS = ('fall', 'spring', 'summer')
+CHUNK_SIZE = 10000
+BATCH_SIZE = 2000
+
+
+def ordered_terms():
+    """Every term in the order they happen; an academic year opens with fall."""
+    return sorted(Term.objects.all(), key=lambda term: (term.academic_year, SEMESTERS.index(term.semester), term.pk))
+
+
+def load_term_totals(chunk_size=CHUNK_SIZE):
+    """
+    Every student's signed credits and grade points per term and overall, as four columns.
+
+    They come from the ``GradeAggregate`` rows (one per student and term, plus the overall one with
+    term -1 here, kept in step with the grades) rather than from every signed grade, which would be
+    several times as many rows.
+    """
+    students, terms, credits, points = columns = array('q'), array('q'), array('q'), array('d')
+    rows = GradeAggregate.objects.values_list('student_id', 'term_id', 'total_credits', 'total_grade_points') \
+        .iterator(chunk_size=chunk_size)
+    for student_id, term_id, term_credits, term_points in rows:
+        students.append(student_id)
+        terms.append(-1 if term_id is None else term_id)
+        credits.append(term_credits)
+        points.append(term_points)
+    return columns
+
+
+def compute(columns, positions, probation_gpa, honours_gpa):
+    """
+    Standings of every student in every term they earned signed credits in, and per-term totals.
+
+    ``positions`` maps term pks to their place in time. Returns the standings as
+    ``(student_id, position, credits, gpa, cumulative_credits, cumulative_gpa, on_probation,
+    probations, honours)`` tuples ordered by student and position, then the credits and grade
+    points of each position over all students.
+
+    Signed grades without a term have no place in time; they count towards the cumulative figures
+    from the first term on, so the latest cumulative GPA is the overall GPA of the transcript.
+    """
+    if not columns[0] or not positions:
+        return [], [0] * len(positions), [0.0] * len(positions)
+
+    # one (students x terms) matrix per total, filled by bincount and accumulated along the terms
+    students, term_ids, credits, points = (np.frombuffer(column, dtype=dtype) for column, dtype
+                                           in zip(columns, (np.int64, np.int64, np.int64, np.float64)))
+    overall = term_ids < 0
+    lookup = np.zeros(max(positions) + 1, dtype=np.int64)
+    lookup[list(positions)] = list(positions.values())
+    student_ids, rows = np.unique(students, return_inverse=True)
+    cells = rows[~overall] * len(positions) + lookup[term_ids[~overall]]
+    shape = (len(student_ids), len(positions))
+
+    term_credits = np.bincount(cells, weights=credits[~overall], minlength=shape[0] * shape[1]).reshape(shape)
+    term_points = np.bincount(cells, weights=points[~overall], minlength=shape[0] * shape[1]).reshape(shape)
+    # what the overall aggregates hold beyond the terms' is the grades without a term
+    carried_credits = np.bincount(rows[overall], weights=credits[overall], minlength=shape[0]) \
+        - term_credits.sum(axis=1)
+    carried_points = np.where(carried_credits > 0, np.bincount(rows[overall], weights=points[overall],
+                                                               minlength=shape[0]) - term_points.sum(axis=1), 0)
+    total_credits = carried_credits[:, None] + term_credits.cumsum(axis=1)
+    total_points = carried_points[:, None] + term_points.cumsum(axis=1)
+
+    taken = term_credits > 0
+    gpa = np.divide(term_points, term_credits, out=np.zeros(shape), where=taken)
+    cumulative_gpa = np.divide(total_points, total_credits, out=np.zeros(shape), where=total_credits > 0)
+    on_probation = taken & (gpa < probation_gpa)
+    probations = on_probation.cumsum(axis=1)
+    honours = taken & (gpa >= honours_gpa)
+
+    row, position = np.nonzero(taken)
+    standings = list(zip(
+        student_ids[row].tolist(), position.tolist(), term_credits[taken].astype(np.int64).tolist(),
+        gpa[taken].tolist(), total_credits[taken].astype(np.int64).tolist(), cumulative_gpa[taken].tolist(),
+        on_probation[taken].tolist(), probations[taken].tolist(), honours[taken].tolist(),
+    ))
+    return standings, term_credits.sum(axis=0).astype(np.int64).tolist(), term_points.sum(axis=0).tolist()
+
+
+def rebuild(term_ids=None, batch_size=BATCH_SIZE, chunk_size=CHUNK_SIZE):
+    """
+    Recompute the standings of every student, e.g. at the end of term, and the totals of each term.
+
+    The students' term totals are read once into columnar arrays and aggregated with numpy instead
+    of saving students one by one. Cumulative figures always cover every term; only the standings
+    and totals of ``term_ids`` (every term when None) are written back.
+    Returns the counts and timings of the run.
+    """
+    started = time.perf_counter()
+    terms = ordered_terms()
+    positions = {term.pk: position for position, term in enumerate(terms)}
+    columns = load_term_totals(chunk_size)
+    loaded = time.perf_counter()
+
+    standings, term_credits, term_points = compute(columns, positions, settings.PROBATION_GPA_THRESHOLD,
+                                                   settings.HONOURS_GPA_THRESHOLD)
+    computed = time.perf_counter()
+
+    written = [position for position, term in enumerate(terms) if term_ids is None or term.pk in term_ids]
+    kept = set(written)
+    standings = [row for row in standings if row[1] in kept]
+    for position in written:
+        terms[position].credits_taken = term_credits[position]
+        terms[position].overall_gpa = term_points[position] / term_credits[position] if term_credits[position] else 0
+
+    with transaction.atomic():
+        stale = TermStanding.objects.all()
+        if term_ids is not None:
+            stale = stale.filter(term_id__in=[terms[position].pk for position in written])
+        stale.delete()
+        # a batch of model instances at a time; the whole university at once would not fit in memory
+        for start in range(0, len(standings), batch_size):
+            TermStanding.objects.bulk_create([
+                TermStanding(student_id=student_id, term_id=terms[position].pk, credits=credits, gpa=gpa,
+                             cumulative_credits=cumulative_credits, cumulative_gpa=cumulative_gpa,
+                             on_probation=on_probation, probations=probations, honours=honours)
+                for student_id, position, credits, gpa, cumulative_credits, cumulative_gpa, on_probation,
+                probations, honours in standings[start:start + batch_size]
+            ])
+        Term.objects.bulk_update([terms[position] for position in written], ['credits_taken', 'overall_gpa'],
+                                 batch_size=batch_size)
+
+    return {
+        'term_totals': len(columns[0]),
+        'students': len({row[0] for row in standings}),
+        'standings': len(standings),
+        'terms': len(written),
+        'load_s': loaded - started,
+        'compute_s': computed - loaded,
+        'write_s': time.perf_counter() - computed,
+    }
@@ -1,3 +1,1921 @@
-from django.test import TestCase
+import csv
+import gzip
+import io
+import json
+import os
+import random
+import tempfile
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache, caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import transaction
+from django.db.models import F, ProtectedError, Q
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from app import admission, aggregates, attendance as roll_calls, eligibility, exams, exporter, feed, food, \
+    honours, importer, inbox, ratings, read_models, registration, routers, standing, timetable, versions
+from app.admin import ClassAdminForm
+from app.api.pagination import stream_json
+from app.api.serializers import StudentPassCourseSerializer
+from app.middleware import ReplicaRoutingMiddleware
+from app.models import Announcement, Assignment, Attendance, AttendanceSummary, BalanceTransaction, Class, Course, \
+    CourseEvent, Day, Department, ExaminationSchedule, FeedItem, Food, FoodReservation, Grade, GradeAggregate, \
+    HonoursEntry, Messages, Prerequisite, Professor, ProfessorRating, ProfessorRatingStats, ResourceVersion, Room, \
+    Student, Term, TermStanding
+
+
+def create_students(term, count, balance=0, first=0):
+    return [Student.objects.create(first_name='Student', last_name=str(i), student_id=f'4020{i:05d}', balance=balance,
+                                   total_credits_taken=0, term=term)
+            for i in range(first, first + count)]
+
+
+class RegistrationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        term = Term.objects.create(academic_year=1402, semester='fall')
+        professor = Professor.objects.create(first_name='Ali', last_name='Rezaei', professor_id='P1',
+                                             department='Computer')
+        cls.course = Course.objects.create(code='CS101', title='Programming', professor=professor, credits=3)
+        # the smallest room of the course's classes caps its seats
+        Class.objects.create(room=Room.objects.create(name='Small', capacity=2), course=cls.course,
+                             start_time=time(8), end_time=time(10))
+        cls.students = create_students(term, 3)
+
+    def seats_taken(self):
+        self.course.refresh_from_db()
+        return self.course.seats_taken
+
+    def test_refuses_students_over_capacity(self):
+        first, second, third = self.students
+        registration.register(first, self.course)
+        registration.register(second, self.course)
+
+        with self.assertRaises(registration.CourseFull):
+            registration.register(third, self.course)
+        self.assertEqual(self.seats_taken(), 2)
+        self.assertFalse(registration.is_registered(third, self.course))
+
+    def test_deregistering_frees_the_seat(self):
+        first, second, third = self.students
+        registration.register(first, self.course)
+        registration.register(second, self.course)
+        registration.deregister(first, self.course)
+
+        registration.register(third, self.course)
+        self.assertEqual(self.seats_taken(), 2)
+
+    def test_registering_twice_takes_one_seat(self):
+        registration.register(self.students[0], self.course)
+
+        with self.assertRaises(registration.AlreadyRegistered):
+            registration.register(self.students[0], self.course)
+        self.assertEqual(self.seats_taken(), 1)
+
+    def test_saving_a_stale_course_keeps_its_seats(self):
+        stale = Course.objects.get(pk=self.course.pk)
+        registration.register(self.students[0], self.course)
+
+        stale.title = 'Programming I'
+        stale.save()
+        self.assertEqual(self.seats_taken(), 1)
+        self.assertEqual(self.course.capacity, 2)
+        self.assertEqual(self.course.title, 'Programming I')
+
+
+class BalanceLedgerTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        term = Term.objects.create(academic_year=1402, semester='fall')
+        cls.student, = create_students(term, 1, balance=50000)
+        cls.food = Food.objects.create(name='Kebab', price=40000, meal='lunch', day='Saturday',
+                                       date=timezone.make_aware(datetime(2024, 2, 3, 12)))
+
+    def balance(self):
+        self.student.refresh_from_db()
+        return self.student.balance
+
+    def test_reservation_is_charged_and_recorded(self):
+        food.reserve(self.student, self.food)
+
+        self.assertEqual(self.balance(), 10000)
+        self.assertEqual(list(BalanceTransaction.objects.values_list('amount', 'reason')),
+                         [(-40000, BalanceTransaction.RESERVATION)])
+
+    def test_cancelling_refunds_the_price(self):
+        reservation = food.reserve(self.student, self.food)
+        reservation.delete()
+
+        self.assertEqual(self.balance(), 50000)
+        self.assertEqual(food.ledger_balance(self.student.pk), 0)
+        self.assertEqual(BalanceTransaction.objects.filter(reason=BalanceTransaction.REFUND).get().amount, 40000)
+
+    def test_cancelling_a_taken_meal_is_not_refunded(self):
+        reservation = food.reserve(self.student, self.food)
+        reservation.is_taken = True
+        reservation.save()
+        reservation.delete()
+
+        self.assertEqual(self.balance(), 10000)
+        self.assertFalse(BalanceTransaction.objects.filter(reason=BalanceTransaction.REFUND).exists())
+
+    def test_insufficient_balance_changes_nothing(self):
+        expensive = Food.objects.create(name='Fish', price=60000, meal='dinner', day='Saturday',
+                                        date=timezone.make_aware(datetime(2024, 2, 3, 19)))
+
+        with self.assertRaises(food.InsufficientBalance):
+            food.reserve(self.student, expensive)
+        self.assertEqual(self.balance(), 50000)
+        self.assertFalse(FoodReservation.objects.exists())
+        self.assertFalse(BalanceTransaction.objects.exists())
+
+    def test_saving_a_stale_student_keeps_the_balance(self):
+        stale = Student.objects.get(pk=self.student.pk)
+        food.reserve(self.student, self.food)
+
+        stale.first_name = 'Renamed'
+        stale.save()
+        self.assertEqual(self.balance(), 10000)
+        self.assertEqual(self.balance(), 50000 + food.ledger_balance(self.student.pk))
+
+    def test_a_reserved_food_cannot_be_deleted(self):
+        food.reserve(self.student, self.food)
+
+        with self.assertRaises(ProtectedError):
+            self.food.delete()
+        self.assertEqual(self.balance(), 10000)
+
+    @override_settings(ALLOWED_HOSTS=['testserver'])
+    def test_the_office_deposits_through_the_ledger(self):
+        url = f'/api/food/deposit/{self.student.student_id}/'
+        self.assertEqual(self.client.post(url, {'amount': 5000}, content_type='application/json').status_code, 403)
+
+        self.client.force_login(User.objects.create_superuser('office', 'office@localhost', None))
+        response = self.client.post(url, {'amount': 5000}, content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['balance'], 55000)
+        self.assertEqual(food.ledger_balance(self.student.pk), 5000)
+        self.assertEqual(self.client.post(url, {'amount': -5}, content_type='application/json').status_code, 400)
+
+
+class ExamSeatingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        term = Term.objects.create(academic_year=1402, semester='fall')
+        professor = Professor.objects.create(first_name='Ali', last_name='Rezaei', professor_id='P1',
+                                             department='Computer')
+        cls.rooms = [Room.objects.create(name='Hall A', capacity=3), Room.objects.create(name='Hall B', capacity=4)]
+        cls.courses = [Course.objects.create(code=f'CS10{i}', title=f'Course {i}', professor=professor, credits=3)
+                       for i in range(2)]
+        # both exams are held in the same slot and start in the same room
+        exam_date = timezone.make_aware(datetime(2024, 6, 1, 9))
+        for course in cls.courses:
+            ExaminationSchedule.objects.create(course=course, date=exam_date, room=cls.rooms[0], seat_number=0,
+                                               description='Final exam')
+        cls.students = create_students(term, 3)
+
+    def seats(self):
+        return list(ExaminationSchedule.objects.filter(student__isnull=False)
+                    .values_list('date', 'room_id', 'seat_number'))
+
+    def assert_unique_seats_within_capacity(self):
+        seats = self.seats()
+        self.assertEqual(len(seats), len(set(seats)))
+        capacities = {room.pk: room.capacity for room in self.rooms}
+        for _, room_id, seat_number in seats:
+            self.assertLessEqual(seat_number, capacities[room_id])
+
+    def test_students_of_courses_sharing_a_slot_get_distinct_seats(self):
+        for course in self.courses:
+            for student in self.students:
+                registration.register(student, course)
+
+        self.assertEqual(len(self.seats()), 6)
+        self.assert_unique_seats_within_capacity()
+
+    def test_rebuild_keeps_seats_unique(self):
+        for course in self.courses:
+            for student in self.students:
+                registration.register(student, course)
+
+        exams.rebuild_courses([self.courses[0].pk])
+        self.assert_unique_seats_within_capacity()
+        exams.rebuild_courses()
+        self.assertEqual(len(self.seats()), 6)
+        self.assert_unique_seats_within_capacity()
+
+    def test_a_freed_seat_is_not_handed_out_twice(self):
+        first, second, third = self.students
+        registration.register(first, self.courses[0])
+        registration.register(second, self.courses[0])
+        registration.deregister(first, self.courses[0])
+        registration.register(third, self.courses[1])
+        registration.register(first, self.courses[1])
+
+        self.assertEqual(len(self.seats()), 3)
+        self.assert_unique_seats_within_capacity()
+
+    def test_removed_seats_move_the_exam_version(self):
+        name = versions.exams(self.courses[0].pk)
+        registration.register(self.students[0], self.courses[0])
+        registered, _ = versions.current([name])[name]
+
+        registration.deregister(self.students[0], self.courses[0])
+        self.assertFalse(ExaminationSchedule.objects.filter(student=self.students[0]).exists())
+        self.assertGreater(versions.current([name])[name][0], registered)
+
+
+class AttendanceSummaryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        term = Term.objects.create(academic_year=1402, semester='fall')
+        professor = Professor.objects.create(first_name='Ali', last_name='Rezaei', professor_id='P1',
+                                             department='Computer')
+        course = Course.objects.create(code='CS101', title='Programming', professor=professor, credits=3)
+        cls.class_obj = Class.objects.create(room=Room.objects.create(name='Hall A', capacity=10), course=course,
+                                             start_time=time(8), end_time=time(10))
+        cls.students = create_students(term, 2)
+        course.students.add(*cls.students)
+
+    def assert_summaries_match_records(self):
+        stored = {(row.student_id, row.class_num_id): (row.present, row.absent)
+                  for row in AttendanceSummary.objects.all() if row.present or row.absent}
+        recounted = defaultdict(lambda: [0, 0])
+        for record in Attendance.objects.all():
+            recounted[(record.student_id, record.class_num_id)][0 if record.is_present else 1] += 1
+        self.assertEqual(stored, {key: tuple(counts) for key, counts in recounted.items()})
+
+    def record(self, student, day, is_present):
+        return Attendance.objects.create(student=student, class_num=self.class_obj, date=date(2024, 2, day),
+                                         is_present=is_present)
+
+    def test_saves_and_deletes_move_the_summaries(self):
+        first = self.record(self.students[0], 1, True)
+        second = self.record(self.students[0], 2, False)
+        self.assert_summaries_match_records()
+
+        second.is_present = True
+        second.save()
+        self.assert_summaries_match_records()
+        first.delete()
+        self.assert_summaries_match_records()
+
+    def test_stale_instances_move_the_summaries_once(self):
+        record = self.record(self.students[0], 1, False)
+        stale = Attendance.objects.get(pk=record.pk)
+        record.is_present = True
+        record.save()
+
+        stale.is_present = False
+        stale.save(update_fields=['date'])
+        self.assert_summaries_match_records()
+        Attendance.objects.get(pk=record.pk).delete()
+        stale.delete()
+        self.assert_summaries_match_records()
+
+    def test_repeated_roll_calls_correct_instead_of_adding(self):
+        first, second = self.students
+        roll_calls.record_roll_call(self.class_obj, date(2024, 2, 1), present=[first.student_id])
+        roll_calls.record_roll_call(self.class_obj, date(2024, 2, 1), present=[first.student_id])
+        roll_calls.record_roll_call(self.class_obj, date(2024, 2, 1), present=[second.student_id])
+
+        self.assertEqual(Attendance.objects.count(), 2)
+        self.assert_summaries_match_records()
+        self.assertEqual(roll_calls.over_limit(limit=50).get().student_id, first.pk)
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'], REGISTRATION_WAVES='entry_year', REGISTRATION_WAVE_MINUTES=60,
+                   REGISTRATION_WINDOW_DAYS=7, REGISTRATION_ALLOW_WITHOUT_DEPARTMENT=False)
+class SelectionWindowTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.department = Department.objects.create(name='Computer')
+        cls.student, = create_students(Term.objects.create(academic_year=1402, semester='fall'), 1)
+        cls.student.department = cls.department
+        cls.student.save()
+
+    def setUp(self):
+        admission.invalidate()
+
+    def open_on(self, day):
+        self.department.course_selection_date = day
+        self.department.save()
+        return datetime.combine(day, time(), tzinfo=timezone.get_current_timezone())
+
+    def window(self):
+        return self.client.get(f'/api/course/selection/{self.student.student_id}/window/').json()
+
+    def test_a_department_without_a_date_is_closed(self):
+        with self.assertRaises(admission.SelectionClosed):
+            admission.check_window(self.student)
+        self.assertFalse(self.window()['open'])
+
+    def test_the_window_opens_on_the_date_and_closes_after_its_days(self):
+        opens_at = self.open_on(date(2024, 2, 1))
+
+        with self.assertRaises(admission.SelectionClosed):
+            admission.check_window(self.student, now=opens_at - timedelta(minutes=1))
+        admission.check_window(self.student, now=opens_at)
+        admission.check_window(self.student, now=opens_at + timedelta(days=7, seconds=-1))
+        with self.assertRaises(admission.SelectionClosed):
+            admission.check_window(self.student, now=opens_at + timedelta(days=7))
+
+    def test_later_entry_years_open_an_hour_later(self):
+        later, = create_students(Term.objects.create(academic_year=1403, semester='fall'), 1, first=1)
+        later.department = self.department
+        later.save()
+        opens_at = self.open_on(timezone.localdate())
+
+        self.assertEqual(admission.window(self.student)[0], opens_at)
+        self.assertEqual(admission.window(later)[0], opens_at + timedelta(hours=1))
+
+    def test_selection_outside_the_window_writes_nothing(self):
+        self.open_on(timezone.localdate() + timedelta(days=1))
+        professor = Professor.objects.create(first_name='Ali', last_name='Rezaei', professor_id='P1',
+                                             department='Computer')
+        course = Course.objects.create(code='CS101', title='Programming', professor=professor, credits=3)
+
+        response = self.client.post(f'/api/course/selection/{self.student.student_id}/{course.pk}/')
+        self.assertEqual(response.status_code, 403)
+        self.assertIn('Retry-After', response)
+        self.assertFalse(registration.is_registered(self.student, course))
+        self.assertFalse(self.window()['open'])
+
+    @override_settings(REGISTRATION_ALLOW_WITHOUT_DEPARTMENT=True)
+    def test_students_without_a_department_may_be_let_through(self):
+        self.student.department = None
+        admission.check_window(self.student)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+class WaitingRoomTests(SimpleTestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+
+    def test_a_full_room_queues_until_a_slot_and_a_token_are_free(self):
+        room = admission.WaitingRoom(rate=1, max_in_flight=1, clock=self.clock)
+        room.enter('a')
+        with self.assertRaises(admission.Queued) as queued:
+            room.enter('b')
+        self.assertGreaterEqual(queued.exception.retry_after, 1)
+
+        room.leave()
+        self.clock.now += 1
+        room.enter('b')
+        self.assertEqual(room.stats(), {'in_flight': 1, 'waiting': 0, 'tokens': 0})
+
+    def test_the_line_is_first_come_first_served(self):
+        room = admission.WaitingRoom(rate=10, max_in_flight=1, clock=self.clock)
+        room.enter('a')
+        for key in ('b', 'c'):
+            with self.assertRaises(admission.Queued):
+                room.enter(key)
+        room.leave()
+
+        with self.assertRaises(admission.Queued):
+            room.enter('c')
+        room.enter('b')
+
+    def test_a_place_not_retried_within_the_ttl_is_given_up(self):
+        room = admission.WaitingRoom(rate=10, max_in_flight=1, ttl=30, clock=self.clock)
+        room.enter('a')
+        for key in ('b', 'c'):
+            with self.assertRaises(admission.Queued):
+                room.enter(key)
+        room.leave()
+
+        self.clock.now += 31
+        room.enter('c')
+        self.assertEqual(room.stats()['waiting'], 0)
+
+    def test_a_zero_rate_leaves_only_the_in_flight_cap(self):
+        room = admission.WaitingRoom(rate=0, max_in_flight=2, clock=self.clock)
+        room.enter('a')
+        room.enter('b')
+        with self.assertRaises(admission.Queued) as queued:
+            room.enter('c')
+        self.assertEqual(queued.exception.retry_after, 1)
+
+        room.leave()
+        room.enter('c')
+
+
+@override_settings(PROBATION_GPA_THRESHOLD=12, HONOURS_GPA_THRESHOLD=17)
+class TermStandingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.fall = Term.objects.create(academic_year=1402, semester='fall')
+        cls.spring = Term.objects.create(academic_year=1402, semester='spring')
+        professor = Professor.objects.create(first_name='Ali', last_name='Rezaei', professor_id='P1',
+                                             department='Computer')
+        courses = [Course.objects.create(code=f'CS10{i}', title=f'Course {i}', professor=professor, credits=credits)
+                   for i, credits in enumerate((3, 2, 4, 1))]
+        cls.student, other = create_students(cls.fall, 2)
+        for student, course, term, grade, signed in (
+            (cls.student, courses[0], cls.fall, 18, True),
+            (cls.student, courses[1], cls.spring, 10, True),
+            # a grade without a term, transferred from another university say
+            (cls.student, courses[2], None, 15, True),
+            (cls.student, courses[3], cls.spring, 20, False),
+            (other, courses[0], cls.spring, 17.5, True),
+        ):
+            Grade.objects.create(student=student, course=course, term=term, grade=grade,
+                                 have_digital_signature=signed)
+
+    def recomputed(self, student, terms):
+        """(credits, gpa, cumulative credits, cumulative gpa) of the student's signed grades, term by term."""
+        def totals(grades):
+            credits = sum(credits for credits, _ in grades)
+            return credits, sum(credits * grade for credits, grade in grades) / credits
+
+        grades = Grade.objects.filter(student=student, have_digital_signature=True).select_related('course')
+        carried = [(grade.course.credits, grade.grade) for grade in grades if grade.term_id is None]
+        rows = {}
+        for term in terms:
+            taken = [(grade.course.credits, grade.grade) for grade in grades if grade.term_id == term.pk]
+            carried += taken
+            if taken:
+                rows[term.pk] = totals(taken) + totals(carried)
+        return rows
+
+    def test_standings_match_a_recomputation_from_the_grades(self):
+        standing.rebuild()
+
+        for student in Student.objects.all():
+            stored = {row.term_id: (row.credits, row.gpa, row.cumulative_credits, row.cumulative_gpa)
+                      for row in TermStanding.objects.filter(student=student)}
+            recomputed = self.recomputed(student, [self.fall, self.spring])
+            self.assertEqual(stored.keys(), recomputed.keys())
+            for term_id, row in recomputed.items():
+                self.assertEqual(stored[term_id][0::2], row[0::2])
+                self.assertAlmostEqual(stored[term_id][1], row[1])
+                self.assertAlmostEqual(stored[term_id][3], row[3])
+
+    def test_the_latest_cumulative_gpa_is_the_transcript_gpa(self):
+        standing.rebuild()
+
+        latest = TermStanding.objects.get(student=self.student, term=self.spring)
+        self.assertEqual(latest.cumulative_credits, 9)
+        self.assertAlmostEqual(latest.cumulative_gpa, self.student.get_gpa())
+
+    def test_probation_honours_and_term_totals(self):
+        standing.rebuild()
+
+        fall, spring = (TermStanding.objects.get(student=self.student, term=term) for term in (self.fall, self.spring))
+        self.assertEqual((fall.honours, fall.on_probation, fall.probations), (True, False, 0))
+        self.assertEqual((spring.honours, spring.on_probation, spring.probations), (False, True, 1))
+        self.spring.refresh_from_db()
+        self.assertEqual(self.spring.credits_taken, 5)
+        self.assertAlmostEqual(self.spring.overall_gpa, (10 * 2 + 17.5 * 3) / 5)
+
+    def test_rebuilding_one_term_keeps_the_others(self):
+        standing.rebuild()
+        fall = TermStanding.objects.get(student=self.student, term=self.fall)
+        Grade.objects.filter(term=self.spring, have_digital_signature=True).update(grade=20)
+        aggregates.rebuild_all()
+
+        standing.rebuild(term_ids=[self.spring.pk])
+        self.assertEqual(TermStanding.objects.get(student=self.student, term=self.fall).pk, fall.pk)
+        self.assertEqual(TermStanding.objects.get(student=self.student, term=self.spring).gpa, 20)
+
+
+class GradeAggregateTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.fall = Term.objects.create(academic_year=1402, semester='fall')
+        cls.spring = Term.objects.create(academic_year=1402, semester='spring')
+        professor = Professor.objects.create(first_name='Ali', last_name='Rezaei', professor_id='P1',
+                                             department='Computer')
+        cls.courses = [Course.objects.create(code=f'CS10{i}', title=f'Course {i}', professor=professor,
+                                             credits=credits) for i, credits in enumerate((3, 2))]
+        cls.students = create_students(cls.fall, 2)
+
+    def assert_aggregates_match_grades(self):
+        stored = {(row.student_id, row.term_id): (row.total_credits, round(row.total_grade_points, 6))
+                  for row in GradeAggregate.objects.all() if row.total_credits}
+        recomputed = defaultdict(lambda: [0, 0])
+        for grade in Grade.objects.filter(have_digital_signature=True).select_related('course'):
+            for term_id in {None, grade.term_id}:
+                recomputed[(grade.student_id, term_id)][0] += grade.course.credits
+                recomputed[(grade.student_id, term_id)][1] += grade.grade * grade.course.credits
+        self.assertEqual(stored, {key: (credits, round(points, 6)) for key, (credits, points) in recomputed.items()})
+        for student in Student.objects.all():
+            self.assertEqual(student.total_credits_taken, recomputed[(student.pk, None)][0])
+
+    def grade(self, student, course, grade, term=None, signed=True):
+        return Grade.objects.create(student=student, course=course, term=term or self.fall, grade=grade,
+                                    have_digital_signature=signed)
+
+    def test_saves_and_deletes_move_the_aggregates(self):
+        first = self.grade(self.students[0], self.courses[0], 18)
+        second = self.grade(self.students[0], self.courses[1], 12, signed=False)
+        self.grade(self.students[1], self.courses[0], 15, term=self.spring)
+        self.assert_aggregates_match_grades()
+
+        second.have_digital_signature = True
+        second.save()
+        first.grade = 9
+        first.term = self.spring
+        first.save()
+        self.assert_aggregates_match_grades()
+        second.delete()
+        self.assert_aggregates_match_grades()
+        self.assertAlmostEqual(self.students[0].get_gpa(), 9)
+
+    def test_stale_instances_move_the_aggregates_once(self):
+        grade = self.grade(self.students[0], self.courses[0], 18)
+        stale = Grade.objects.get(pk=grade.pk)
+        grade.grade = 10
+        grade.save()
+
+        stale.save(update_fields=['date'])
+        self.assert_aggregates_match_grades()
+        Grade.objects.get(pk=grade.pk).delete()
+        stale.delete()
+        self.assert_aggregates_match_grades()
+
+    def test_changing_a_course_s_credits_reweighs_its_grades(self):
+        self.grade(self.students[0], self.courses[0], 18)
+        self.grade(self.students[0], self.courses[1], 10)
+
+        course = Course.objects.get(pk=self.courses[0].pk)
+        course.credits = 1
+        course.save()
+        self.assert_aggregates_match_grades()
+        self.assertAlmostEqual(self.students[0].get_gpa(), (18 + 10 * 2) / 3)
+
+    def test_rebuild_agrees_with_the_incremental_totals(self):
+        self.grade(self.students[0], self.courses[0], 18)
+        self.grade(self.students[1], self.courses[1], 11.5, term=self.spring)
+        incremental = sorted(GradeAggregate.objects.values_list('student_id', 'term_id', 'total_credits',
+                                                                'total_grade_points'), key=str)
+
+        aggregates.rebuild_all()
+        self.assertEqual(sorted(GradeAggregate.objects.values_list('student_id', 'term_id', 'total_credits',
+                                                                   'total_grade_points'), key=str), incremental)
+        self.assert_aggregates_match_grades()
+
+
+class ReadModelTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        term = Term.objects.create(academic_year=1402, semester='fall')
+        cls.professor = Professor.objects.create(first_name='Ali', last_name='Rezaei', professor_id='P1',
+                                                 department='Computer')
+        cls.room = Room.objects.create(name='Hall A', capacity=10)
+        cls.courses = [Course.objects.create(code=f'CS10{i}', title=f'Course {i}', professor=cls.professor, credits=3)
+                       for i in range(2)]
+        for i, course in enumerate(cls.courses):
+            Class.objects.create(room=cls.room, course=course, start_time=time(8 + 2 * i), end_time=time(10 + 2 * i))
+        cls.student, = create_students(term, 1)
+
+    def setUp(self):
+        caches['read_models'].clear()
+
+    def assert_documents_are_fresh(self):
+        self.assertEqual(read_models.get_class_schedule(self.student), read_models.build_class_schedule(self.student))
+        self.assertEqual(read_models.get_transcript(self.student), read_models.build_transcript(self.student))
+        self.assertEqual(read_models.get_passed_courses(self.student), read_models.build_passed_courses(self.student))
+
+    def change(self, write):
+        """Run ``write`` with the documents cached, committing it so the invalidations run."""
+        self.assert_documents_are_fresh()
+        with self.captureOnCommitCallbacks(execute=True):
+            write()
+        self.assert_documents_are_fresh()
+
+    def test_schedule_follows_enrolments_rooms_and_professors(self):
+        self.change(lambda: registration.register(self.student, self.courses[0]))
+        self.change(lambda: self.courses[1].students.add(self.student))
+        self.change(lambda: Room.objects.get(pk=self.room.pk).save())
+        self.room.name = 'Hall B'
+        self.change(self.room.save)
+        self.professor.last_name = 'Karimi'
+        self.change(self.professor.save)
+        self.change(lambda: Class.objects.filter(course=self.courses[1]).get().delete())
+        self.change(lambda: registration.deregister(self.student, self.courses[0]))
+        self.assertEqual(len(read_models.get_class_schedule(self.student)), 1)
+
+    def test_transcript_and_passed_courses_follow_grades(self):
+        grade = Grade.objects.create(student=self.student, course=self.courses[0], grade=9)
+        self.change(lambda: Grade.objects.create(student=self.student, course=self.courses[1], grade=14,
+                                                 have_digital_signature=True))
+        grade.grade = 16
+        grade.have_digital_signature = True
+        self.change(grade.save)
+        self.assertEqual(read_models.get_passed_courses(self.student), {course.pk for course in self.courses})
+
+        self.courses[0].title = 'Programming'
+        self.change(self.courses[0].save)
+        self.change(lambda: Grade.objects.get(pk=grade.pk).delete())
+        self.change(self.courses[1].delete)
+        self.assertEqual(read_models.get_transcript(self.student), [])
+
+    def test_documents_are_dropped_only_once_the_write_commits(self):
+        read_models.get_transcript(self.student)
+        with self.captureOnCommitCallbacks() as callbacks:
+            Grade.objects.create(student=self.student, course=self.courses[0], grade=15)
+            # a reader before the commit still gets the cached document, not one built from the uncommitted row
+            self.assertEqual(read_models.get_transcript(self.student), [])
+        for callback in callbacks:
+            callback()
+        self.assertEqual(len(read_models.get_transcript(self.student)), 1)
+
+    def test_many_students_share_one_query_for_their_passed_courses(self):
+        Grade.objects.create(student=self.student, course=self.courses[0], grade=12, have_digital_signature=True)
+        with self.assertNumQueries(1):
+            passed = read_models.get_passed_courses_many([self.student.pk])
+        with self.assertNumQueries(0):
+            self.assertEqual(read_models.get_passed_courses_many([self.student.pk]), passed)
+        self.assertEqual(passed, {self.student.pk: frozenset([self.courses[0].pk])})
+
+
+class ProfessorRatingStatsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.professors = [Professor.objects.create(first_name='Ali', last_name=name, professor_id=f'P{i}',
+                                                   department='Computer')
+                          for i, name in enumerate(('Rezaei', 'Karimi'))]
+        cls.students = create_students(Term.objects.create(academic_year=1402, semester='fall'), 3)
+
+    def setUp(self):
+        cache.clear()
+
+    def assert_stats_match_ratings(self):
+        stored = {row.professor_id: (row.count, round(row.total, 6), round(row.total_squares, 6))
+                  for row in ProfessorRatingStats.objects.all() if row.count}
+        recomputed = defaultdict(lambda: [0, 0, 0])
+        for rating in ProfessorRating.objects.all():
+            totals = recomputed[rating.professor_id]
+            totals[0] += 1
+            totals[1] += float(rating.rating)
+            totals[2] += float(rating.rating) ** 2
+        self.assertEqual(stored, {pk: (count, round(total, 6), round(squares, 6))
+                                  for pk, (count, total, squares) in recomputed.items()})
+        self.assertEqual(ratings.get_ranking(), ratings.build_ranking())
+
+    def rate(self, student, professor, value):
+        with self.captureOnCommitCallbacks(execute=True):
+            return ratings.rate(student, professor, value)[0]
+
+    def test_ratings_and_changes_move_the_stats(self):
+        first = self.rate(self.students[0], self.professors[0], '4.5')
+        self.rate(self.students[1], self.professors[0], 3)
+        self.rate(self.students[2], self.professors[1], '2.25')
+        self.assert_stats_match_ratings()
+
+        self.rate(self.students[0], self.professors[0], 1)
+        self.rate(self.students[1], self.professors[0], 3)
+        self.assert_stats_match_ratings()
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assert_stats_match_ratings()
+        self.assertEqual([row['professor_id'] for row in ratings.get_ranking()], ['P0', 'P1'])
+
+    def test_stale_instances_move_the_stats_once(self):
+        rating = self.rate(self.students[0], self.professors[0], 4)
+        stale = ProfessorRating.objects.get(pk=rating.pk)
+        self.rate(self.students[0], self.professors[0], 2)
+
+        stale.save(update_fields=['student'])
+        self.assert_stats_match_ratings()
+        with self.captureOnCommitCallbacks(execute=True):
+            ProfessorRating.objects.get(pk=rating.pk).delete()
+            stale.delete()
+        self.assert_stats_match_ratings()
+
+    def test_moving_a_rating_to_another_professor_moves_its_stats(self):
+        rating = self.rate(self.students[0], self.professors[0], 4)
+
+        rating.professor = self.professors[1]
+        with self.captureOnCommitCallbacks(execute=True):
+            rating.save()
+        self.assert_stats_match_ratings()
+
+    def test_invalid_ratings_change_nothing(self):
+        for value in ('5.5', '-1', 'excellent'):
+            with self.assertRaises(ratings.InvalidRating):
+                ratings.rate(self.students[0], self.professors[0], value)
+        self.assertFalse(ProfessorRating.objects.exists())
+        self.assert_stats_match_ratings()
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class HonoursIndexTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.terms = [Term.objects.create(academic_year=year, semester='fall') for year in (1401, 1402)]
+        professor = Professor.objects.create(first_name='Ali', last_name='Rezaei', professor_id='P1',
+                                             department='Computer')
+        cls.courses = [Course.objects.create(code=f'CS10{i}', title=f'Course {i}', professor=professor,
+                                             credits=credits) for i, credits in enumerate((3, 2))]
+        cls.students = create_students(cls.terms[1], 4)
+
+    def assert_index_matches_gpas(self):
+        stored = {row.student_id: (row.entry_year, round(row.gpa, 6)) for row in HonoursEntry.objects.all()}
+        recomputed = {
+            student.pk: (student.term.academic_year, round(student.get_gpa(), 6))
+            for student in Student.objects.select_related('term')
+            if Grade.objects.filter(student=student, have_digital_signature=True).exists()
+        }
+        self.assertEqual(stored, recomputed)
+
+    def grade(self, student, grade, course=0):
+        return Grade.objects.create(student=student, course=self.courses[course], term=self.terms[1], grade=grade,
+                                    have_digital_signature=True)
+
+    def test_grade_changes_refile_the_students(self):
+        first = self.grade(self.students[0], 18)
+        self.grade(self.students[0], 12, course=1)
+        self.grade(self.students[1], 15)
+        Grade.objects.create(student=self.students[2], course=self.courses[0], grade=20)
+        self.assert_index_matches_gpas()
+
+        first.grade = 10
+        first.save()
+        self.assert_index_matches_gpas()
+        Grade.objects.filter(student=self.students[1]).get().delete()
+        self.assert_index_matches_gpas()
+
+        course = Course.objects.get(pk=self.courses[1].pk)
+        course.credits = 6
+        course.save()
+        self.assert_index_matches_gpas()
+
+    def test_a_new_entry_year_moves_the_student(self):
+        self.grade(self.students[0], 18)
+        student = Student.objects.get(pk=self.students[0].pk)
+        student.term = self.terms[0]
+        student.save()
+        self.assert_index_matches_gpas()
+        self.assertEqual(list(honours.ranked(1401).values_list('student_id', flat=True)), [student.pk])
+
+    def test_rebuild_agrees_with_the_incremental_index(self):
+        for student, grade in zip(self.students, (18, 13.5, 17)):
+            self.grade(student, grade)
+        incremental = sorted(HonoursEntry.objects.values_list('student_id', 'entry_year', 'gpa'))
+
+        honours.rebuild()
+        self.assertEqual(sorted(HonoursEntry.objects.values_list('student_id', 'entry_year', 'gpa')), incremental)
+
+    def test_ranking_and_standing(self):
+        for student, grade in zip(self.students, (18, 13.5, 17, 13.5)):
+            self.grade(student, grade)
+
+        top = self.client.get('/api/honours/1402/?top=2').json()
+        self.assertEqual([row['student_id'] for row in top], [self.students[0].student_id, self.students[2].student_id])
+        self.assertEqual([entry.student_id for entry in honours.above(1402, 17)],
+                         [self.students[0].pk, self.students[2].pk])
+
+        standing = self.client.get(f'/api/honours/standing/{self.students[1].student_id}/').json()
+        self.assertEqual((standing['rank'], standing['percentile']), (3, 0))
+        standing = self.client.get(f'/api/honours/standing/{self.students[2].student_id}/').json()
+        self.assertEqual((standing['rank'], standing['percentile']), (2, 50))
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class EligibilityTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        professor = Professor.objects.create(first_name='Ali', last_name='Rezaei', professor_id='P1',
+                                             department='Computer')
+        cls.courses = [Course.objects.create(code=f'CS10{i}', title=f'Course {i}', professor=professor, credits=3)
+                       for i in range(4)]
+        first, second, third, advanced = cls.courses
+        # the advanced course needs (first or second) and third
+        for required, group in ((first, 0), (second, 0), (third, 1)):
+            Prerequisite.objects.create(course=advanced, required=required, group=group)
+        cls.student, = create_students(Term.objects.create(academic_year=1402, semester='fall'), 1)
+
+    def setUp(self):
+        caches['read_models'].clear()
+        eligibility.invalidate()
+
+    def recomputed(self, course):
+        """The course's unmet groups, straight from the grades and prerequisite rows."""
+        passed = set(Grade.objects.filter(student=self.student, have_digital_signature=True,
+                                          grade__gte=read_models.PASSING_GRADE).values_list('course_id', flat=True))
+        groups = defaultdict(set)
+        for prerequisite in Prerequisite.objects.filter(course=course).select_related('required'):
+            groups[prerequisite.group].add((prerequisite.required_id, prerequisite.required.code))
+        return sorted(sorted(code for _, code in group) for group in groups.values()
+                      if not passed & {pk for pk, _ in group})
+
+    def assert_eligibility_matches(self):
+        for course in self.courses:
+            self.assertEqual(sorted(eligibility.missing_prerequisites(self.student, course)), self.recomputed(course))
+
+    def grade(self, course, grade, signed=True):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Grade.objects.create(student=self.student, course=course, grade=grade,
+                                        have_digital_signature=signed)
+
+    def test_every_group_needs_one_passed_course(self):
+        first, second, third, advanced = self.courses
+        self.assertEqual(eligibility.missing_prerequisites(self.student, advanced),
+                         [['CS100', 'CS101'], ['CS102']])
+
+        self.grade(second, 15)
+        self.grade(third, 9)
+        self.assertEqual(eligibility.missing_prerequisites(self.student, advanced), [['CS102']])
+        self.assert_eligibility_matches()
+        with self.assertRaises(registration.PrerequisitesNotMet):
+            registration.register(self.student, advanced)
+
+        self.grade(third, 12, signed=False)
+        self.assert_eligibility_matches()
+        grade = self.grade(third, 12)
+        self.assertEqual(eligibility.missing_prerequisites(self.student, advanced), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            grade.delete()
+        self.assert_eligibility_matches()
+
+    def test_prerequisite_changes_apply_at_once(self):
+        first, second, third, advanced = self.courses
+        self.grade(first, 18)
+        self.grade(third, 18)
+        self.assert_eligibility_matches()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Prerequisite.objects.create(course=third, required=second)
+        self.assert_eligibility_matches()
+        with self.captureOnCommitCallbacks(execute=True):
+            Prerequisite.objects.filter(course=advanced, group=1).delete()
+        self.assert_eligibility_matches()
+
+    def test_the_catalogue_reports_every_course(self):
+        self.grade(self.courses[0], 18)
+
+        response = self.client.get(f'/api/course/eligibility/{self.student.student_id}/').json()
+        self.assertEqual({row['code']: row['eligible'] for row in response['results']},
+                         {'CS100': True, 'CS101': True, 'CS102': True, 'CS103': False})
+        self.assertEqual(response['results'][-1]['missing_prerequisites'], [['CS102']])
+
+    def test_passed_courses_of_a_list_are_read_together(self):
+        self.grade(self.courses[2], 10)
+        self.grade(self.courses[0], 20)
+        Grade.objects.create(student=self.student, course=self.courses[1], grade=9.5, have_digital_signature=True)
+
+        students = Student.objects.all()
+        self.assertEqual(StudentPassCourseSerializer(students, many=True).data,
+                         [{'student_id': self.student.student_id, 'passed_courses': ['CS100', 'CS102']}])
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class InboxTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.professors = [Professor.objects.create(first_name='Ali', last_name=name, professor_id=f'{100 + i}',
+                                                   department='Computer')
+                          for i, name in enumerate(('Rezaei', 'Karimi'))]
+        cls.students = create_students(Term.objects.create(academic_year=1402, semester='fall'), 2)
+
+    def assert_counters_match_messages(self):
+        for professor in Professor.objects.all():
+            self.assertEqual(professor.unread_messages,
+                             Messages.objects.filter(receiver=professor, is_read=False).count())
+
+    def send(self, student, professor, subject='Midterm'):
+        return inbox.send(student, professor, subject, 'Is the midterm open book?')
+
+    def test_sending_reading_and_deleting_move_the_counter(self):
+        first = self.send(self.students[0], self.professors[0])
+        self.send(self.students[0], self.professors[0])
+        self.send(self.students[1], self.professors[0])
+        self.send(self.students[1], self.professors[1])
+        self.assert_counters_match_messages()
+
+        first.is_read = True
+        first.save()
+        self.assertEqual(inbox.mark_thread_read(self.professors[0], self.students[0]), 1)
+        self.assert_counters_match_messages()
+        Messages.objects.filter(sender=self.students[1], receiver=self.professors[0]).get().delete()
+        self.assert_counters_match_messages()
+        self.students[1].delete()
+        self.assert_counters_match_messages()
+
+    def test_stale_instances_move_the_counter_once(self):
+        message = self.send(self.students[0], self.professors[0])
+        stale = Messages.objects.get(pk=message.pk)
+        inbox.mark_thread_read(self.professors[0], self.students[0])
+        self.send(self.students[1], self.professors[0])
+
+        stale.save(update_fields=['subject'])
+        self.assert_counters_match_messages()
+        stale.delete()
+        self.assert_counters_match_messages()
+
+        unread = self.send(self.students[0], self.professors[0])
+        stale = Messages.objects.get(pk=unread.pk)
+        unread.delete()
+        stale.delete()
+        self.assert_counters_match_messages()
+
+    def test_moving_a_message_moves_the_counter(self):
+        message = self.send(self.students[0], self.professors[0])
+        message.receiver = self.professors[1]
+        message.save()
+        self.assert_counters_match_messages()
+
+    def test_saving_a_stale_professor_keeps_the_counter(self):
+        stale = Professor.objects.get(pk=self.professors[0].pk)
+        self.send(self.students[0], self.professors[0])
+
+        stale.department = 'Mathematics'
+        stale.save()
+        self.assert_counters_match_messages()
+
+    def test_inbox_pages_cover_every_message_once_newest_first(self):
+        sent = [self.send(self.students[i % 2], self.professors[0], subject=f'Question {i}') for i in range(5)]
+        inbox.mark_thread_read(self.professors[0], self.students[1])
+
+        url, received = '/api/message/inbox/100/?page_size=2', []
+        while url:
+            page = self.client.get(url).json()
+            self.assertLessEqual(len(page['results']), 2)
+            received += [row['subject'] for row in page['results']]
+            url = page['next']
+        self.assertEqual(received, [message.subject for message in reversed(sent)])
+
+        unread = self.client.get('/api/message/inbox/100/?unread=1').json()['results']
+        self.assertEqual([row['subject'] for row in unread], ['Question 4', 'Question 2', 'Question 0'])
+        self.assertEqual(self.client.get('/api/message/inbox/100/unread/').json()['unread'], 3)
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'], FEED_FANOUT_LIMIT=1000)
+class FanOutFeedTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        professor = Professor.objects.create(first_name='Ali', last_name='Rezaei', professor_id='P1',
+                                             department='Computer')
+        cls.courses = [Course.objects.create(code=f'CS10{i}', title=f'Course {i}', professor=professor, credits=3)
+                       for i in range(3)]
+        cls.student, cls.other = create_students(Term.objects.create(academic_year=1402, semester='fall'), 2)
+        for course in cls.courses[:2]:
+            course.students.add(cls.student, cls.other)
+
+    def setUp(self):
+        caches['read_models'].clear()
+
+    def announce(self, course, title):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Announcement.objects.create(course=course, title=title, content='...')
+
+    def expected(self, student):
+        """Every event of the student's courses, newest first, straight from the events table."""
+        return list(CourseEvent.objects.filter(course__students=student).order_by('-pk').values_list('pk', 'title'))
+
+    def assert_feeds_match_events(self):
+        sources = {**{('announcement', pk): course_id for pk, course_id in
+                      Announcement.objects.values_list('pk', 'course_id')},
+                   **{('assignment', pk): course_id for pk, course_id in
+                      Assignment.objects.values_list('pk', 'course_id')}}
+        events = {(('announcement', announcement) if announcement else ('assignment', assignment)): course_id
+                  for announcement, assignment, course_id in
+                  CourseEvent.objects.values_list('announcement_id', 'assignment_id', 'course_id')}
+        self.assertEqual(events, sources)
+        for student in (self.student, self.other):
+            self.assertEqual([(event['id'], event['title']) for event in feed.feed(student, limit=1000)],
+                             self.expected(student))
+
+    def test_feeds_follow_publishing_edits_and_deletes(self):
+        first = self.announce(self.courses[0], 'Welcome')
+        self.announce(self.courses[1], 'Room change')
+        with self.captureOnCommitCallbacks(execute=True):
+            assignment = Assignment.objects.create(course=self.courses[0], title='Homework 1', description='...',
+                                                   due_date=timezone.now())
+        self.announce(self.courses[2], 'Not for these students')
+        self.assert_feeds_match_events()
+
+        first.title = 'Welcome!'
+        with self.captureOnCommitCallbacks(execute=True):
+            first.save()
+        self.assert_feeds_match_events()
+        assignment.course = self.courses[2]
+        with self.captureOnCommitCallbacks(execute=True):
+            assignment.save()
+        self.assert_feeds_match_events()
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assert_feeds_match_events()
+
+    def test_stale_instances_follow_the_stored_course(self):
+        stale = self.announce(self.courses[0], 'Welcome')
+        stale_copy = Announcement.objects.get(pk=stale.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.courses[2].students.add(self.other)
+        fresh = Announcement.objects.get(pk=stale.pk)
+        fresh.course = self.courses[2]
+        with self.captureOnCommitCallbacks(execute=True):
+            fresh.save()
+        self.assert_feeds_match_events()
+
+        stale.title = 'Welcome!'
+        with self.captureOnCommitCallbacks(execute=True):
+            stale.save(update_fields=['title'])
+        self.assertEqual(Announcement.objects.get(pk=stale.pk).course, self.courses[2])
+        self.assert_feeds_match_events()
+        with self.captureOnCommitCallbacks(execute=True):
+            stale_copy.delete()
+        self.assert_feeds_match_events()
+
+    def test_feeds_follow_enrolments(self):
+        self.announce(self.courses[2], 'Before enrolling')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.courses[2].students.add(self.student)
+        self.assert_feeds_match_events()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.courses[0].students.remove(self.student)
+        self.assert_feeds_match_events()
+
+    def test_paging_back_and_polling_forward_cover_every_event_once(self):
+        # more events than a cached head holds, so merge-on-read has to fall back to the table
+        for i in range(feed.HEAD_SIZE + 5):
+            self.announce(self.courses[i % 2], f'Announcement {i}')
+        expected = [pk for pk, _ in self.expected(self.student)]
+
+        url, paged = f'/api/feed/{self.student.student_id}/?limit=7', []
+        while url:
+            page = self.client.get(url).json()
+            paged += [event['id'] for event in page['results']]
+            url = f'/api/feed/{self.student.student_id}/?limit=7&before={page["before"]}' if page['before'] else None
+        self.assertEqual(paged, expected)
+
+        cursor, polled = expected[-1] - 1, []
+        while True:
+            page = self.client.get(f'/api/feed/{self.student.student_id}/?limit=7&since={cursor}').json()
+            polled += [event['id'] for event in page['results']]
+            cursor = page['cursor']
+            if not page['more']:
+                break
+        self.assertEqual(polled, expected[::-1])
+
+    def test_rebuild_agrees_with_the_incremental_feeds(self):
+        self.announce(self.courses[0], 'Welcome')
+        self.announce(self.courses[1], 'Room change')
+        with self.captureOnCommitCallbacks(execute=True):
+            feed.rebuild()
+        self.assert_feeds_match_events()
+
+
+@override_settings(FEED_FANOUT_LIMIT=0)
+class MergeOnReadFeedTests(FanOutFeedTests):
+    """The same feeds with every course too large to fan out."""
+
+    def test_no_feed_items_are_written(self):
+        self.announce(self.courses[0], 'Welcome')
+        self.assertFalse(FeedItem.objects.exists())
+        self.assertFalse(CourseEvent.objects.get().fanned_out)
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class CursorPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.terms = [Term.objects.create(academic_year=1380 + i // 2, semester=('fall', 'spring')[i % 2])
+                     for i in range(23)]
+        professor = Professor.objects.create(first_name='Ali', last_name='Rezaei', professor_id='P1',
+                                             department='Computer')
+        cls.courses = [Course.objects.create(code=f'CS10{i}', title=f'Course {i}', professor=professor, credits=3)
+                       for i in range(2)]
+        cls.students = create_students(cls.terms[-1], 5)
+        for student, grades in zip(cls.students, ((20, 19), (18, 10), (17, 17), (16, 15), (20,))):
+            for course, grade in zip(cls.courses, grades):
+                Grade.objects.create(student=student, course=course, term=cls.terms[-1], grade=grade,
+                                     have_digital_signature=True)
+
+    def walk(self, url):
+        rows = []
+        while url:
+            page = self.client.get(url).json()
+            rows += page['results']
+            url = page['next']
+        return rows
+
+    def stream(self, url):
+        response = self.client.get(url)
+        self.assertTrue(response.streaming)
+        return json.loads(b''.join(response.streaming_content))
+
+    def term_rows(self):
+        return [{'academic_year': term.academic_year, 'semester': term.semester}
+                for term in Term.objects.order_by('pk')]
+
+    def test_term_pages_and_stream_cover_every_term_once_in_order(self):
+        self.assertEqual(self.walk('/api/terms/?page_size=4'), self.term_rows())
+        self.assertEqual(self.stream('/api/terms/?stream=1'), self.term_rows())
+
+    def test_changes_behind_and_ahead_of_the_cursor_do_not_shift_the_pages(self):
+        page = self.client.get('/api/terms/?page_size=5').json()
+        Term.objects.filter(pk=self.terms[0].pk).delete()
+        Term.objects.create(academic_year=1400, semester='summer')
+        rows = page['results'] + self.walk(page['next'])
+        self.assertEqual(rows, [{'academic_year': term.academic_year, 'semester': term.semester}
+                                for term in self.terms] + [{'academic_year': 1400, 'semester': 'summer'}])
+
+    def test_alif_students_are_listed_once_whether_paged_or_streamed(self):
+        year = self.terms[-1].academic_year
+        expected = [student.student_id for student in self.students
+                    if student.pk in set(honours.above(year).values_list('student_id', flat=True))]
+        self.assertEqual(len(expected), 3)
+        paged = self.walk(f'/api/students/alif/?year_of_entry={year}&page_size=2')
+        self.assertEqual([row['student_id'] for row in paged], expected)
+        streamed = self.stream(f'/api/students/alif/?year_of_entry={year}&stream=1')
+        self.assertEqual([row['student_id'] for row in streamed], expected)
+        self.assertEqual(self.stream('/api/students/alif/?stream=1'), [])
+
+    def test_attendance_pages_and_stream_match_the_records(self):
+        class_obj = Class.objects.create(room=Room.objects.create(name='Hall A', capacity=10), course=self.courses[0],
+                                         start_time=time(8), end_time=time(10))
+        student = self.students[0]
+        for day in range(1, 12):
+            Attendance.objects.create(student=student, class_num=class_obj, date=date(2024, 2, day),
+                                      is_present=day % 3 != 0)
+        expected = [{'class_number': 'Hall A', 'date': record.date.isoformat(), 'is_present': record.is_present}
+                    for record in Attendance.objects.filter(student=student).order_by('pk')]
+        self.assertEqual(self.walk(f'/api/attendance/{student.student_id}/?page_size=4'), expected)
+        self.assertEqual(self.stream(f'/api/attendance/{student.student_id}/?stream=1'), expected)
+
+    def test_stream_json_chunks_form_one_array(self):
+        for count in (0, 1, 4, 5):
+            rows = [{'n': n} for n in range(count)]
+            chunks = [chunk.decode() for chunk in stream_json(iter(rows), chunk_size=2).streaming_content]
+            self.assertEqual(json.loads(''.join(chunks)), rows)
+            self.assertEqual(len(chunks), (count + 1) // 2 + 1)
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class TimetableIndexTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        rng = random.Random(7)
+        professor = Professor.objects.create(first_name='Ali', last_name='Rezaei', professor_id='P1',
+                                             department='Computer')
+        cls.days = [Day.objects.create(name=name) for name in ('Saturday', 'Monday', 'Wednesday')]
+        cls.rooms = [Room.objects.create(name=f'Hall {i}', capacity=30) for i in range(3)]
+        cls.courses = [Course.objects.create(code=f'CS1{i:02d}', title=f'Course {i}', professor=professor, credits=3)
+                       for i in range(8)]
+        for _ in range(30):
+            start = 8 * 60 + 30 * rng.randrange(16)
+            end = start + rng.choice((60, 90, 120))
+            class_obj = Class.objects.create(room=rng.choice(cls.rooms), course=rng.choice(cls.courses),
+                                             start_time=time(*divmod(start, 60)), end_time=time(*divmod(end, 60)))
+            class_obj.days.set(rng.sample(cls.days, rng.randint(1, 2)))
+        cls.students = create_students(Term.objects.create(academic_year=1402, semester='fall'), 6)
+        for student in cls.students:
+            student.courses_taken.add(*rng.sample(cls.courses, 3))
+
+    def setUp(self):
+        timetable.invalidate()
+
+    def meetings(self):
+        return [(class_obj.pk, class_obj.course_id, class_obj.room_id, day.pk,
+                 timetable.minutes(class_obj.start_time), timetable.minutes(class_obj.end_time))
+                for class_obj in Class.objects.prefetch_related('days') for day in class_obj.days.all()]
+
+    @staticmethod
+    def overlap(first, second):
+        return first[3] == second[3] and first[4] < second[5] and second[4] < first[5]
+
+    def room_clashes(self):
+        meetings = self.meetings()
+        return {(first[2], first[3], frozenset((first[0], second[0])))
+                for i, first in enumerate(meetings) for second in meetings[i + 1:]
+                if first[2] == second[2] and first[0] != second[0] and self.overlap(first, second)}
+
+    def course_clashes(self, course_id, other_ids):
+        meetings = self.meetings()
+        return {second[1] for first in meetings for second in meetings
+                if first[1] == course_id and second[1] in other_ids and second[1] != course_id
+                and self.overlap(first, second)}
+
+    def assert_index_matches_timetable(self):
+        index = timetable.get_index()
+        self.assertEqual({(room_id, day_id, frozenset((first, second)))
+                          for room_id, day_id, first, second in index.audit_rooms()}, self.room_clashes())
+
+        meetings = self.meetings()
+        for room in self.rooms:
+            for day in self.days:
+                for start in range(7 * 60, 17 * 60, 45):
+                    for exclude in (None, *{meeting[0] for meeting in meetings if meeting[2] == room.pk}):
+                        probe = (None, None, room.pk, day.pk, start, start + 75)
+                        clashing = {meeting[0] for meeting in meetings if meeting[2] == room.pk
+                                    and meeting[0] != exclude and self.overlap(meeting, probe)}
+                        found = index.room_conflict(room.pk, day.pk, start, start + 75, exclude)
+                        self.assertTrue(found in clashing if clashing else found is None)
+
+        course_ids = [course.pk for course in self.courses]
+        for course_id in course_ids:
+            for others in (course_ids[:3], course_ids[3:], course_ids):
+                clashing = self.course_clashes(course_id, others)
+                found = index.course_conflict(course_id, others)
+                self.assertTrue(found in clashing if clashing else found is None)
+
+        enrolments = Course.students.through.objects.order_by('student_id').values_list('student_id', 'course_id')
+        expected = set()
+        for student in self.students:
+            selected = [course.pk for course in student.courses_taken.all()]
+            expected |= {(student.pk, *sorted((course_id, other_id))) for course_id in selected
+                         for other_id in self.course_clashes(course_id, selected)}
+        self.assertEqual({(student_id, *sorted((first, second)))
+                          for student_id, first, second in index.audit_students(enrolments)}, expected)
+
+    def test_index_finds_exactly_the_overlapping_meetings(self):
+        self.assertTrue(self.room_clashes())
+        self.assert_index_matches_timetable()
+
+    def test_class_changes_reach_the_index(self):
+        timetable.get_index()
+        moved, dropped, deleted = Class.objects.order_by('pk')[:3]
+        moved.start_time, moved.end_time = time(12), time(14, 30)
+        moved.save()
+        self.assert_index_matches_timetable()
+        dropped.days.remove(*dropped.days.all()[:1])
+        dropped.days.add(self.days[2])
+        self.assert_index_matches_timetable()
+        deleted.delete()
+        self.assert_index_matches_timetable()
+
+    def test_conflict_view_reports_the_audit(self):
+        self.client.force_login(User.objects.create_user('admin', password='x', is_staff=True))
+        response = self.client.get('/api/timetable/conflicts/')
+        self.assertEqual({(row['room'], row['day'], frozenset(row['classes'])) for row in response.json()['rooms']},
+                         self.room_clashes())
+
+    def test_admin_form_rejects_a_room_clash_but_not_the_class_itself(self):
+        room = Room.objects.create(name='Lab', capacity=20)
+        taken = Class.objects.create(room=room, course=self.courses[0], start_time=time(8), end_time=time(10))
+        taken.days.add(self.days[0])
+        data = {'room': room.pk, 'course': self.courses[1].pk, 'start_time': time(9), 'end_time': time(11),
+                'days': [self.days[0].pk]}
+        form = ClassAdminForm(data)
+        self.assertFalse(form.is_valid())
+        self.assertIn(str(self.courses[0]), str(form.errors))
+        self.assertTrue(ClassAdminForm(data, instance=taken).is_valid())
+        self.assertTrue(ClassAdminForm({**data, 'days': [self.days[1].pk]}).is_valid())
+        self.assertTrue(ClassAdminForm({**data, 'start_time': time(10)}).is_valid())
+
+    def test_registration_refuses_a_clash_once_the_class_moves(self):
+        student = create_students(self.students[0].term, 1, first=50)[0]
+        first, second = self.courses[:2]
+        Class.objects.filter(course__in=(first, second)).delete()
+        Class.objects.create(room=self.rooms[0], course=first, start_time=time(8), end_time=time(10)) \
+            .days.add(self.days[0])
+        later = Class.objects.create(room=self.rooms[1], course=second, start_time=time(10), end_time=time(12))
+        later.days.add(self.days[0])
+        registration.register(student, first)
+        self.assertIsNone(timetable.student_conflict(student, second))
+
+        later.start_time = time(9, 30)
+        later.save()
+        with self.assertRaises(registration.ScheduleConflict):
+            registration.register(student, second)
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class BulkImportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.term = Term.objects.create(academic_year=1402, semester='fall')
+        Department.objects.create(name='Computer')
+        cls.professor = Professor.objects.create(first_name='Ali', last_name='Rezaei', professor_id='P1',
+                                                 department='Computer')
+        cls.courses = [Course.objects.create(code=f'CS10{i}', title=f'Course {i}', professor=cls.professor,
+                                             credits=3) for i in range(2)]
+        cls.students = create_students(cls.term, 3)
+
+    def setUp(self):
+        caches['read_models'].clear()
+
+    def run_import(self, kind, lines, fmt='csv', chunk_size=2):
+        return importer.import_stream(kind, io.StringIO('\n'.join(lines) + '\n'), fmt, chunk_size=chunk_size)
+
+    def assert_derived_data_matches(self):
+        for student in Student.objects.all():
+            signed = Grade.objects.filter(student=student, have_digital_signature=True).select_related('course')
+            credits = sum(grade.course.credits for grade in signed)
+            points = sum(grade.grade * grade.course.credits for grade in signed)
+            overall = GradeAggregate.objects.filter(student=student, term__isnull=True).first()
+            self.assertEqual((overall.total_credits, round(overall.total_grade_points, 6)) if overall else (0, 0),
+                             (credits, round(points, 6)))
+            self.assertEqual(student.total_credits_taken, credits)
+            self.assertEqual(HonoursEntry.objects.filter(student=student).exists(), bool(credits))
+            self.assertEqual(read_models.get_transcript(student), read_models.build_transcript(student))
+            self.assertEqual(read_models.get_class_schedule(student), read_models.build_class_schedule(student))
+            self.assertEqual(read_models.get_passed_courses(student), read_models.build_passed_courses(student))
+        for course in Course.objects.all():
+            self.assertEqual(course.seats_taken, course.students.count())
+
+    def test_student_rows_are_upserted_and_bad_rows_reported(self):
+        stats = self.run_import('students', [
+            'student_id,first_name,last_name,academic_year,semester,department',
+            '402000000,Sara,Karimi,1402,Fall,Computer',   # updates an existing student
+            '402099001,Reza,Ahmadi,1402,fall,',
+            '402099002,,Nouri,1402,fall,',                 # no first name
+            '402099003,Mina,Nouri,1399,fall,',             # unknown term
+            '402099004,Mina,Nouri,1402,fall,Physics',      # unknown department
+            '402099005,Mina,Nouri,next,fall,',             # not a number
+            '402099001,Reza,Ahmadi-Far,1402,fall,Computer',
+        ])
+        self.assertEqual((stats['rows'], stats['created'], stats['updated'], stats['skipped']), (7, 1, 2, 4))
+        self.assertEqual([error['line'] for error in stats['errors']], [4, 5, 6, 7])
+        self.assertEqual(Student.objects.get(student_id='402000000').first_name, 'Sara')
+        reza = Student.objects.get(student_id='402099001')
+        self.assertEqual((reza.last_name, reza.department.name), ('Ahmadi-Far', 'Computer'))
+        self.assertFalse(Student.objects.filter(student_id__in=['402099002', '402099003', '402099004',
+                                                                 '402099005']).exists())
+
+    def test_jsonl_rows_that_are_not_objects_are_skipped(self):
+        stats = self.run_import('courses', [
+            json.dumps({'code': 'CS200', 'title': 'Compilers', 'professor_id': 'P1', 'credits': 3}),
+            '{"code": "CS201",',
+            '["CS202"]',
+            '',
+            json.dumps({'code': 'CS203', 'title': 'Networks', 'professor_id': 'P9', 'credits': 3}),
+            json.dumps({'code': 'CS204', 'title': 'Databases', 'professor_id': 'P1', 'credits': -1}),
+        ], fmt='jsonl')
+        self.assertEqual((stats['rows'], stats['created'], stats['skipped']), (5, 1, 4))
+        self.assertEqual([error['line'] for error in stats['errors']], [2, 3, 5, 6])
+        self.assertEqual(list(Course.objects.filter(code__startswith='CS2').values_list('code', flat=True)),
+                         ['CS200'])
+
+    def test_enrolments_and_grades_across_chunks_keep_the_derived_data(self):
+        for student in self.students:
+            read_models.get_class_schedule(student)
+            read_models.get_transcript(student)
+            read_models.get_passed_courses(student)
+        with self.captureOnCommitCallbacks(execute=True):
+            stats = self.run_import('enrolments', ['student_id,code'] + [
+                f'{student.student_id},{course.code}' for student in self.students for course in self.courses
+            ] + ['402000000,CS999', '999999999,CS100', f'{self.students[0].student_id},CS100'])
+        self.assertEqual((stats['created'], stats['skipped']), (6, 2))
+
+        grades = ['student_id,code,grade,academic_year,semester,have_digital_signature',
+                  '402000000,CS100,18,1402,fall,1',
+                  '402000000,CS101,12,,,true',
+                  '402000001,CS100,19.5,1402,fall,1',
+                  '402000001,CS101,21,1402,fall,1',       # out of range
+                  '402000002,CS101,15,1402,fall,0']
+        with self.captureOnCommitCallbacks(execute=True):
+            stats = self.run_import('grades', grades)
+        self.assertEqual((stats['created'], stats['updated'], stats['skipped']), (4, 0, 1))
+        self.assert_derived_data_matches()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            stats = self.run_import('grades', [grades[0], '402000000,CS100,10,1402,fall,1',
+                                               '402000002,CS101,16,1402,fall,1'])
+        self.assertEqual((stats['created'], stats['updated']), (0, 2))
+        self.assertEqual(Grade.objects.count(), 4)
+        self.assertEqual(Grade.objects.get(student=self.students[0], course=self.courses[0]).grade, 10)
+        self.assert_derived_data_matches()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.run_import('courses', ['code,title,professor_id,credits', 'CS100,Course 0,P1,4'])
+        self.assert_derived_data_matches()
+
+    def test_error_list_is_capped(self):
+        stats = self.run_import('courses', ['code,title,professor_id,credits'] +
+                                [f'CS3{i:02d},Course,P9,3' for i in range(importer.MAX_ERRORS + 5)], chunk_size=50)
+        self.assertEqual(stats['skipped'], importer.MAX_ERRORS + 5)
+        self.assertEqual(len(stats['errors']), importer.MAX_ERRORS)
+
+    def test_endpoint_takes_the_format_from_the_query_or_the_file_name(self):
+        self.client.force_login(User.objects.create_user('admin', password='x', is_staff=True))
+        rows = json.dumps({'code': 'CS200', 'title': 'Compilers', 'professor_id': 'P1', 'credits': 3}) + '\n'
+        upload = SimpleUploadedFile('courses.txt', rows.encode())
+        response = self.client.post('/api/import/courses/?input=jsonl', {'file': upload})
+        self.assertEqual((response.status_code, response.json()['created']), (200, 1))
+        upload = SimpleUploadedFile('courses.ndjson', rows.encode())
+        self.assertEqual(self.client.post('/api/import/courses/', {'file': upload}).json()['updated'], 1)
+
+        upload = SimpleUploadedFile('rows.csv', b'a,b\n')
+        self.assertEqual(self.client.post('/api/import/rooms/', {'file': upload}).status_code, 400)
+        upload = SimpleUploadedFile('rows.csv', b'a,b\n')
+        self.assertEqual(self.client.post('/api/import/courses/?input=xml', {'file': upload}).status_code, 400)
+        self.assertEqual(self.client.post('/api/import/courses/').status_code, 400)
+
+        self.client.force_login(User.objects.create_user('clerk', password='x'))
+        upload = SimpleUploadedFile('courses.jsonl', rows.encode())
+        self.assertEqual(self.client.post('/api/import/courses/', {'file': upload}).status_code, 403)
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class RollCallTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        term = Term.objects.create(academic_year=1402, semester='fall')
+        professor = Professor.objects.create(first_name='Ali', last_name='Rezaei', professor_id='P1',
+                                             department='Computer')
+        cls.course = Course.objects.create(code='CS101', title='Programming', professor=professor, credits=3)
+        cls.class_obj = Class.objects.create(room=Room.objects.create(name='Hall A', capacity=10), course=cls.course,
+                                             start_time=time(8), end_time=time(10))
+        cls.students = create_students(term, 4)
+        cls.course.students.add(*cls.students)
+        cls.url = f'/api/attendance/rollcall/{cls.class_obj.pk}/'
+
+    def roll_call(self, present, absent=None, day=1):
+        data = {'date': f'2024-02-{day:02d}', 'present': [self.students[i].student_id for i in present]}
+        if absent is not None:
+            data['absent'] = [self.students[i].student_id for i in absent]
+        return self.client.post(self.url, data, content_type='application/json')
+
+    def records(self, day=1):
+        return {self.students.index(record.student): record.is_present
+                for record in Attendance.objects.filter(date=date(2024, 2, day)).select_related('student')}
+
+    def assert_summaries_match_records(self):
+        stored = {(row.student_id, row.class_num_id): (row.present, row.absent)
+                  for row in AttendanceSummary.objects.all() if row.present or row.absent}
+        recounted = defaultdict(lambda: [0, 0])
+        for record in Attendance.objects.all():
+            recounted[(record.student_id, record.class_num_id)][0 if record.is_present else 1] += 1
+        self.assertEqual(stored, {key: tuple(counts) for key, counts in recounted.items()})
+
+    def test_resubmitting_a_roll_call_corrects_the_records(self):
+        response = self.roll_call([0, 1])
+        self.assertEqual((response.status_code, response.json()['recorded']), (201, 4))
+        self.assertEqual(self.records(), {0: True, 1: True, 2: False, 3: False})
+        self.assert_summaries_match_records()
+
+        self.roll_call([0, 2])
+        self.assertEqual(self.records(), {0: True, 1: False, 2: True, 3: False})
+        self.assertEqual(Attendance.objects.count(), 4)
+        self.assert_summaries_match_records()
+
+        self.roll_call([3], day=2)
+        self.assertEqual(self.records(day=2), {0: False, 1: False, 2: False, 3: True})
+        self.assert_summaries_match_records()
+
+    def test_explicit_lists_leave_the_other_students_alone(self):
+        self.roll_call([0, 1])
+        self.assertEqual(self.roll_call([2], absent=[0]).json()['recorded'], 2)
+        self.assertEqual(self.records(), {0: False, 1: True, 2: True, 3: False})
+        self.assert_summaries_match_records()
+
+    def test_roll_calls_and_record_edits_move_the_same_summaries(self):
+        self.roll_call([0, 1])
+        record = Attendance.objects.get(student=self.students[2], date=date(2024, 2, 1))
+        record.is_present = True
+        record.save()
+        self.roll_call([0], absent=[2])
+        self.course.students.remove(self.students[3])
+        self.roll_call([1])
+        self.assertEqual(self.records(), {0: False, 1: True, 2: False, 3: False})
+        self.assert_summaries_match_records()
+
+    def test_rejected_roll_calls_write_nothing(self):
+        outsider = create_students(self.students[0].term, 1, first=50)[0]
+        response = self.client.post(self.url, {'date': '2024-02-01', 'present': [outsider.student_id]},
+                                    content_type='application/json')
+        self.assertEqual((response.status_code, response.json()['student_ids']), (400, [outsider.student_id]))
+        response = self.roll_call([0, 1], absent=[1, 2])
+        self.assertEqual((response.status_code, response.json()['student_ids']),
+                         (400, [self.students[1].student_id]))
+        for data in ({'date': '2024-02-31', 'present': []}, {'date': 'yesterday', 'present': []},
+                     {'date': '2024-02-01'}, {'date': '2024-02-01', 'present': [], 'absent': 'all'}):
+            self.assertEqual(self.client.post(self.url, data, content_type='application/json').status_code, 400)
+        self.assertEqual(self.client.post('/api/attendance/rollcall/999/', {'present': []},
+                                          content_type='application/json').status_code, 404)
+        self.assertFalse(Attendance.objects.exists())
+        self.assertFalse(AttendanceSummary.objects.filter(Q(present__gt=0) | Q(absent__gt=0)).exists())
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class AsyncViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        term = Term.objects.create(academic_year=1402, semester='fall')
+        professor = Professor.objects.create(first_name='Ali', last_name='Rezaei', professor_id='P1',
+                                             department='Computer')
+        cls.courses = [Course.objects.create(code=f'CS10{i}', title=f'Course {i}', professor=professor, credits=3)
+                       for i in range(2)]
+        rooms = [Room.objects.create(name=f'Hall {i}', capacity=10) for i in range(2)]
+        cls.classes = [Class.objects.create(room=room, course=cls.courses[0], start_time=time(8), end_time=time(10))
+                       for room in rooms]
+        ExaminationSchedule.objects.create(course=cls.courses[0], room=rooms[1], seat_number=0,
+                                           date=timezone.make_aware(datetime(2024, 6, 1, 9)), description='Final')
+        cls.student, cls.other = create_students(term, 2)
+        cls.courses[0].students.add(cls.student)
+        for course, grade in zip(cls.courses, (18, 12.5)):
+            Grade.objects.create(student=cls.student, course=course, term=term, grade=grade,
+                                 have_digital_signature=True)
+        for day in range(1, 8):
+            Attendance.objects.create(student=cls.student, class_num=cls.classes[day % 2], date=date(2024, 2, day),
+                                      is_present=day % 3 != 0)
+
+    def setUp(self):
+        caches['read_models'].clear()
+
+    def regrade(self, course, grade):
+        record = Grade.objects.get(student=self.student, course=course)
+        record.grade = grade
+        with self.captureOnCommitCallbacks(execute=True):
+            record.save()
+
+    def enrol(self, course):
+        with self.captureOnCommitCallbacks(execute=True):
+            course.students.add(self.student)
+
+    async def assert_same_response(self, path):
+        sync_response = await sync_to_async(self.client.get)(f'/api/{path}')
+        async_response = await self.async_client.get(f'/api/async/{path}')
+        self.assertEqual(async_response.status_code, sync_response.status_code)
+        if sync_response.status_code == 200:
+            self.assertEqual(async_response.json(), sync_response.json())
+        return async_response
+
+    async def test_async_documents_match_the_sync_views(self):
+        student_id, other_id = self.student.student_id, self.other.student_id
+        for path in (f'class/schedule/{student_id}/', f'transcript/{student_id}/', f'transcript/{other_id}/',
+                     'class/schedule/999/', 'transcript/999/',
+                     f'examination/schedule/{self.courses[0].pk}/', f'examination/schedule/{self.courses[1].pk}/',
+                     f'course/detail/{self.courses[0].pk}/', 'course/detail/999/'):
+            await self.assert_same_response(path)
+        response = await self.async_client.post(f'/api/async/transcript/{student_id}/')
+        self.assertEqual(response.status_code, 405)
+
+    async def test_async_and_sync_reads_share_the_cached_documents(self):
+        await self.assert_same_response(f'transcript/{self.student.student_id}/')
+        await sync_to_async(self.regrade)(self.courses[1], 20)
+        response = await self.async_client.get(f'/api/async/transcript/{self.student.student_id}/')
+        self.assertEqual(response.json(), await sync_to_async(read_models.build_transcript)(self.student))
+
+        await self.assert_same_response(f'class/schedule/{self.student.student_id}/')
+        await sync_to_async(self.enrol)(self.courses[1])
+        await self.assert_same_response(f'class/schedule/{self.student.student_id}/')
+        response = await self.async_client.get(f'/api/async/class/schedule/{self.student.student_id}/')
+        self.assertEqual(len(response.json()), 2)
+
+    async def test_attendance_keyset_pages_cover_every_record_once(self):
+        expected = [{'class_number': record.class_num.room.name, 'date': record.date.isoformat(),
+                     'is_present': record.is_present}
+                    async for record in Attendance.objects.filter(student=self.student)
+                    .select_related('class_num__room').order_by('pk')]
+        url, rows = f'/api/async/attendance/{self.student.student_id}/?page_size=3', []
+        while url:
+            page = (await self.async_client.get(url)).json()
+            rows += page['results']
+            url = page['next']
+        self.assertEqual(rows, expected)
+
+        sync_page = (await sync_to_async(self.client.get)(f'/api/attendance/{self.student.student_id}/')).json()
+        self.assertEqual(sync_page['results'], expected)
+        for query in ('after=x', 'page_size=many'):
+            response = await self.async_client.get(f'/api/async/attendance/{self.student.student_id}/?{query}')
+            self.assertEqual(response.status_code, 400)
+        response = await self.async_client.get(f'/api/async/attendance/{self.student.student_id}/?page_size=0')
+        self.assertEqual(len(response.json()['results']), 1)
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'], SHARED_CACHE=False)
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.term = Term.objects.create(academic_year=1402, semester='fall')
+        cls.professor = Professor.objects.create(first_name='Ali', last_name='Rezaei', professor_id='P1',
+                                                 department='Computer')
+        cls.courses = [Course.objects.create(code=f'CS10{i}', title=f'Course {i}', professor=cls.professor,
+                                             credits=3) for i in range(2)]
+        cls.room = Room.objects.create(name='Hall A', capacity=10)
+        Class.objects.create(room=cls.room, course=cls.courses[0], start_time=time(8), end_time=time(10))
+        for course in cls.courses:
+            ExaminationSchedule.objects.create(course=course, room=cls.room, seat_number=0, description='Final',
+                                               date=timezone.make_aware(datetime(2024, 6, 1, 9)))
+        Food.objects.create(name='Kebab', price=40000, meal='lunch', day='Saturday',
+                            date=timezone.make_aware(datetime(2024, 2, 3, 12)))
+        cls.students = create_students(cls.term, 2)
+
+    def setUp(self):
+        cache.clear()
+
+    def change(self, write):
+        with self.captureOnCommitCallbacks(execute=True):
+            write()
+
+    def assert_revalidates(self, url, write, changed=True):
+        """A validator from before ``write`` gets a fresh 200 when the resource changed and a 304 otherwise."""
+        first = self.client.get(url)
+        etag = first['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(self.client.head(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.change(write)
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        if not changed:
+            self.assertEqual(response.status_code, 304)
+            return
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        fresh = self.client.get(url)
+        self.assertEqual(response.json(), fresh.json())
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+    def test_terms_and_menu_follow_their_rows(self):
+        self.assert_revalidates('/api/terms/', lambda: Term.objects.create(academic_year=1403, semester='fall'))
+        self.assert_revalidates('/api/food/menu/', lambda: Food.objects.update_or_create(
+            name='Kebab', defaults={'price': 45000}))
+        self.assert_revalidates('/api/food/menu/', lambda: Term.objects.create(academic_year=1404, semester='fall'),
+                                changed=False)
+
+    def test_course_detail_follows_its_classes_professor_and_rooms(self):
+        url = f'/api/course/detail/{self.courses[0].pk}/'
+
+        def rename(instance, **fields):
+            def write():
+                for name, value in fields.items():
+                    setattr(instance, name, value)
+                instance.save()
+            return write
+
+        self.assert_revalidates(url, lambda: Class.objects.create(room=self.room, course=self.courses[0],
+                                                                  start_time=time(10), end_time=time(12)))
+        self.assert_revalidates(url, rename(self.professor, last_name='Karimi'))
+        self.assert_revalidates(url, rename(self.room, name='Hall B'))
+        self.assert_revalidates(url, rename(self.courses[0], title='Programming'))
+        self.assert_revalidates(url, rename(self.courses[1], title='Networks'), changed=False)
+
+    def test_exam_schedule_follows_seating(self):
+        url = f'/api/examination/schedule/{self.courses[0].pk}/'
+        self.assert_revalidates(url, lambda: registration.register(self.students[0], self.courses[0]))
+        self.assert_revalidates(url, lambda: registration.register(self.students[1], self.courses[1]),
+                                changed=False)
+        self.assert_revalidates(url, lambda: Student.objects.filter(pk=self.students[0].pk).delete())
+
+    def test_a_bump_from_another_process_is_not_answered_with_304(self):
+        url = f'/api/course/detail/{self.courses[0].pk}/'
+        etag = self.client.get(url)['ETag']
+        self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        # another process commits a class change: its bump moves the row and clears only the caches it shares
+        Class.objects.filter(course=self.courses[0]).update(end_time=time(11))
+        ResourceVersion.objects.filter(name=versions.course(self.courses[0].pk)) \
+            .update(version=F('version') + 1, updated_at=timezone.now())
+        if settings.SHARED_CACHE:
+            cache.delete(versions.KEY_PREFIX + versions.course(self.courses[0].pk))
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_bump_all_moves_every_validator(self):
+        urls = ['/api/terms/', '/api/food/menu/', f'/api/course/detail/{self.courses[1].pk}/',
+                f'/api/examination/schedule/{self.courses[1].pk}/']
+        etags = [self.client.get(url)['ETag'] for url in urls]
+        self.change(versions.bump_all)
+        self.assertEqual([self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code
+                          for url, etag in zip(urls, etags)], [200] * len(urls))
+
+
+@override_settings(SHARED_CACHE=True)
+class SharedCacheConditionalGetTests(ConditionalGetTests):
+    """The same validators with the counters cached in a cache shared by every process."""
+
+    def test_counters_are_read_from_the_cache(self):
+        url = f'/api/course/detail/{self.courses[0].pk}/'
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+
+@override_settings(REPLICA_DATABASES=['replica1', 'replica2'], REPLICA_STICKY_SECONDS=5)
+class ReplicaRoutingTests(SimpleTestCase):
+    router = routers.ReplicaRouter()
+
+    def reads_from(self):
+        return self.router.db_for_read(Student)
+
+    def serve(self, request, write=False, cookie=None):
+        """Run ``request`` through the middleware; return where the view read from and the sticky cookie."""
+        seen = []
+
+        def view(request):
+            if write:
+                self.router.db_for_write(Student)
+            seen.append(self.reads_from())
+            return HttpResponse()
+
+        if cookie is not None:
+            request.COOKIES[ReplicaRoutingMiddleware.cookie] = cookie
+        response = ReplicaRoutingMiddleware(view)(request)
+        return seen[0], response.cookies.get(ReplicaRoutingMiddleware.cookie)
+
+    def test_router_reads_from_the_primary_when_pinned_or_after_a_write(self):
+        self.assertEqual(self.reads_from(), 'default')
+        with routers.replica_reads('replica1') as routing:
+            self.assertEqual(self.reads_from(), 'replica1')
+            with routers.primary():
+                with routers.primary():
+                    self.assertEqual(self.reads_from(), 'default')
+                self.assertEqual(self.reads_from(), 'default')
+            self.assertEqual(self.reads_from(), 'replica1')
+            self.assertFalse(routing.wrote)
+            self.assertEqual(self.router.db_for_write(Student), 'default')
+            self.assertEqual((self.reads_from(), routing.wrote), ('default', True))
+        self.assertEqual(self.reads_from(), 'default')
+
+    def test_safe_requests_read_from_a_replica_until_the_client_writes(self):
+        factory = RequestFactory()
+        alias, cookie = self.serve(factory.get('/api/terms/'))
+        self.assertIn(alias, settings.REPLICA_DATABASES)
+        self.assertIsNone(cookie)
+        self.assertEqual(self.serve(factory.get('/admin/'))[0], 'default')
+
+        for request, write in ((factory.post('/api/terms/'), False), (factory.get('/api/terms/'), True)):
+            before = timezone.now().timestamp()
+            alias, cookie = self.serve(request, write=write)
+            self.assertEqual(alias, 'default')
+            self.assertEqual(cookie['max-age'], 5)
+            self.assertTrue(before + 5 <= float(cookie.value) <= timezone.now().timestamp() + 6)
+
+        now = timezone.now().timestamp()
+        self.assertEqual(self.serve(factory.get('/api/terms/'), cookie=str(now + 3))[0], 'default')
+        for stale in (str(now - 1), 'soon'):
+            self.assertIn(self.serve(factory.get('/api/terms/'), cookie=stale)[0], settings.REPLICA_DATABASES)
+
+        with override_settings(REPLICA_DATABASES=[]):
+            self.assertEqual(self.serve(factory.post('/api/terms/')), ('default', None))
+
+    def test_streamed_bodies_are_read_in_the_routing_of_their_request(self):
+        seen = []
+
+        def body():
+            seen.append(self.reads_from())
+            yield b'[]'
+
+        response = ReplicaRoutingMiddleware(lambda request: StreamingHttpResponse(body()))(
+            RequestFactory().get('/api/terms/?stream=1'))
+        self.assertEqual(seen, [])
+        b''.join(response.streaming_content)
+        self.assertIn(seen[0], settings.REPLICA_DATABASES)
+
+    async def test_async_views_keep_the_routing_in_the_orm_threads(self):
+        seen = []
+
+        async def view(request):
+            seen.append(await sync_to_async(self.reads_from)())
+            seen.append(await sync_to_async(self.router.db_for_write)(Student))
+            seen.append(await sync_to_async(self.reads_from)())
+            return HttpResponse()
+
+        middleware = ReplicaRoutingMiddleware(view)
+        response = await middleware(RequestFactory().get('/api/async/transcript/1/'))
+        self.assertIn(seen[0], settings.REPLICA_DATABASES)
+        self.assertEqual(seen[1:], ['default', 'default'])
+        self.assertIn(ReplicaRoutingMiddleware.cookie, response.cookies)
+
+
+
+@override_settings(REPLICA_DATABASES=['replica1'])
+class ReplicaPinningTests(TransactionTestCase):
+    """Outside a test transaction, so reads really go where the router sends them."""
+
+    def setUp(self):
+        term = Term.objects.create(academic_year=1402, semester='fall')
+        professor = Professor.objects.create(first_name='Ali', last_name='Rezaei', professor_id='P1',
+                                             department='Computer')
+        course = Course.objects.create(code='CS101', title='Programming', professor=professor, credits=3)
+        self.student, = create_students(term, 1)
+        Grade.objects.create(student=self.student, course=course, term=term, grade=18, have_digital_signature=True)
+        caches['read_models'].clear()
+        cache.clear()
+
+    def test_reads_in_a_transaction_stay_on_the_primary(self):
+        with routers.replica_reads('replica1'):
+            self.assertEqual(routers.ReplicaRouter().db_for_read(Student), 'replica1')
+            with transaction.atomic():
+                self.assertEqual(routers.ReplicaRouter().db_for_read(Student), 'default')
+                self.assertTrue(Student.objects.filter(pk=self.student.pk).exists())
+
+    def test_documents_and_indexes_kept_past_the_request_are_built_on_the_primary(self):
+        # replica1 is not configured in the tests: any query routed there would fail
+        timetable.invalidate()
+        with routers.replica_reads('replica1'):
+            transcript = read_models.get_transcript(self.student)
+            timetable.get_index()
+            versions.validators([versions.terms()])
+        self.assertEqual(transcript, read_models.build_transcript(self.student))
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class TranscriptExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.entry, cls.next_term = (Term.objects.create(academic_year=1402, semester='fall'),
+                                    Term.objects.create(academic_year=1402, semester='spring'))
+        professor = Professor.objects.create(first_name='Ali', last_name='Rezaei', professor_id='P1',
+                                             department='Computer')
+        courses = [Course.objects.create(code=f'CS10{i}', title=f'درس {i}', professor=professor, credits=i + 1)
+                   for i in range(3)]
+        students = create_students(cls.entry, 4)
+        Student.objects.filter(pk=students[1].pk).update(first_name='مریم')
+        create_students(Term.objects.create(academic_year=1401, semester='fall'), 1, first=10)
+        for student, course, grade, term, signed in (
+                (students[0], courses[2], 18, cls.entry, True), (students[0], courses[0], 12.5, cls.next_term, False),
+                (students[0], courses[0], 15, cls.next_term, True), (students[1], courses[1], 20, None, True),
+                (students[3], courses[0], 9.75, cls.entry, True)):
+            Grade.objects.create(student=student, course=course, term=term, grade=grade, have_digital_signature=signed)
+        Grade.objects.create(student=Student.objects.get(student_id='402000010'), course=courses[0], grade=17)
+
+    def transcripts(self):
+        """The 1402 cohort's transcripts straight from the models, in the export's order."""
+        transcripts = []
+        for student in Student.objects.filter(term__academic_year=1402).select_related('term').order_by('student_id'):
+            grades = Grade.objects.filter(student=student).select_related('course', 'term').order_by('course__code',
+                                                                                                     'pk')
+            transcripts.append({
+                'student_id': student.student_id, 'first_name': student.first_name, 'last_name': student.last_name,
+                'entry_year': student.term.academic_year, 'entry_semester': student.term.semester,
+                'grades': [{'course_code': grade.course.code, 'course_title': grade.course.title,
+                            'credits': grade.course.credits,
+                            'academic_year': grade.term.academic_year if grade.term else None,
+                            'semester': grade.term.semester if grade.term else None,
+                            'grade': grade.grade, 'signed': grade.have_digital_signature} for grade in grades],
+            })
+        return transcripts
+
+    def csv_rows(self):
+        rows = []
+        for transcript in self.transcripts():
+            student = [transcript[column] for column in exporter.STUDENT_COLUMNS]
+            for grade in transcript['grades'] or [None]:
+                values = student + ([grade[column] for column in exporter.COLUMNS[5:]] if grade else [None] * 7)
+                rows.append(['' if value is None else str(value) for value in values])
+        return rows
+
+    def export(self, fmt, **kwargs):
+        export = exporter.TranscriptExport(1402, fmt, **kwargs)
+        return b''.join(export), export.stats
+
+    def test_csv_has_one_row_per_grade_and_one_per_student_without_grades(self):
+        body, stats = self.export('csv')
+        rows = list(csv.reader(io.StringIO(body.decode())))
+        self.assertEqual(rows[0], list(exporter.COLUMNS))
+        self.assertEqual(rows[1:], self.csv_rows())
+        self.assertEqual((stats['students'], stats['rows'], stats['bytes']), (4, 5, len(body)))
+
+    def test_jsonl_has_one_transcript_per_student(self):
+        body, stats = self.export('jsonl')
+        self.assertEqual([json.loads(line) for line in body.decode().splitlines()], self.transcripts())
+        self.assertIn('مریم', body.decode())
+        self.assertEqual((stats['students'], stats['rows']), (4, 5))
+
+    def test_chunking_and_compression_do_not_change_the_file(self):
+        for fmt in exporter.FORMATS:
+            whole, _ = self.export(fmt)
+            for chunk_size in (1, 2, 3):
+                chunks = list(exporter.TranscriptExport(1402, fmt, chunk_size=chunk_size))
+                self.assertGreater(len(chunks), 1)
+                self.assertEqual(b''.join(chunks), whole)
+                compressed, stats = self.export(fmt, compress=True, chunk_size=chunk_size)
+                self.assertEqual(gzip.decompress(compressed), whole)
+                self.assertEqual(stats['bytes'], len(compressed))
+
+    def test_endpoint_streams_the_export_to_staff_only(self):
+        url = '/api/transcript/export/1402/'
+        self.assertIn(self.client.get(url).status_code, (401, 403))
+        self.client.force_login(User.objects.create_user('clerk', password='x'))
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.client.force_login(User.objects.create_user('admin', password='x', is_staff=True))
+
+        response = self.client.get(url)
+        self.assertTrue(response.streaming)
+        self.assertEqual((response['Content-Type'], response['Content-Disposition']),
+                         ('text/csv', 'attachment; filename="transcripts-1402.csv"'))
+        self.assertEqual(b''.join(response.streaming_content), self.export('csv')[0])
+
+        response = self.client.get(url + '?output=jsonl&gzip=1')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="transcripts-1402.jsonl.gz"')
+        self.assertEqual(gzip.decompress(b''.join(response.streaming_content)), self.export('jsonl')[0])
+
+        self.assertEqual(self.client.get(url + '?output=xml').status_code, 400)
+        self.assertEqual(self.client.get('/api/transcript/export/1399/').status_code, 404)
+
+    def test_command_writes_the_same_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            for name, fmt, compressed in (('cohort.csv', 'csv', False), ('cohort.jsonl.gz', 'jsonl', True)):
+                path = os.path.join(directory, name)
+                call_command('export_transcripts', '1402', path, stdout=io.StringIO())
+                with open(path, 'rb') as f:
+                    body = f.read()
+                self.assertEqual(gzip.decompress(body) if compressed else body, self.export(fmt)[0])
+            with self.assertRaises(CommandError):
+                call_command('export_transcripts', '1399', os.path.join(directory, 'empty.csv'),
+                             stdout=io.StringIO())
 
-# Create your tests here.
@@ -0,0 +1,169 @@
+import heapq
+from bisect import bisect_left
+from collections import defaultdict
+from itertools import accumulate
+
+from app.indexes import LocalIndex
+from app.models import Class, Course
+
+VERSION_KEY = 'timetable:version'
+
+
+def minutes(value):
+    return value.hour * 60 + value.minute
+
+
+class TimetableIndex:
+    """
+    Sorted interval lists of every class meeting, per (room, day) and per course.
+
+    Each (room, day) list keeps its meetings sorted by start time together with the two largest
+    end times seen so far, so "does [start, end) overlap anything in this room on this day?" is a
+    single bisect: only meetings starting before ``end`` can overlap, and one of them does exactly
+    when the largest end among them (ignoring the class being checked) is after ``start``.
+    """
+
+    def __init__(self, meetings):
+        # meetings: (class_id, course_id, room_id, day_id, start, end) with start/end in minutes
+        self.by_course = defaultdict(list)
+        rooms = defaultdict(list)
+        for class_id, course_id, room_id, day_id, start, end in meetings:
+            self.by_course[course_id].append((day_id, start, end, class_id))
+            rooms[(room_id, day_id)].append((start, end, class_id))
+
+        self.rooms = {}
+        for key, rows in rooms.items():
+            rows.sort()
+            self.rooms[key] = ([row[0] for row in rows], self._prefix_top_two(rows), rows)
+
+    @staticmethod
+    def _prefix_top_two(rows):
+        top = []
+        best = second = (-1, None)
+        for start, end, class_id in rows:
+            if end > best[0]:
+                best, second = (end, class_id), best
+            elif end > second[0]:
+                second = (end, class_id)
+            top.append((best, second))
+        return top
+
+    def room_conflict(self, room_id, day_id, start, end, exclude=None):
+        """Return the id of a class that overlaps [start, end) in the room on that day, or None."""
+        entry = self.rooms.get((room_id, day_id))
+        if entry is None:
+            return None
+
+        starts, top, _ = entry
+        position = bisect_left(starts, end)
+        if not position:
+            return None
+
+        best, second = top[position - 1]
+        candidate = second if best[1] == exclude else best
+        return candidate[1] if candidate[0] > start else None
+
+    def class_conflicts(self, room_id, day_ids, start, end, exclude=None):
+        """Return ``{day_id: class_id}`` for every day on which the meeting would clash with another class."""
+        conflicts = {}
+        for day_id in day_ids:
+            class_id = self.room_conflict(room_id, day_id, start, end, exclude)
+            if class_id is not None:
+                conflicts[day_id] = class_id
+        return conflicts
+
+    def course_conflict(self, course_id, other_course_ids):
+        """
+        Return the id of a course in ``other_course_ids`` whose meetings overlap ``course_id``'s, or None.
+
+        The other courses' meetings of each day are sorted once with the latest end seen so far,
+        so each meeting of ``course_id`` is the same single bisect as ``room_conflict``.
+        """
+        by_day = defaultdict(list)
+        for other_id in set(other_course_ids) - {course_id}:
+            for day_id, start, end, _ in self.by_course.get(other_id, ()):
+                by_day[day_id].append((start, end, other_id))
+
+        days = {}
+        for day_id, start, end, _ in self.by_course.get(course_id, ()):
+            if day_id not in by_day:
+                continue
+            if day_id not in days:
+                rows = sorted(by_day[day_id])
+                days[day_id] = ([row[0] for row in rows], list(accumulate(((row[1], row[2]) for row in rows), max)))
+            starts, latest = days[day_id]
+            position = bisect_left(starts, end)
+            if position and latest[position - 1][0] > start:
+                return latest[position - 1][1]
+        return None
+
+    def audit_rooms(self):
+        """Every pair of classes sharing a room at the same time, found in one sweep per (room, day)."""
+        conflicts = []
+        for (room_id, day_id), (_, _, rows) in self.rooms.items():
+            active = []  # heap of (end, class_id) of meetings still running
+            for start, end, class_id in rows:
+                while active and active[0][0] <= start:
+                    heapq.heappop(active)
+                conflicts.extend((room_id, day_id, other_id, class_id) for _, other_id in active)
+                heapq.heappush(active, (end, class_id))
+        return conflicts
+
+    def audit_students(self, enrolments):
+        """
+        Every (student, course, course) triple where a student's selected courses overlap.
+
+        ``enrolments`` is an iterable of ``(student_id, course_id)`` ordered by student.
+        """
+        conflicts = []
+        student_id, meetings = None, []
+
+        def sweep():
+            meetings.sort()
+            active = []
+            for day_id, start, end, course_id in meetings:
+                while active and (active[0][0] != day_id or active[0][1] <= start):
+                    heapq.heappop(active)
+                conflicts.extend((student_id, other_id, course_id) for _, _, other_id in active
+                                 if other_id != course_id)
+                heapq.heappush(active, (day_id, end, course_id))
+
+        for enrolled_student, course_id in enrolments:
+            if enrolled_student != student_id:
+                if meetings:
+                    sweep()
+                student_id, meetings = enrolled_student, []
+            meetings.extend((day_id, start, end, course_id)
+                            for day_id, start, end, _ in self.by_course.get(course_id, ()))
+        if meetings:
+            sweep()
+        return sorted(set(conflicts))
+
+
+def build_index():
+    meetings = Class.days.through.objects.values_list(
+        'class_id', 'class__course_id', 'class__room_id', 'day_id', 'class__start_time', 'class__end_time',
+    )
+    return TimetableIndex(
+        (class_id, course_id, room_id, day_id, minutes(start), minutes(end))
+        for class_id, course_id, room_id, day_id, start, end in meetings.iterator(chunk_size=5000)
+    )
+
+
+_index = LocalIndex(VERSION_KEY, build_index)
+
+
+def get_index():
+    """The process-wide index, rebuilt once after any class, room or day change."""
+    return _index.get()
+
+
+def invalidate():
+    _index.invalidate()
+
+
+def student_conflict(student, course):
+    """Return the already selected course that clashes with ``course``, or None."""
+    selected = Course.students.through.objects.filter(student_id=student.pk).values_list('course_id', flat=True)
+    conflict_id = get_index().course_conflict(course.pk, list(selected))
+    return Course.objects.get(pk=conflict_id) if conflict_id is not None else None
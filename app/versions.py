@@ -0,0 +1,100 @@
+"""
+Change counters behind the ETag and Last-Modified validators of the rarely changing read endpoints.
+
+Every resource a cacheable response is built from has a ``ResourceVersion`` row, bumped by the
+signals and bulk writers that change it (app/signals.py, app/exams.py, app/importer.py). A
+response's validators come from its resources' counters plus the global ``*`` counter, which
+``bump_all`` moves after writes that bypass the signals, such as seeding a dataset.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from app import routers
+from app.models import ResourceVersion
+
+GLOBAL = '*'
+KEY_PREFIX = 'versions:'
+# bounds how long a reader that raced a bump can keep serving the old counter from the cache
+TIMEOUT = 300
+
+
+def terms():
+    return 'terms'
+
+
+def course(course_id):
+    return f'course:{course_id}'
+
+
+def exams(course_id):
+    return f'exams:{course_id}'
+
+
+def menu():
+    return 'menu'
+
+
+def _key(name):
+    return KEY_PREFIX + name
+
+
+def bump(names):
+    """Move the counters of ``names`` on; one UPDATE unless one of them has no row yet."""
+    names = set(names)
+    if not names:
+        return
+    now = timezone.now()
+    with transaction.atomic(savepoint=False):
+        bumped = ResourceVersion.objects.filter(name__in=names).update(version=F('version') + 1, updated_at=now)
+        if bumped < len(names):
+            # some counter has no row yet; bumping the others twice still just changes their version
+            ResourceVersion.objects.bulk_create([ResourceVersion(name=name, updated_at=now) for name in names],
+                                                ignore_conflicts=True)
+            ResourceVersion.objects.filter(name__in=names).update(version=F('version') + 1, updated_at=now)
+    keys = [_key(name) for name in names]
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def bump_all():
+    bump([GLOBAL])
+
+
+def track(course_ids):
+    """Create the counters of new courses up front, so their first bump on a hot path is one UPDATE."""
+    bump([terms(), menu(), *map(course, course_ids), *map(exams, course_ids)])
+
+
+def current(names):
+    """
+    ``{name: (version, updated_at)}`` for ``names`` and the global counter.
+
+    One cache round trip, plus one query for the names that are not cached; a name that was
+    never bumped is ``(0, None)``. Without a shared cache every call is the one query: a bump
+    only clears the cache of the process that made it, and the others would keep confirming
+    stale copies with 304s.
+    """
+    names = [GLOBAL, *names]
+    keys = {name: _key(name) for name in names}
+    cached = cache.get_many(keys.values()) if settings.SHARED_CACHE else {}
+    found = {name: cached[key] for name, key in keys.items() if key in cached}
+    missing = [name for name in names if name not in found]
+    if missing:
+        with routers.primary():
+            rows = {name: (version, updated_at) for name, version, updated_at in
+                    ResourceVersion.objects.filter(name__in=missing).values_list('name', 'version', 'updated_at')}
+        loaded = {name: rows.get(name, (0, None)) for name in missing}
+        if settings.SHARED_CACHE:
+            cache.set_many({keys[name]: value for name, value in loaded.items()}, timeout=TIMEOUT)
+        found.update(loaded)
+    return {name: found[name] for name in names}
+
+
+def validators(names):
+    """``(etag, last_modified)`` of a response built from ``names``: the counters and their newest bump."""
+    versions = current(names)
+    etag = '"{}"'.format('.'.join(str(version) for version, _ in versions.values()))
+    last_modified = max((updated_at for _, updated_at in versions.values() if updated_at is not None), default=None)
+    return etag, last_modified
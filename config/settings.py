@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -43,6 +44,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'app.middleware.QueryProfileMiddleware',
+    'app.middleware.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -52,6 +55,39 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Fraction of requests (0 to 1) profiled by QueryProfileMiddleware; 0 turns profiling off
+PROFILER_SAMPLE_RATE = float(os.environ.get('PROFILER_SAMPLE_RATE', 0))
+# Number of recent requests per view kept for the summary at /api/profiler/summary/
+PROFILER_WINDOW = 500
+
+# Percentage of a class's recorded meetings a student may miss before being listed as over the absence limit
+ATTENDANCE_ABSENCE_LIMIT = float(os.environ.get('ATTENDANCE_ABSENCE_LIMIT', 3 / 16 * 100))
+
+# Smallest overall GPA listed among the honours ("alif") students of an entry year
+HONOURS_GPA_THRESHOLD = float(os.environ.get('HONOURS_GPA_THRESHOLD', 17))
+# Term GPA under which a student is put on academic probation ("mashroot") at the end of term
+PROBATION_GPA_THRESHOLD = float(os.environ.get('PROBATION_GPA_THRESHOLD', 12))
+
+# Courses with at most this many students get every announcement and deadline copied into each
+# student's feed when it is published; the feeds of larger courses merge cached per-course heads on read
+FEED_FANOUT_LIMIT = int(os.environ.get('FEED_FANOUT_LIMIT', 200))
+
+# Days a department's course selection stays open from its course_selection_date; without a date it stays closed
+REGISTRATION_WINDOW_DAYS = int(os.environ.get('REGISTRATION_WINDOW_DAYS', 7))
+# Students without a department have no window; they are refused course selection unless this is 1
+REGISTRATION_ALLOW_WITHOUT_DEPARTMENT = os.environ.get('REGISTRATION_ALLOW_WITHOUT_DEPARTMENT', '0') == '1'
+
+# How the opening day is split into waves: 'entry_year' (earliest entry year first), 'department'
+# (departments opening on the same date take turns) or 'none'; waves start REGISTRATION_WAVE_MINUTES apart
+REGISTRATION_WAVES = os.environ.get('REGISTRATION_WAVES', 'entry_year')
+REGISTRATION_WAVE_MINUTES = int(os.environ.get('REGISTRATION_WAVE_MINUTES', 60))
+
+# Course selection writes admitted per second and at once by each server process; size the in-flight
+# cap so that (processes x cap) stays within the concurrent write transactions the database sustains;
+# a rate of 0 leaves only the cap
+REGISTRATION_RATE = float(os.environ.get('REGISTRATION_RATE', 50))
+REGISTRATION_MAX_IN_FLIGHT = int(os.environ.get('REGISTRATION_MAX_IN_FLIGHT', 8))
+
 ROOT_URLCONF = 'config.urls'
 
 TEMPLATES = [
@@ -77,13 +113,100 @@ WSGI_APPLICATION = 'config.wsgi.application'
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': 'sqlite',
+# DATABASE_ENGINE is 'sqlite3' or 'postgresql'; DATABASE_NAME is the SQLite file or the PostgreSQL
+# database, reached through DATABASE_HOST, DATABASE_PORT, DATABASE_USER and DATABASE_PASSWORD
+DATABASE_ENGINE = os.environ.get('DATABASE_ENGINE', 'sqlite3')
+
+# Seconds a connection stays open for the next request of the same worker thread: 0 closes it after
+# every request, 'none' keeps it for good. CONN_HEALTH_CHECKS=1 pings a kept connection before reusing it
+CONN_MAX_AGE = os.environ.get('CONN_MAX_AGE', '0')
+CONN_MAX_AGE = None if CONN_MAX_AGE.lower() == 'none' else int(CONN_MAX_AGE)
+CONN_HEALTH_CHECKS = os.environ.get('CONN_HEALTH_CHECKS', '0') == '1'
+
+
+def _database(name, host=None, port=None):
+    return {
+        'ENGINE': f'django.db.backends.{DATABASE_ENGINE}',
+        'NAME': name,
+        'HOST': host or os.environ.get('DATABASE_HOST', ''),
+        'PORT': port or os.environ.get('DATABASE_PORT', ''),
+        'USER': os.environ.get('DATABASE_USER', ''),
+        'PASSWORD': os.environ.get('DATABASE_PASSWORD', ''),
+        'CONN_MAX_AGE': CONN_MAX_AGE,
+        'CONN_HEALTH_CHECKS': CONN_HEALTH_CHECKS,
     }
+
+
+DATABASES = {
+    'default': _database(os.environ.get('DATABASE_NAME', 'sqlite')),
 }
 
+# Read replicas of the default database, comma separated: SQLite files or PostgreSQL databases, each
+# optionally given as HOST[:PORT]/NAME. Reads of API GET requests go to one of them (app/routers.py)
+REPLICA_DATABASES = []
+for _index, _name in enumerate(filter(None, os.environ.get('DATABASE_REPLICAS', '').split(',')), 1):
+    _host = _port = None
+    if DATABASE_ENGINE != 'sqlite3' and '/' in _name:
+        _address, _name = _name.rsplit('/', 1)
+        _host, _, _port = _address.partition(':')
+    # tests run against the primary only
+    DATABASES[f'replica{_index}'] = {**_database(_name.strip(), _host, _port), 'TEST': {'MIRROR': 'default'}}
+    REPLICA_DATABASES.append(f'replica{_index}')
+
+DATABASE_ROUTERS = ['app.routers.ReplicaRouter']
+
+# Seconds a client keeps reading from the primary after a write; longer than the replicas' usual lag
+# so a client always reads its own writes
+REPLICA_STICKY_SECONDS = int(os.environ.get('REPLICA_STICKY_SECONDS', 5))
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+
+# Seconds an in-process index (timetable, prerequisites, admission schedule) is trusted before it is
+# rebuilt even though its version in the cache did not move
+LOCAL_INDEX_TTL = int(os.environ.get('LOCAL_INDEX_TTL', 300))
+
+# REDIS_URL (e.g. redis://127.0.0.1:6379/0) shares both caches between every server process, which
+# is required as soon as there is more than one: invalidations and version bumps only reach the
+# process that made them otherwise. Without it each process keeps its own in-memory caches, which
+# only suits a single-process server such as runserver
+REDIS_URL = os.environ.get('REDIS_URL', '')
+# whether every process sees the same ``default`` cache, so values another process has to see may live there
+SHARED_CACHE = bool(REDIS_URL)
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+            'KEY_PREFIX': 'fum',
+        },
+        # per-student class schedule and transcript documents (app/read_models.py); every document
+        # expires after TIMEOUT seconds and Redis evicts by its own maxmemory policy
+        'read_models': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+            'KEY_PREFIX': 'fum-read-models',
+            'TIMEOUT': 600,
+        },
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        },
+        # per-student class schedule and transcript documents (app/read_models.py); least recently
+        # used documents are evicted past MAX_ENTRIES and every document expires after TIMEOUT seconds
+        'read_models': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'read-models',
+            'TIMEOUT': 600,
+            'OPTIONS': {
+                'MAX_ENTRIES': 20000,
+            },
+        },
+    }
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 